@@ -43,14 +43,8 @@ Environment:
 # Libraries
 #------------------------------------------------------------------------------
 
-# Data handling packages
-import pandas as pd
-
 # Web scrapping packages
-from bs4 import BeautifulSoup # Web scrapping
 from urllib import quote_plus
-import urllib2
-from urllib2 import urlopen # Download link
 
 # If selenium does not run, do these things:
 # (1) Downgrade it: pip install selenium==2.53.6
@@ -66,10 +60,21 @@ from selenium.webdriver.common.keys import Keys
 # Other packages
 import os
 import sys
-import re
-from time import sleep
+import argparse
 from datetime import datetime
 
+# Shared scraping packages (repository root folder)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from scraping_utils.parse import HTMLTree_wrapper, get_rawHTML
+from scraping_utils.extract import Schema, Field, xpath_class, to_int, remove_text
+from scraping_utils.cli import add_fetch_arguments, add_listing_arguments, configure_fetch
+from scraping_utils.pipeline import Pipeline, Stage, tap
+from scraping_utils.records import record_type, RecordBuffer
+from scraping_utils.sinks import open_sink
+from scraping_utils.retry import call_with_retry
+from scraping_utils.failures import classify_error, quarantine_page, record_failure, EXTRACTION
+from scraping_utils.browser import click_wrapper
+
 #------------------------------------------------------------------------------
 # Self-defined functions
 #------------------------------------------------------------------------------
@@ -83,78 +88,25 @@ def update_errorLog(text):
         f.write(str(datetime.now()) + ' : ' + text)
         f.write('\n')
 
-def urlopen_wrapper(url, num_retry=5, delay=10):
-    """
-    Function to open a page, try several times if the page gets stuck
-    """
-    
-    count_retry = 0
-    while  count_retry < num_retry:
-        try:
-            page = urlopen(url, timeout=30)
-            return page # If no error, end function
-            
-        except urllib2.URLError as e:
-            print('ERROR opening url:', e)
-            print('Retrying...')
-            count_retry += 1
-            sleep(delay)
-    
-    # If try many times but failed
-    print('FAILED to open this url.', url)
-    update_errorLog('FAILED_OPENING_URL' + ' | ' + url) # Add to log
-    return None
-
-def BeautifulSoup_wrapper(url, parser_type='lxml', num_retry=5, delay=10):
-    """
-    This function will try several times to extract the HTML structure of the page
-    """
-    
-    count_retry = 0
-    while count_retry < num_retry:
-        try:
-            page = urlopen_wrapper(url) # Try to open the page
-            soup = BeautifulSoup(page, parser_type) # Parse the page
-            return soup # If no error, end function
-            
-        except:
-            print('ERROR extracting HTML structure. Retrying...')
-            count_retry += 1
-            sleep(delay)
-
-    # If try many time but failed
-    print('FAILED to extract HTML structure.', url)
-    update_errorLog('FAILED_EXTRACTING_HTML' + ' | ' + url) # Add to log
-    return None
-
-def click_wrapper(object_click, num_retry=5, delay=5):    
-    """
-    Function to simulate a click, try several times if cannot click
-    """
-    
-    count_retry = 0
-    while  count_retry < num_retry:
-        try:
-            object_click.click()
-            #print('Click successful!')
-            return True
-            
-        except:
-            print('ERROR clicking. Retrying...')
-            count_retry += 1
-            sleep(delay)
-    
-    # If try many time but failed
-    print('FAILED to click on this object.')
-    update_errorLog('FAILED_CLICKING_OBJECT' + ' | ' + object_click.text.strip()) # Add to log
-    return False
+# Row of the extension list (search page)
+AddonItem = record_type('AddonItem', ['addon_name',
+                                      'addon_url',
+                                      'search_rank',
+                                      'search_term',
+                                      'platform'])
 
-def extract_addonList(driver):
+def extract_addonList(driver, searchTerm, platform='Chrome', top_k=None):
     """
     This function will extract all addons' names and urls. Chrome extensions
     page shows all addons in 1 page, but only show next addons when scrolling
     to the end of the page. This script also stimulates the scrolling action
     to get full list of addons.
+    
+    Note: this function is a generator of AddonItem records (search_rank
+    order): the addons shown by a scroll are given before the next scroll, so
+    their pages can be visited while the page is scrolled (see
+    extract_allAddonInfo). top_k: stop after the first top_k addons, the page
+    is not scrolled again (None: all).
     """
 
     # Try to scroll until the end of page, then wait for page load
@@ -168,6 +120,24 @@ def extract_addonList(driver):
             wait(driver, 30).until(EC.invisibility_of_element_located((By.CSS_SELECTOR, '.h-a-Kd.a-Hd-mb')))
         
         addonItemList = driver.find_elements_by_css_selector('.h-Ja-d-Ac.a-u')
+        
+        # Extract names and urls of the addons shown by the last scroll (the
+        # list only grows)
+        newAddonList = [(addonItem.find_element_by_css_selector('.a-na-d-w').text.strip(),
+                         addonItem.get_attribute('href'))
+                        for addonItem in addonItemList[addonCount:]]
+        
+        for addonName, addonURL in newAddonList:
+            addonCount += 1
+            yield AddonItem(addon_name=addonName,
+                            addon_url=addonURL,
+                            search_rank=addonCount, # Add search_rank
+                            search_term=searchTerm,
+                            platform=platform)
+            if addonCount == top_k: return # Top k addons found
+        
+        # Check condition to exit the while loop
+        if not newAddonList: break # End while loop
     
         # Scroll to last addon item
         if len(addonItemList) > 0:
@@ -178,277 +148,167 @@ def extract_addonList(driver):
         # Click on "See other results" if any
         seeOther = driver.find_element_by_css_selector('.h-a-Hd-mb.a-Hd-mb')
         if seeOther.is_displayed(): click_wrapper(seeOther)
-        
-        # Check condition to exit the while loop
-        if len(addonItemList) > addonCount:
-            addonCount = len(addonItemList) # Update count
-        else:
-            break # End while loop
-    
-    # Loop through all addons, extract names and urls
-    addonNameList = []
-    addonURLList = []
-    
-    for addonItem in addonItemList:
-        addonNameList.append(addonItem.find_element_by_css_selector('.a-na-d-w').text.strip())
-        addonURLList.append(addonItem.get_attribute('href'))
-    
-    # Construct result table
-    addonTb = pd.DataFrame({'addon_name':pd.Series(addonNameList),
-                            'addon_url':pd.Series(addonURLList)},
-                            columns=['addon_name', 'addon_url'])
-    
-    # Add search_rank
-    addonTb['search_rank'] = addonTb.index + 1
-    
-    return addonTb
 
-def extract_activeUser(addonSoup):
-    """
-    This function will return the number of active users in an addon page.
-    If it cannot find that number, it will return None.
-    """
-    
-    try:
-        activeUser = int(re.sub('[^0-9]', '', addonSoup.find('span', attrs={'class':'e-f-ih'}).text.strip()))
-        return activeUser
-    except:
-        return None
+# Fields of an addon page (required: all addons have this field)
+addonSchema = Schema([
+    Field('active_user', "//span[%s]" % xpath_class('e-f-ih'), convert=to_int, required=True),
+    Field('size', "//span[@class='C-b-p-D-Xe h-C-b-p-D-za']", required=True),
+    Field('version', "//span[@class='C-b-p-D-Xe h-C-b-p-D-md']", required=True),
+    Field('release_date', "//span[@class='C-b-p-D-Xe h-C-b-p-D-xh-hh']", required=True),
+    Field('number_review', "//span[%s]" % xpath_class('q-N-nd'), convert=to_int, required=True),
+    Field('rating', "//div[%s]" % xpath_class('rsw-stars'), attr='g:rating_override',
+          convert=float, required=True),
+    Field('author_name', ["//a[%s]" % xpath_class('e-f-y'), # Author's link, else "offered by ..."
+                          "//span[%s]" % xpath_class('e-f-Me')],
+          convert=remove_text('offered by'), required=True),
+    Field('author_homepage', "//a[%s]" % xpath_class('e-f-y'), attr='href')]) # Some addons may not have this field
+
+# Row of the addon information table
+AddonInfo = record_type('AddonInfo', ['addon_name',
+                                      'addon_url',
+                                      'search_rank',
+                                      'active_user',
+                                      'size',
+                                      'version',
+                                      'release_date',
+                                      'number_review',
+                                      'rating',
+                                      'author_name',
+                                      'author_homepage',
+                                      'is_error',
+                                      'platform', # Copied from the AddonItem
+                                      'search_term'])
 
-def extract_size(addonSoup):
+def extract_addonInfo(addonName, addonURL, searchRank):
     """
-    This function will return the size of the addon in addon page. The size number
-    will be a text with size + size unit (e.g. KiB, MB, etc.)
-    If it cannot find that number, it will return None.
+    This function extract all information of an addon page, then return data in
+    an AddonInfo record.
     """
     
-    try:
-        size = addonSoup.find('span', attrs={'class':'C-b-p-D-Xe h-C-b-p-D-za'}).text.strip()
-        return size
-    except:
-        return None
-        
-def extract_version(addonSoup):
-    """
-    This function will return the version of the addon in addon page (string).
-    If it cannot find that version number, it will return None.
-    """
+    addonInfo = AddonInfo(addon_name=addonName,
+                          addon_url=addonURL,
+                          search_rank=searchRank,
+                          is_error=False)
     
-    try:
-        version = addonSoup.find('span', attrs={'class':'C-b-p-D-Xe h-C-b-p-D-md'}).text.strip()
-        return version
-    except:
-        return None
-        
-def extract_releaseDate(addonSoup):
-    """
-    This function will return the release date of the addon in addon page. The 
-    result will be a text of that date.
-    If it cannot find that date, it will return None.
-    """
+    # Initiate connection to a specific addon page
+    addonTree = HTMLTree_wrapper(addonURL)
     
-    try:
-        releaseDate = addonSoup.find('span', attrs={'class':'C-b-p-D-Xe h-C-b-p-D-xh-hh'}).text.strip()
-        return releaseDate
-    except:
-        return None
+    if addonTree is not None: # Successful extract page HTML
         
-def extract_numberReview(addonSoup):
-    """
-    This function will return the number of users giving rates to this addon.
-    If it cannot find that number, it will return None.
-    """
-    
-    try:
-        numberReview = int(re.sub('[^0-9]', '', addonSoup.find('span',  attrs={'class':'q-N-nd'}).text.strip()))
-        return numberReview
-    except:
-        return None
-    
-def extract_avgRating(addonSoup):
-    """
-    This function will return the average rating of this addon.
-    If it cannot find that number, it will return None.
-    """
+        # Extract addon information, all fields at once (see addonSchema)
+        addonFields = addonSchema.extract(addonTree)
+        addonInfo.update(addonFields)
+        
+        # A required field is not found, the page layout may have changed
+        if addonSchema.missing(addonFields):
+            addonInfo.is_error = True
+            quarantine_page(addonURL, get_rawHTML(addonURL), 'required field not found')
+        
+    else:
+        addonInfo.is_error = True # Mark error
     
-    try:
-        avgRating = float(addonSoup.find('div', attrs={'class':'rsw-stars'}).get('g:rating_override'))
-        return avgRating
-    except:
-        return None
+    return addonInfo
 
-def extract_authorName(addonSoup):
+def extract_addonInfo_wrapper(addonName, addonURL, searchRank, num_retry=5, delay=10):
     """
-    This function will return the author name from the author extension page.
-    If it cannot find that name, it will return None.
+    This function will try several times to extract the addonInfo.
+    
+    Note: the retries follow the shared retry policy (scraping_utils/retry.py),
+    only transient (network) errors are retried. An extraction error (e.g. the
+    page layout changed) fails at once, the page is saved in the quarantine file.
     """
     
     try:
-        if addonSoup.find('a', attrs={'class':'e-f-y'}) is not None:
-            authorName = addonSoup.find('a', attrs={'class':'e-f-y'}).text.strip()
-        else:
-            authorName = re.sub('offered by', '', addonSoup.find('span', attrs={'class':'e-f-Me'}).text).strip()
-        return authorName
-    except:
-        return None
+        addonInfo = call_with_retry(extract_addonInfo, (addonName, addonURL, searchRank),
+                                    num_retry, delay, key=addonURL)
+        return addonInfo # If no error, end function
         
-def extract_authorHomepage(addonSoup):
-    """
-    This function will return the home page of author from the author extension page.
-    If it cannot find that page url, it will return None.
-    """
+    except Exception as e:
+        print('ERROR extracting addon info:', e)
+        if classify_error(e) == EXTRACTION:
+            quarantine_page(addonURL, get_rawHTML(addonURL), e)
+        else:
+            record_failure(addonURL, e)
     
-    try:
-        authorHomepage = addonSoup.find('a', attrs={'class':'e-f-y'}).get('href')
-        return authorHomepage
-    except:
-        return None
+    # If try many times but failed
+    print('FAILED to extract this addon information.', addonName, addonURL)
+    update_errorLog('FAILED_EXTRACTING_ADDON_INFO' + ' | ' + addonName + ' | ' + addonURL) # Add to log
+    return None
 
-def extract_addonInfo(addonName, addonURL, searchRank):
+def extract_addonItem(addonItem):
     """
-    This function extract all information of an addon page, then return data in
-    a data frame.
+    This function extract information of 1 addon (AddonItem record), run by
+    the detail stage of extract_allAddonInfo.
     """
     
-    activeUser = None
-    size = None
-    version = None
-    releaseDate = None
-    numberReview = None
-    avgRating = None
-    authorName = None
-    authorHomepage = None
-    is_error = False
+    print('Extension', addonItem.search_rank, ':', addonItem.addon_name)
     
-    # Initiate connection to a specific addon page
-    addonSoup = BeautifulSoup_wrapper(addonURL)
+    # Extract addon info
+    addonInfo = extract_addonInfo_wrapper(addonItem.addon_name, addonItem.addon_url, addonItem.search_rank)
     
-    if addonSoup is not None: # Successful extract page HTML
+    if addonInfo is None: # Failed to extract
         
-        # Extract addon information
-        activeUser = extract_activeUser(addonSoup) # Active (daily) users
-        if activeUser is None: is_error = True # All addons have this field
-                                       
-        size = extract_size(addonSoup) # Addon size
-        if size is None: is_error = True # All addons have this field
-                           
-        version = extract_version(addonSoup) # Addon version
-        if version is None: is_error = True # All addons have this field
-                                 
-        releaseDate = extract_releaseDate(addonSoup) # Release date
-        if releaseDate is None: is_error = True # All addons have this field
-                                         
-        numberReview = extract_numberReview(addonSoup) # Number of reviews
-        if numberReview is None: is_error = True # All addons have this field
-                                           
-        avgRating = extract_avgRating(addonSoup) # Average ratings
-        if avgRating is None: is_error = True # All addons have this field
-                                     
-        authorName = extract_authorName(addonSoup) # Auther's name
-        if authorName is None: is_error = True # All addons have this field
-                                       
-        authorHomepage = extract_authorHomepage(addonSoup) # Author's webpage
-        #if authorHomepage is None: is_error = True # Some addons may not have this field
+        # Construct a row to return, mark is_error = True
+        addonInfo = AddonInfo(addon_name=addonItem.addon_name,
+                              addon_url=addonItem.addon_url,
+                              search_rank=addonItem.search_rank,
+                              is_error=True)
         
-    else:
-        is_error = True # Mark error
-
-    # Construct result table
-    addonInfo = pd.DataFrame.from_dict({'addon_name':addonName,
-                                        'addon_url':addonURL,
-                                        'search_rank':searchRank,
-                                        'active_user':activeUser,
-                                        'size':size,
-                                        'version':version,
-                                        'release_date':releaseDate,
-                                        'number_review':numberReview,
-                                        'rating':avgRating,
-                                        'author_name':authorName,
-                                        'author_homepage':authorHomepage,
-                                        'is_error':is_error},
-                                        orient='index').T
-    
-    # Re-arrange columns
-    addonInfo = addonInfo[['addon_name',
-                           'addon_url',
-                           'search_rank',
-                           'active_user',
-                           'size',
-                           'version',
-                           'release_date',
-                           'number_review',
-                           'rating',
-                           'author_name',
-                           'author_homepage',
-                           'is_error']]
+        # Update error log file
+        update_errorLog('ERROR_EXTRACTING_ADDON_INFO' + ' | ' + addonItem.addon_name + ' | ' + addonItem.addon_url)
+    
+    # Copy some columns from the AddonItem
+    addonInfo.platform = addonItem.platform
+    addonInfo.search_term = addonItem.search_term
     
     return addonInfo
 
-def extract_addonInfo_wrapper(addonName, addonURL, searchRank, num_retry=5, delay=10):
+def failed_addonItem(addonItem, error):
     """
-    This function will try several times to extract the addonInfo.
+    This function returns the row of an addon whose extraction raised an error
+    (on_error of the pipeline of extract_allAddonInfo), marked is_error = True.
     """
     
-    count_retry = 0
-    while  count_retry < num_retry:
-        try:
-            addonInfo = extract_addonInfo(addonName, addonURL, searchRank)
-            return addonInfo # If no error, end function
-            
-        except:
-            print('ERROR extracting addon info. Retrying...')
-            count_retry += 1
-            sleep(delay)
-    
-    # If try many times but failed
-    print('FAILED to extract this addon information.', addonName, addonURL)
-    return None
+    record_failure(addonItem.addon_url, error)
+    update_errorLog('FAILED_EXTRACTING_ADDON_INFO' + ' | ' + addonItem.addon_name + ' | ' + addonItem.addon_url)
+    return AddonInfo(addon_name=addonItem.addon_name,
+                     addon_url=addonItem.addon_url,
+                     search_rank=addonItem.search_rank,
+                     is_error=True,
+                     platform=addonItem.platform,
+                     search_term=addonItem.search_term)
 
-def extract_allAddonInfo(addonTb):
+def extract_allAddonInfo(addonItems, sink=None, num_workers=8):
     """
     This function will go to each extension page, then extract all of their
-    information if possible. The result is in data frame format.
+    information if possible. The result is in data frame format, and each row
+    is also written to the output file (sink, see scraping_utils/sinks.py) as
+    soon as it is extracted.
+    
+    Note: addonItems are AddonItem records, e.g. the generator extract_addonList:
+    the scrolling, the extension pages and the output file then run at the
+    same time (scraping_utils/pipeline.py). num_workers extension pages are
+    visited at the same time, the result rows keep the order of addonItems
+    (search_rank order).
     """
     
-    addonInfoTb = pd.DataFrame()
+    addonInfoBuffer = RecordBuffer(AddonInfo) # Result table, built at once at the end
     
-    # Loop through all extension page
-    addonCount = 0
-    for index, row in addonTb.iterrows():
-        
-        addonName = row['addon_name']
-        addonURL = row['addon_url']
-        searchRank = row['search_rank']
+    def write_addonInfo(addonInfo):
+        """
+        This function keeps an extracted row, in search_rank order.
+        """
         
-        addonCount += 1
-        print('Extension', str(addonCount) + '/' + str(addonTb.shape[0]), ':', addonName)
-        
-        # Extract addon info
-        addonInfo = extract_addonInfo_wrapper(addonName, addonURL, searchRank)
-        
-        if addonInfo is not None: # Successful extract
-
-            addonInfoTb = addonInfoTb.append(addonInfo, ignore_index=True)
-        
-        else: # Failed to extract
-            
-            # Construct a table to return, verified = False
-            addonInfo = pd.DataFrame.from_dict({'addon_name':addonName,
-                                                'addon_url':addonURL,
-                                                'search_rank':searchRank,
-                                                'verified':False},
-                                                orient='index').T
-                                                
-            addonInfoTb = addonInfoTb.append(addonInfo, ignore_index=True)
-            
-            # Update error log file
-            update_errorLog('ERROR_EXTRACTING_ADDON_INFO' + ' | ' + addonName + ' | ' + addonURL)
-        
-    # Copy some columns from addonTb
-    addonInfoTb['platform'] = addonTb['platform']
-    addonInfoTb['search_term'] = addonTb['search_term']
-        
-    return addonInfoTb
+        addonInfoBuffer.append(addonInfo)
+        if sink is not None: sink.write(addonInfo)
+    
+    # Search page -> extension pages (several pages at the same time) -> output
+    pipeline = Pipeline(addonItems, [Stage('detail', extract_addonItem, num_workers)],
+                        sink=write_addonInfo, name='Extension pages', on_error=failed_addonItem)
+    pipeline.run()
+    pipeline.print_metrics()
+    
+    return addonInfoBuffer.to_frame()
 
 def verify(addonTb, addonInfoTb):
     """
@@ -482,7 +342,14 @@ if __name__ == '__main__':
     if not os.path.exists('output'): os.makedirs('output')
     
     # Define the search term
-    searchTerm = sys.argv[1] # '12345678'
+    parser = argparse.ArgumentParser(description='Scrape Chrome extensions found by a search term')
+    parser.add_argument('searchTerm', help="extension search term, e.g. 'youtube'")
+    add_fetch_arguments(parser)
+    add_listing_arguments(parser, pagination=False) # 1 page, scrolled
+    args = parser.parse_args()
+    configure_fetch(args)
+    
+    searchTerm = args.searchTerm # '12345678'
     print('Extension search term:', searchTerm)
     
     #--------------------------------------------------------------------------    
@@ -504,31 +371,25 @@ if __name__ == '__main__':
     wait(driver, 10).until(lambda driver: driver.find_element_by_css_selector('.h-Ja-d-Ac.a-u'))
 
     #--------------------------------------------------------------------------
-    # STEP 2. EXTRACT ADDONS' NAMES AND LINKS
+    # STEP 2. EXTRACT ADDONS' NAMES AND LINKS, GO TO EACH ADDON PAGE
     #--------------------------------------------------------------------------
     
-    print("Step 2. Extract all addons' names and links")
-    
-    addonTb = extract_addonList(driver)
-    addonTb['search_term'] = searchTerm
-    addonTb['platform'] = 'Chrome'
-    
-    fileOut = 'output/' + searchTerm + '_Chrome_addonList.csv'
-    addonTb.to_csv(fileOut, index=False, encoding='utf-8')
+    print("Step 2. Extract all addons' names and links, go to each extension page")
+    
+    # The extension pages are visited while the search page is scrolled (the
+    # browser is only used by the scrolling). The rows are written as soon as
+    # they are extracted, the files are complete at the end of the step (the
+    # rows of an interrupted run are kept in the .part files)
+    addonBuffer = RecordBuffer(AddonItem)
+    listFileOut = 'output/' + searchTerm + '_Chrome_addonList.csv'
+    infoFileOut = 'output/' + searchTerm + '_Chrome_addonInfo.csv'
+    with open_sink(listFileOut, AddonItem) as addonSink, open_sink(infoFileOut, AddonInfo) as addonInfoSink:
+        addonItems = tap(extract_addonList(driver, searchTerm, top_k=args.top_k), addonBuffer.append, addonSink.write)
+        addonInfoTb = extract_allAddonInfo(addonItems, addonInfoSink)
+    addonTb = addonBuffer.to_frame()
     driver.quit() # Close browser, no longer need to use selenium
-    
-    #--------------------------------------------------------------------------
-    # STEP 3. GO TO EACH ADDON PAGE, EXTRACT INFORMATION
-    #--------------------------------------------------------------------------
-    
-    print('Step 3. Go to each extension page, extract their information')
-    
-    addonInfoTb = extract_allAddonInfo(addonTb)
     print('Verified:', verify(addonTb, addonInfoTb))
     
-    fileOut = 'output/' + searchTerm + '_Chrome_addonInfo.csv'
-    addonInfoTb.to_csv(fileOut, index=False, encoding='utf-8')
-    
     print()
     
 #------------------------------------------------------------------------------
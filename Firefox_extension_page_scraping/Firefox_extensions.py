@@ -43,22 +43,30 @@ Environment:
 # Libraries
 #------------------------------------------------------------------------------
 
-# Data handling packages
-import pandas as pd
-
 # Web scraping packages
-from bs4 import BeautifulSoup # Web scraping
 from urllib import quote_plus # URL encode
-import urllib2
-from urllib2 import urlopen # Download link
 
 # Other packages
 import os
 import sys
-import re
-from time import sleep
+import argparse
 from datetime import datetime
 
+# Shared scraping packages (repository root folder)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from scraping_utils.parse import BeautifulSoup_wrapper, extract_wrapper, get_rawHTML
+from scraping_utils.extract import Schema, Field, xpath_class, to_int, remove_text
+from scraping_utils.backends import Region
+from scraping_utils.cli import add_fetch_arguments, add_parse_arguments, add_journal_arguments, add_listing_arguments
+from scraping_utils.cli import configure_fetch, configure_parse, configure_journal
+from scraping_utils.pipeline import Pipeline, Stage, tap
+from scraping_utils.pagination import walk_pages, count_pages, PageNotRead, DEFAULT_NUM_WORKERS as DEFAULT_LISTING_WORKERS
+from scraping_utils.records import record_type, RecordBuffer
+from scraping_utils.sinks import open_sink
+from scraping_utils.journal import get_journal, PAGE, DETAIL
+from scraping_utils.retry import call_with_retry
+from scraping_utils.failures import classify_error, quarantine_page, record_failure, EXTRACTION
+
 #------------------------------------------------------------------------------
 # Self-defined functions
 #------------------------------------------------------------------------------
@@ -72,351 +80,272 @@ def update_errorLog(text):
         f.write(str(datetime.now()) + ' : ' + text)
         f.write('\n')
 
-def urlopen_wrapper(url, num_retry=5, delay=10):
-    """
-    Function to open a page, try several times if the page gets stuck
-    """
-    
-    count_retry = 0
-    while  count_retry < num_retry:
-        try:
-            page = urlopen(url, timeout=30)
-            return page # If no error, end function
-            
-        except urllib2.URLError as e:
-            print('ERROR opening url:', e)
-            print('Retrying...')
-            count_retry += 1
-            sleep(delay)
-    
-    # If try many times but failed
-    print('FAILED to open this url.', url)
-    update_errorLog('FAILED_OPENING_URL' + ' | ' + url) # Add to log
-    return None
+# Regions of a search page read by extract_addonsList (the rest of the page is not kept)
+addonListRegions = [Region('div', attrs={'class':'item addon'}),
+                    Region('a', attrs={'class':'button next'})]
 
-def BeautifulSoup_wrapper(url, parser_type='lxml', num_retry=5, delay=10):
-    """
-    This function will try several times to extract the HTML structure of the page
-    """
-    
-    count_retry = 0
-    while count_retry < num_retry:
-        try:
-            page = urlopen_wrapper(url) # Try to open the page
-            soup = BeautifulSoup(page, parser_type) # Parse the page
-            return soup # If no error, end function
-            
-        except:
-            print('ERROR extracting HTML structure. Retrying...')
-            count_retry += 1
-            sleep(delay)
-
-    # If try many time but failed
-    print('FAILED to extract HTML structure.', url)
-    update_errorLog('FAILED_EXTRACTING_HTML' + ' | ' + url) # Add to log
-    return None
+# Row of the extension list (search pages)
+AddonItem = record_type('AddonItem', ['addon_name',
+                                      'addon_url',
+                                      'search_rank',
+                                      'search_term',
+                                      'platform'])
+
+def read_addonsPage(url):
+    """
+    This function will extract the names and links of the extensions of 1
+    search page, and the link of the next page. Return the page record (also
+    written to the journal), or the record of the interrupted run (--resume,
+    see scraping_utils/journal.py). Raise PageNotRead if the page cannot be
+    opened (e.g. past the last page).
+    """
+    
+    journal = get_journal()
+    pageRecord = journal.get(PAGE, url)
+    if pageRecord is not None: return pageRecord # Done by an interrupted run
+    
+    # Extract all extensions' names and links of a page
+    soup = BeautifulSoup_wrapper(url, HTML_PARSER, regions=addonListRegions)
+    if soup is None: raise PageNotRead(url)
+    itemAddonList = soup.findAll('div', attrs={'class':'item addon'}) # This search will include "item addon incompatible"
+    items = [[item.div.h3.a.text.strip(),
+              Firefox_addonPage + item.div.h3.a.get('href')] # Can remove term '/?src=search' if needed
+             for item in itemAddonList]
+    
+    # Look for Next button
+    nextButton = soup.find('a', attrs={'class':'button next'})
+    nextUrl = None if nextButton is None else Firefox_addonPage + nextButton.get('href')
+    
+    pageRecord = {'items':items, 'next':nextUrl}
+    journal.add(PAGE, url, pageRecord)
+    return pageRecord
 
-def extract_addonsList(soup):
+def extract_addonsList(firstPageURL, searchTerm, platform='Firefox', num_workers=DEFAULT_LISTING_WORKERS, top_k=None):
     """
     This function will extract all the name and link of Firefox extensions
-    Input: an BeautifulSoup object of the first extension page
-    Output: data frame contain addons' names and links
+    Input: the url of the first extension page
+    Output: AddonItem records, in search_rank order
     
-    Note: the number of extension pages can be different on different OS system
+    Note: the number of extension pages can be different on different OS system.
+    This function is a generator: the extensions of a page are given as soon as
+    the page is read, so their pages can be visited while the next search pages
+    are read (see extract_allAddonInfo). From page 3, num_workers search pages
+    are read at the same time (&page=3, &page=4..., see
+    scraping_utils/pagination.py). top_k: stop after the first top_k
+    extensions, no page is read after them (None: all).
     """
     
     # Extract all extensions' names and links
     pageCount = 0
-    addonNameList = []
-    addonLinkList = []
-        
-    while True:
-        
-        # Extract all extensions' names and links of a page
-        itemAddonList = soup.findAll('div', attrs={'class':'item addon'}) # This search will include "item addon incompatible"
+    addonSeen = set()
         
-        for item in itemAddonList:
-            addonNameList.append(item.div.h3.a.text.strip())
-            addonLinkList.append(Firefox_addonPage + item.div.h3.a.get('href')) # Can remove term '/?src=search' if needed
+    def count_addonsPages(pageRecord):
+        return count_pages(len(pageRecord['items']), top_k)
+    
+    for pageRecord in walk_pages(firstPageURL, read_addonsPage, count_addonsPages, num_workers):
         
         # Print out to track
         pageCount += 1
-        print('Page', pageCount, '|', len(itemAddonList), 'items extracted')
-        
-        # Look for Next button
-        nextButton = soup.find('a', attrs={'class':'button next'})
-        
-        if nextButton is not None: # Go to next page
-            nextUrl = Firefox_addonPage + nextButton.get('href')
-            soup = BeautifulSoup_wrapper(nextUrl)
-        else: # Stop the while loop
-            break
+        print('Page', pageCount, '|', len(pageRecord['items']), 'items extracted')
         
-    # Construct the data frame results
-    addonTb = pd.DataFrame({'addon_name':pd.Series(addonNameList),
-                            'addon_url':pd.Series(addonLinkList)},
-                            columns=['addon_name', 'addon_url'])
-    
-    # Remove duplicated information, in some website, next page can show some
-    # items from previous pages
-    addonTb = addonTb.drop_duplicates().reset_index(drop=True)
-    
-    # Add search_rank
-    addonTb['search_rank'] = addonTb.index + 1
-    
-    return addonTb
+        for addonName, addonLink in pageRecord['items']:
+            
+            # Remove duplicated information, in some website, next page can
+            # show some items from previous pages
+            if (addonName, addonLink) in addonSeen: continue
+            addonSeen.add((addonName, addonLink))
+            
+            yield AddonItem(addon_name=addonName,
+                            addon_url=addonLink,
+                            search_rank=len(addonSeen),
+                            search_term=searchTerm,
+                            platform=platform)
+            if len(addonSeen) == top_k: return # Top k extensions found
 
-def extract_activeUser(addonSoup):
-    """
-    This function will return the number of active users in an addon page.
-    If it cannot find that number, it will return None.
-    """
-    
-    try:
-        activeUser = int(re.sub('[^0-9]', '', addonSoup.find('div', attrs={'id':'daily-users'}).text.strip()))
-        return activeUser
-    except:
-        return None
-    
-def extract_size(addonSoup):
-    """
-    This function will return the size of the addon in addon page. The size number
-    will be a text with size + size unit (e.g. KiB, MB, etc.)
-    If it cannot find that number, it will return None.
-    """
-    
-    try:
-        size = addonSoup.find('span', attrs={'class':'filesize'}).text.strip()
-        return size
-    except:
-        return None
-    
-def extract_version(addonSoup):
-    """
-    This function will return the version of the addon in addon page. The result
-    will be a text of version number.
-    If it cannot find that text, it will return None.
-    """
-    
-    try:
-        version = re.sub('Version', '', addonSoup.find('div', attrs={'class':'version item'}).div.h3.a.text).strip()
-        return version
-    except:
-        return None
-        
-def extract_releaseDate(addonSoup):
-    """
-    This function will return the release date of the addon in addon page. The 
-    result will be a text of that date.
-    If it cannot find that date, it will return None.
-    """
-    
-    try:
-        versionItem = addonSoup.find('div', attrs={'class':'version item'})
-        releaseDate = versionItem.find('span', attrs={'class':'meta'}).time.get('datetime')
-        return releaseDate
-    except:
-        return None
+# Fields of an addon page (required: all addons have this field)
+addonSchema = Schema([
+    Field('active_user', "//div[@id='daily-users']", convert=to_int), # Some addons may not have this field
+    Field('size', "//span[%s]" % xpath_class('filesize'), required=True),
+    Field('version', "//div[@class='version item']/div/h3/a", convert=remove_text('Version'), required=True),
+    Field('release_date', "//div[@class='version item']//span[%s]/time" % xpath_class('meta'),
+          attr='datetime', required=True),
+    Field('number_review', "//span[@itemprop='ratingCount']", convert=to_int, required=True),
+    Field('rating', "//meta[@itemprop='ratingValue']", attr='content', convert=float), # Some addons may not have this field
+    Field('author_url', "//*[%s]/a" % xpath_class('author'), attr='href')])
 
-def extract_numberReview(addonSoup):
-    """
-    This function will return the number of users giving rates to this addon.
-    If it cannot find that number, it will return None.
-    """
-    
-    try:
-        numberReview = int(re.sub('[^0-9]', '', addonSoup.find('span',  attrs={'itemprop':'ratingCount'}).text.strip()))
-        return numberReview
-    except:
-        return None
+# Fields of the author page (some addons may not have these fields)
+authorSchema = Schema([
+    Field('author_name', "//table[@class='person-info']//*[normalize-space()='Name']/following-sibling::*[1]"),
+    Field('author_homepage', "//table[@class='person-info']//*[normalize-space()='Homepage']/following-sibling::*[1]")])
 
-def extract_avgRating(addonSoup):
+def extract_addonPage(addonTree):
     """
-    This function will return the average rating of this addon.
-    If it cannot find that number, it will return None.
+    Fields of an addon page (run by the parse pool, see parsepool.py).
     """
     
-    try:
-        avgRating = float(addonSoup.find('meta', attrs={'itemprop':'ratingValue'}).get('content'))
-        return avgRating
-    except:
-        return None
+    return addonSchema.extract(addonTree.element)
 
-def extract_authorName(addonSoup):
+def extract_authorPage(authorTree):
     """
-    This function will return the author name from the author extension page.
-    If it cannot find that name, it will return None.
+    Fields of an author page (run by the parse pool, see parsepool.py).
     """
     
-    try:
-        # Get the extension URL of the author of the current extension page
-        authorURL = Firefox_addonPage + addonSoup.find(attrs={'class':'author'}).a.get('href')
-        authorSoup = BeautifulSoup_wrapper(authorURL)
-        
-        # Find author's information
-        authorTb = authorSoup.find('table', attrs={'class':'person-info'}) # Get the table of information
-        authorName = authorTb.find(text='Name').next.next.text.strip()
-        return authorName
-    except:
-        return None
+    return authorSchema.extract(authorTree.element)
 
-def extract_authorHomepage(addonSoup):
-    """
-    This function will return the home page of author from the author extension page.
-    If it cannot find that page url, it will return None.
-    """
-    
-    try:
-        # Get the extension URL of the author of the current extension page
-        authorURL = Firefox_addonPage + addonSoup.find(attrs={'class':'author'}).a.get('href')
-        authorSoup = BeautifulSoup_wrapper(authorURL)
-        
-        # Find author's information
-        authorTb = authorSoup.find('table', attrs={'class':'person-info'}) # Get the table of information
-        authorHomepage = authorTb.find(text='Homepage').next.next.text.strip()
-        return authorHomepage
-    except:
-        return None
+# Row of the addon information table
+AddonInfo = record_type('AddonInfo', ['addon_name',
+                                      'addon_url',
+                                      'search_rank',
+                                      'active_user',
+                                      'size',
+                                      'version',
+                                      'release_date',
+                                      'number_review',
+                                      'rating',
+                                      'author_name',
+                                      'author_homepage',
+                                      'is_error',
+                                      'platform', # Copied from the AddonItem
+                                      'search_term'])
 
 def extract_addonInfo(addonName, addonURL, searchRank):
     """
     This function extract all information of an addon page, then return data in
-    a data frame.
+    an AddonInfo record.
     """
     
-    activeUser = None
-    size = None
-    version = None
-    releaseDate = None
-    numberReview = None
-    avgRating = None
-    authorName = None
-    authorHomepage = None
-    is_error = False
+    addonInfo = AddonInfo(addon_name=addonName,
+                          addon_url=addonURL,
+                          search_rank=searchRank,
+                          is_error=False)
     
-    # Initiate connection to a specific addon page
-    addonSoup = BeautifulSoup_wrapper(addonURL)
+    # Open a specific addon page, extract addon information, all fields at
+    # once (see addonSchema)
+    addonRecord = extract_wrapper(addonURL, extract_addonPage, 'lxml.html')
     
-    if addonSoup is not None: # Successful extract page HTML
+    if addonRecord is not None: # Successful extract page HTML
+        
+        # Author's name and webpage, in the author extension page
+        authorURL = addonRecord.pop('author_url')
+        addonInfo.update(addonRecord)
+        if authorURL is not None:
+            authorRecord = extract_wrapper(Firefox_addonPage + authorURL, extract_authorPage, 'lxml.html')
+            if authorRecord is not None: addonInfo.update(authorRecord)
         
-        # Extract addon information
-        activeUser = extract_activeUser(addonSoup) # Active (daily) users
-        #if activeUser is None: is_error = True # Some addons may not have this field
-                                       
-        size = extract_size(addonSoup) # Addon size
-        if size is None: is_error = True # All addons have this field
-                           
-        version = extract_version(addonSoup) # Addon version
-        if version is None: is_error = True # All addons have this field
-                                 
-        releaseDate = extract_releaseDate(addonSoup) # Release date
-        if releaseDate is None: is_error = True # All addons have this field
-                                         
-        numberReview = extract_numberReview(addonSoup) # Number of reviews
-        if numberReview is None: is_error = True # All addons have this field
-                                           
-        avgRating = extract_avgRating(addonSoup) # Average ratings
-        #if avgRating is None: is_error = True # Some addons may not have this field
-                                     
-        authorName = extract_authorName(addonSoup) # Auther's name
-        #if authorName is None: is_error = True # Some addons may not have this field
-                                       
-        authorHomepage = extract_authorHomepage(addonSoup) # Author's webpage
-        #if authorHomepage is None: is_error = True # Some addons may not have this field
+        # A required field is not found, the page layout may have changed
+        if addonSchema.missing(addonRecord):
+            addonInfo.is_error = True
+            quarantine_page(addonURL, get_rawHTML(addonURL), 'required field not found')
         
     else:
-        is_error = True # Mark error
-
-    # Construct result table
-    addonInfo = pd.DataFrame.from_dict({'addon_name':addonName,
-                                        'addon_url':addonURL,
-                                        'search_rank':searchRank,
-                                        'active_user':activeUser,
-                                        'size':size,
-                                        'version':version,
-                                        'release_date':releaseDate,
-                                        'number_review':numberReview,
-                                        'rating':avgRating,
-                                        'author_name':authorName,
-                                        'author_homepage':authorHomepage,
-                                        'is_error':is_error},
-                                        orient='index').T
-    
-    # Re-arrange columns
-    addonInfo = addonInfo[['addon_name',
-                           'addon_url',
-                           'search_rank',
-                           'active_user',
-                           'size',
-                           'version',
-                           'release_date',
-                           'number_review',
-                           'rating',
-                           'author_name',
-                           'author_homepage',
-                           'is_error']]
+        addonInfo.is_error = True # Mark error
     
     return addonInfo
 
 def extract_addonInfo_wrapper(addonName, addonURL, searchRank, num_retry=5, delay=10):
     """
     This function will try several times to extract the addonInfo.
+    
+    Note: the retries follow the shared retry policy (scraping_utils/retry.py),
+    only transient (network) errors are retried. An extraction error (e.g. the
+    page layout changed) fails at once, the page is saved in the quarantine file.
     """
     
-    count_retry = 0
-    while  count_retry < num_retry:
-        try:
-            addonInfo = extract_addonInfo(addonName, addonURL, searchRank)
-            return addonInfo # If no error, end function
-            
-        except:
-            print('ERROR extracting addon info. Retrying...')
-            count_retry += 1
-            sleep(delay)
+    try:
+        addonInfo = call_with_retry(extract_addonInfo, (addonName, addonURL, searchRank),
+                                    num_retry, delay, key=addonURL)
+        return addonInfo # If no error, end function
+        
+    except Exception as e:
+        print('ERROR extracting addon info:', e)
+        if classify_error(e) == EXTRACTION:
+            quarantine_page(addonURL, get_rawHTML(addonURL), e)
+        else:
+            record_failure(addonURL, e)
     
     # If try many times but failed
     print('FAILED to extract this addon information.', addonName, addonURL)
     update_errorLog('FAILED_EXTRACTING_ADDON_INFO' + ' | ' + addonName + ' | ' + addonURL) # Add to log
     return None
 
-def extract_allAddonInfo(addonTb):
+def extract_addonItem(addonItem):
+    """
+    This function extract information of 1 addon (AddonItem record), run by
+    the detail stage of extract_allAddonInfo.
+    """
+    
+    print('Extension', addonItem.search_rank, ':', addonItem.addon_name)
+    
+    # Done by an interrupted run
+    journal = get_journal()
+    addonRecord = journal.get(DETAIL, addonItem.addon_url)
+    if addonRecord is not None: return AddonInfo(**addonRecord)
+    
+    # Extract addon info
+    addonInfo = extract_addonInfo_wrapper(addonItem.addon_name, addonItem.addon_url, addonItem.search_rank)
+    
+    if addonInfo is None: # Failed to extract addon info
+        # Construct a row to return, mark is_error = True
+        addonInfo = AddonInfo(addon_name=addonItem.addon_name,
+                              addon_url=addonItem.addon_url,
+                              search_rank=addonItem.search_rank,
+                              is_error=True)
+    
+    # Copy some columns from the AddonItem
+    addonInfo.platform = addonItem.platform
+    addonInfo.search_term = addonItem.search_term
+    
+    if not addonInfo.is_error: journal.add(DETAIL, addonItem.addon_url, addonInfo)
+    
+    return addonInfo
+
+def failed_addonItem(addonItem, error):
+    """
+    This function returns the row of an addon whose extraction raised an error
+    (on_error of the pipeline of extract_allAddonInfo), marked is_error = True.
+    """
+    
+    record_failure(addonItem.addon_url, error)
+    update_errorLog('FAILED_EXTRACTING_ADDON_INFO' + ' | ' + addonItem.addon_name + ' | ' + addonItem.addon_url)
+    return AddonInfo(addon_name=addonItem.addon_name,
+                     addon_url=addonItem.addon_url,
+                     search_rank=addonItem.search_rank,
+                     is_error=True,
+                     platform=addonItem.platform,
+                     search_term=addonItem.search_term)
+
+def extract_allAddonInfo(addonItems, sink=None, num_workers=8):
     """
     This function will go to each extension page, then extract all of their
-    information if possible. The result is in data frame format.
+    information if possible. The result is in data frame format, and each row
+    is also written to the output file (sink, see scraping_utils/sinks.py) as
+    soon as it is extracted.
+    
+    Note: addonItems are AddonItem records, e.g. the generator extract_addonsList:
+    the search pages, the extension pages and the output file then run at the
+    same time (scraping_utils/pipeline.py). num_workers extension pages are
+    visited at the same time, the result rows keep the order of addonItems
+    (search_rank order). The pages are parsed by the parse pool
+    (--parse-workers processes).
     """
     
-    addonInfoTb = pd.DataFrame()
+    addonInfoBuffer = RecordBuffer(AddonInfo) # Result table, built at once at the end
     
-    # Loop through all extension page
-    addonCount = 0
-    for index, row in addonTb.iterrows():
-        
-        addonName = row['addon_name']
-        addonURL = row['addon_url']
-        searchRank = row['search_rank']
-        
-        addonCount += 1
-        print('Extension', str(addonCount) + '/' + str(addonTb.shape[0]), ':', addonName)
-        
-        # Extract addon info
-        addonInfo = extract_addonInfo_wrapper(addonName, addonURL, searchRank)
-        
-        if addonInfo is None: # Failed to extract addon info
-            # Construct a table to return, mark is_error = True
-            addonInfo = pd.DataFrame.from_dict({'addon_name':addonName,
-                                                'addon_url':addonURL,
-                                                'search_rank':searchRank,
-                                                'is_error':True},
-                                                orient='index').T                                               
-        
-        # Add new row to the result table
-        addonInfoTb = addonInfoTb.append(addonInfo, ignore_index=True)
+    def write_addonInfo(addonInfo):
+        """
+        This function keeps an extracted row, in search_rank order.
+        """
         
-    # Copy some columns from addonTb
-    addonInfoTb['platform'] = addonTb['platform']
-    addonInfoTb['search_term'] = addonTb['search_term']
-        
-    return addonInfoTb
+        addonInfoBuffer.append(addonInfo)
+        if sink is not None: sink.write(addonInfo)
+    
+    # Search pages -> extension pages (several pages at the same time) -> output
+    pipeline = Pipeline(addonItems, [Stage('detail', extract_addonItem, num_workers)],
+                        sink=write_addonInfo, name='Extension pages', on_error=failed_addonItem)
+    pipeline.run()
+    pipeline.print_metrics()
+    
+    return addonInfoBuffer.to_frame()
 
 def verify(addonTb, addonInfoTb):
     """
@@ -450,9 +379,23 @@ if __name__ == '__main__':
     if not os.path.exists('output'): os.makedirs('output')
     
     # Search term identify
-    searchTerm = sys.argv[1] # 'youtube'
+    parser = argparse.ArgumentParser(description='Scrape Firefox extensions found by a search term')
+    parser.add_argument('searchTerm', help="extension search term, e.g. 'youtube'")
+    add_fetch_arguments(parser)
+    add_parse_arguments(parser, ['selectolax', 'lxml.html'], parse_pool=True) # Fastest parsers for this site (benchmarks/parser_benchmark.py)
+    add_journal_arguments(parser)
+    add_listing_arguments(parser)
+    args = parser.parse_args()
+    configure_parse(args) # Parse worker processes, started before the downloads
+    configure_fetch(args)
+    HTML_PARSER = args.parser # Parser backend of BeautifulSoup_wrapper
+    
+    searchTerm = args.searchTerm # 'youtube'
     print('Extension search term:', searchTerm)
     
+    # Journal of the run, read again by --resume after a crash
+    configure_journal(args, 'output/' + searchTerm + '_Firefox_journal.jsonl')
+    
     #--------------------------------------------------------------------------    
     # STEP 1. INITIATE CONNECTION
     #--------------------------------------------------------------------------
@@ -463,35 +406,29 @@ if __name__ == '__main__':
     Firefox_addonPage = "https://addons.mozilla.org"
     Firefox_searchURL = "https://addons.mozilla.org/en-US/firefox/search/?q="
     
-    # Try to open the page and extract the HTML structure
+    # First search page, opened by extract_addonsList
     url = Firefox_searchURL + quote_plus(searchTerm)
-    soup = BeautifulSoup_wrapper(url)
-    
-    #--------------------------------------------------------------------------
-    # STEP 2. EXTRACT ADDONS' NAMES AND LINKS
-    #--------------------------------------------------------------------------
-    
-    print("Step 2. Extract all addons' names and links")
-    
-    addonTb = extract_addonsList(soup)
-    addonTb['search_term'] = searchTerm
-    addonTb['platform'] = 'Firefox'
-    
-    fileOut = 'output/' + searchTerm + '_Firefox_addonList.csv'
-    addonTb.to_csv(fileOut, index=False, encoding='utf-8')
     
     #--------------------------------------------------------------------------
-    # STEP 3. GO TO EACH ADDON PAGE, EXTRACT INFORMATION
+    # STEP 2. EXTRACT ADDONS' NAMES AND LINKS, GO TO EACH ADDON PAGE
     #--------------------------------------------------------------------------
     
-    print('Step 3. Go to each extension page, extract their information')
-    
-    addonInfoTb = extract_allAddonInfo(addonTb)
+    print("Step 2. Extract all addons' names and links, go to each extension page")
+    
+    # The extension pages are visited as soon as their search page is read.
+    # The rows are written as soon as they are extracted, the files are
+    # complete at the end of the step (the rows of an interrupted run are kept
+    # in the .part files)
+    addonBuffer = RecordBuffer(AddonItem)
+    listFileOut = 'output/' + searchTerm + '_Firefox_addonList.csv'
+    infoFileOut = 'output/' + searchTerm + '_Firefox_addonInfo.csv'
+    with open_sink(listFileOut, AddonItem) as addonSink, open_sink(infoFileOut, AddonInfo) as addonInfoSink:
+        addonItems = tap(extract_addonsList(url, searchTerm, num_workers=args.listing_workers, top_k=args.top_k),
+                         addonBuffer.append, addonSink.write)
+        addonInfoTb = extract_allAddonInfo(addonItems, addonInfoSink)
+    addonTb = addonBuffer.to_frame()
     print('Verified:', verify(addonTb, addonInfoTb))
     
-    fileOut = 'output/' + searchTerm + '_Firefox_addonInfo.csv'
-    addonInfoTb.to_csv(fileOut, index=False, encoding='utf-8')
-    
     print()
                                         
 #------------------------------------------------------------------------------
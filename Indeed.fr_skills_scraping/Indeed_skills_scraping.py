@@ -52,15 +52,8 @@ Environment:
 # Initiating
 #------------------------------------------------------------------------------
 
-# Data handling packages
-import pandas as pd
-
 # Web scraping packages
-from bs4 import BeautifulSoup # Web scraping
-from bs4 import NavigableString
 from urllib import quote_plus
-import urllib2
-from urllib2 import urlopen # Download link
 
 # Text mining packages
 import re
@@ -70,10 +63,24 @@ from nltk.corpus import stopwords
 # Other packages
 import os
 import sys
-from time import sleep
+import argparse
 from datetime import datetime
 import unicodedata
 
+# Shared scraping packages (repository root folder)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from scraping_utils.parse import BeautifulSoup_wrapper, open_page, extract_page
+from scraping_utils.parsepool import get_parsePool
+from scraping_utils.backends import Region, is_text
+from scraping_utils.cli import add_fetch_arguments, add_parse_arguments, add_journal_arguments, add_listing_arguments
+from scraping_utils.cli import configure_fetch, configure_parse, configure_journal
+from scraping_utils.pipeline import Pipeline, Stage, tap
+from scraping_utils.pagination import walk_pages, count_pages, PageNotRead, DEFAULT_NUM_WORKERS as DEFAULT_LISTING_WORKERS
+from scraping_utils.records import record_type
+from scraping_utils.sinks import open_sink, read_jsonl
+from scraping_utils.journal import get_journal, PAGE, DETAIL
+from scraping_utils.failures import record_failure
+
 #------------------------------------------------------------------------------
 # Self-defined functions
 #------------------------------------------------------------------------------
@@ -87,50 +94,6 @@ def update_errorLog(text):
         f.write(str(datetime.now()) + ' : ' + text)
         f.write('\n')
 
-def urlopen_wrapper(url, num_retry=5, delay=10):
-    """
-    Function to open a page, try several times if the page gets stuck
-    """
-    
-    count_retry = 0
-    while  count_retry < num_retry:
-        try:
-            page = urlopen(url, timeout=30)
-            return page # If no error, end function
-            
-        except urllib2.URLError as e:
-            print('ERROR opening url:', e)
-            print('Retrying...')
-            count_retry += 1
-            sleep(delay)
-    
-    # If try many times but failed
-    print('FAILED to open this url.', url)
-    update_errorLog('FAILED_OPENING_URL' + ' | ' + url) # Add to log
-    return None
-
-def BeautifulSoup_wrapper(url, parser_type='lxml', num_retry=5, delay=10):
-    """
-    This function will try several times to extract the HTML structure of the page
-    """
-    
-    count_retry = 0
-    while count_retry < num_retry:
-        try:
-            page = urlopen_wrapper(url) # Try to open the page
-            soup = BeautifulSoup(page, parser_type) # Parse the page
-            return soup # If no error, end function
-            
-        except:
-            print('ERROR extracting HTML structure. Retrying...')
-            count_retry += 1
-            sleep(delay)
-
-    # If try many time but failed
-    print('FAILED to extract HTML structure.', url)
-    update_errorLog('FAILED_EXTRACTING_HTML' + ' | ' + url) # Add to log
-    return None
-
 def slugify(string):
     """
     This small function convert a search term (string) to another string that
@@ -144,10 +107,26 @@ def slugify(string):
                 .strip()
                 .lower()))
 
+# Regions of a search page read by extract_jobs, get_nextPageURL and
+# get_total_organicJobs (the rest of the page is not kept)
+jobListRegions = [Region('td', attrs={'id':'resultsCol'}),
+                  Region('div', attrs={'class':'pagination'}),
+                  Region('div', attrs={'id':'searchCount'})]
+
+# Row of the jobs list table
+Job = record_type('Job', ['job_name',
+                          'job_id',
+                          'job_url',
+                          #'original_job_url',
+                          'listing_type',
+                          'company',
+                          'location',
+                          'search_rank']) # Added by extract_allJobs
+
 def extract_jobs(soup):
     """
     This function will extract all the jobs listing in the current page, including
-    sponsored and organic jobs listing. Return a data frame.
+    sponsored and organic jobs listing. Return a list of Job records.
     """
     
     # Get the whole column result of the current page
@@ -157,54 +136,33 @@ def extract_jobs(soup):
     jobsList = resultsColSoup.findAll('div', attrs={'data-jk':not None})
     
     # Loop through the jobs list to extract their infos
-    jobNameList = []
-    jobIdList = []
-    jobURLList = []
-    #originalURLList = []
-    listingTypeList = []
-    companyList = []
-    locationList = []
+    jobs = []
     
     for jobSoup in jobsList:
         
         # Some fields can directly extract
-        jobNameList.append(jobSoup.a.text.strip())
-        jobIdList.append(jobSoup.get('data-jk'))
-        jobURLList.append(IndeedFR_viewJobURL + jobIdList[-1])
-        #originalURLList.append(urlopen_wrapper(IndeedFR_URL + jobSoup.a.get('href')).url)
-        locationList.append(jobSoup.find('span', attrs={'class':'location'}).text.strip())
+        job = Job(job_name=jobSoup.a.text.strip(),
+                  job_id=jobSoup.get('data-jk'))
+        job.job_url = IndeedFR_viewJobURL + job.job_id
+        #job.original_job_url = urlopen_wrapper(IndeedFR_URL + jobSoup.a.get('href')).url
+        job.location = jobSoup.find('span', attrs={'class':'location'}).text.strip()
         
         # Some fields are different between organic and sponsored jobs listing
         listingType = jobSoup.get('data-tn-component')
         if listingType is None: # Sponsored job listing
-            listingTypeList.append('sponsoredJob')
+            job.listing_type = 'sponsoredJob'
         else: # Organic job listing
-            listingTypeList.append(listingType)
+            job.listing_type = listingType
             
         # Some fields can be missing
         try:
-            company = jobSoup.find('span', attrs={'class':'company'}).text.strip()
+            job.company = jobSoup.find('span', attrs={'class':'company'}).text.strip()
         except:
-            company = None
-        companyList.append(company)
-            
-    # Construct result data frame
-    jobsTb = pd.DataFrame({'job_name':pd.Series(jobNameList),
-                           'job_id':pd.Series(jobIdList),
-                           'job_url':pd.Series(jobURLList),
-                           #'original_job_url':pd.Series(originalURLList),
-                           'listing_type':pd.Series(listingTypeList),
-                           'company':pd.Series(companyList),
-                           'location':pd.Series(locationList)},
-                          columns=['job_name',
-                                   'job_id',
-                                   'job_url',
-                                   #'original_job_url',
-                                   'listing_type',
-                                   'company',
-                                   'location'])
-    
-    return jobsTb
+            job.company = None
+        
+        jobs.append(job)
+    
+    return jobs
 
 def get_nextPageURL(soup):
     """
@@ -236,98 +194,196 @@ def get_total_organicJobs(soup):
     except:
         return 0
     
-def extract_allJobs(firstPageURL):
+def read_jobsPage(page_url):
+    """
+    This function will extract all the jobs listing of 1 page, the next button
+    url and the total organic jobs. Return the page record (also written to the
+    journal), or the record of the interrupted run (--resume, see
+    scraping_utils/journal.py). Raise PageNotRead if the page cannot be opened
+    (e.g. past the last page).
+    """
+    
+    journal = get_journal()
+    pageRecord = journal.get(PAGE, page_url)
+    if pageRecord is not None: return pageRecord # Done by an interrupted run
+    
+    # Extract all jobs in the current page, find the next button url
+    soup = BeautifulSoup_wrapper(page_url, HTML_PARSER, regions=jobListRegions)
+    if soup is None: raise PageNotRead(page_url)
+    pageRecord = {'jobs':[list(job.as_tuple()) for job in extract_jobs(soup)],
+                  'next':get_nextPageURL(soup),
+                  'total':get_total_organicJobs(soup)}
+    journal.add(PAGE, page_url, pageRecord)
+    return pageRecord
+
+def count_jobPages(pageRecord):
+    """
+    This function will estimate the number of pages from the first page: total
+    organic jobs / organic jobs per page. Return None if the total is not shown.
+    """
+    
+    organicJobs = len([jobValues for jobValues in pageRecord['jobs'] if Job(*jobValues).listing_type == 'organicJob'])
+    if not pageRecord['total'] or organicJobs == 0: return None
+    return -(-pageRecord['total'] // organicJobs) # Rounded up
+
+def extract_allJobs(firstPageURL, num_workers=DEFAULT_LISTING_WORKERS, top_k=None):
     """
     This function will go to page by page, then extract all the jobs listing in
     that page unitl the end.
-    """
     
-    soup = BeautifulSoup_wrapper(firstPageURL, 'lxml')
-    total_organicJobs = get_total_organicJobs(soup)
+    Note: this function is a generator of Job records (search_rank order): the
+    jobs of a page are given as soon as the page is read, so the job pages can
+    be visited while the next pages are read (see extract_allJobsInfo). From
+    page 3, num_workers pages are read at the same time (&start=20,
+    &start=30..., up to the number of pages of count_jobPages, see
+    scraping_utils/pagination.py). top_k: stop after the first top_k jobs, no
+    page is read after them (None: all).
+    """
     
-    allJobsTb = pd.DataFrame()
+    jobSeen = set()
+    organicJobCount = 0
     pageCount = 0
     
-    while True:
+    def count_neededJobPages(pageRecord):
+        return count_pages(len(pageRecord['jobs']), top_k, count_jobPages(pageRecord))
     
-        # Extract all jobs in the current page
-        jobsTb = extract_jobs(soup)
+    for pageRecord in walk_pages(firstPageURL, read_jobsPage, count_neededJobPages, num_workers):
         
         # Print out to track
         pageCount += 1
-        print('Page', pageCount, '|', len(jobsTb), 'jobs extracted')
-        
-        # Update the results
-        allJobsTb = allJobsTb.append(jobsTb, ignore_index=True)
+        if pageCount == 1: print('Total organic jobs expected:', pageRecord['total'])
+        print('Page', pageCount, '|', len(pageRecord['jobs']), 'jobs extracted')
         
-        # Find the next button url and follow it
-        nextPage_url = get_nextPageURL(soup)
-        if nextPage_url is not None:
-            soup = BeautifulSoup_wrapper(nextPage_url)
-        else:
-            break
+        for jobValues in pageRecord['jobs']:
+            
+            # Remove duplicated information, in some website, next page can
+            # show some items from previous pages
+            job = Job(*jobValues)
+            job.search_rank = None
+            if job.as_tuple() in jobSeen: continue
+            jobSeen.add(job.as_tuple())
+            
+            # Add search rank
+            job.search_rank = len(jobSeen)
+            if job.listing_type == 'organicJob': organicJobCount += 1
+            yield job
+            if len(jobSeen) == top_k: return # Top k jobs found
+    
+    # Verify scrapping process
+    print('Total organic jobs got:', organicJobCount)
+    print('Total jobs got:', len(jobSeen))
+
+# Regions of a job page read by extract_allJobsInfo, the download stops once
+# they are all found (the similar jobs and the footer are not downloaded)
+jobPageRegions = [Region('div', attrs={'data-tn-component':'jobHeader'}, required=True),
+                  Region('span', attrs={'id':'job_summary'}, required=True),
+                  Region('div', attrs={'class':'result-link-bar-container'}, required=True)] # Post date, after the summary
+
+def extract_jobPage(jobPageSoup):
+    """
+    This function extract the detailed information of a job page: job
+    description, job note, job post date-time (run by the parse pool, see
+    parsepool.py).
+    """
     
-    # Remove duplicated information, in some website, next page can show some
-    # items from previous pages
-    allJobsTb = allJobsTb.drop_duplicates().reset_index(drop=True)
+    # Extract main job post
+    jobSummarySoup = jobPageSoup.find('span', attrs={'id':'job_summary', 'class':'summary'})
+    jobPost = jobSummarySoup.text
+    
+    # Extract job posting date
+    infoBoxSoup = jobSummarySoup.find_next_sibling('div', attrs={'class':'result-link-bar-container'}).div
+    postDate = re.sub('il y a', '', infoBoxSoup.find('span', attrs={'class':'date'}).text).strip()
+    
+    # Extract job notes
+    jobHeaderSoup = jobPageSoup.find('div', attrs={'data-tn-component':'jobHeader'})
+    jobNoteSoup = jobHeaderSoup.find(attrs={'class':'location'}).next_sibling # Ignore class company and location
+                                    
+    jobNote = ''
+    while jobNoteSoup is not None: # Loop through all element, ignore NavigableString
+        if not is_text(jobNoteSoup): jobNote = jobNote + jobNoteSoup.text # Extract text
+        jobNoteSoup = jobNoteSoup.next_sibling # Next element
+    jobNote = jobNote.strip()
+    
+    return {'job_description':jobPost, 'job_note':jobNote, 'post_from':postDate}
+
+# Row of the jobs information table
+JobInfo = record_type('JobInfo', list(Job.fields) + ['job_description',
+                                                     'job_note',
+                                                     'post_from',
+                                                     'sraping_date'])
+
+def fetch_jobPage(job):
+    """
+    This function downloads the page of 1 job (fetch stage of
+    extract_allJobsInfo). Return (job, record of the interrupted run, page).
+    """
     
-    # Add search rank
-    allJobsTb['search_rank'] = allJobsTb.index + 1
+    # Done by an interrupted run, not downloaded again
+    jobRecord = get_journal().get(DETAIL, job.job_url)
+    if jobRecord is not None: return job, jobRecord, None
     
-    # Verify scrapping process
-    print('Total organic jobs expected:', total_organicJobs)
-    print('Total organic jobs got:', len(allJobsTb.loc[allJobsTb['listing_type']=='organicJob']))
-    print('Total jobs got:', len(allJobsTb))
+    return job, None, open_page(job.job_url, regions=jobPageRegions, stream=True)
+
+def extract_jobRow(fetchedJob):
+    """
+    This function extract information of 1 job from its page (extract stage of
+    extract_allJobsInfo), return the JobInfo row.
+    """
+    
+    job, jobRecord, jobPage = fetchedJob
+    if jobRecord is not None: return JobInfo(**jobRecord)
+    
+    # Get the job page
+    #testURL = "https://www.indeed.fr/voir-emploi?jk=0a82fdb1b970f45b"
+    #jobPageSoup = BeautifulSoup_wrapper(testURL, 'lxml')
+    jobInfo = extract_page(job.job_url, jobPage, extract_jobPage, HTML_PARSER, jobPageRegions)
     
-    return allJobsTb
+    print('Job', job.search_rank, ':', unicode(job.job_name), '[' + unicode(job.company) + ']')
+    
+    # Construct the result row
+    jobRow = JobInfo(**dict(job.items()))
+    if jobInfo is not None: jobRow.update(jobInfo) # Failed pages have no detailed information
+    jobRow.sraping_date = str(datetime.now())
+    
+    if jobInfo is not None: get_journal().add(DETAIL, job.job_url, jobRow)
+    
+    return jobRow
 
-def extract_allJobsInfo(allJobsTb):
+def failed_jobRow(job, error):
+    """
+    This function returns the row of a job whose extraction raised an error
+    (on_error of the pipeline of extract_allJobsInfo), without detailed
+    information as the failed pages.
+    """
+    
+    record_failure(job.job_url, error)
+    jobRow = JobInfo(**dict(job.items()))
+    jobRow.sraping_date = str(datetime.now())
+    return jobRow
+
+def extract_allJobsInfo(jobs, sink, num_workers=8):
     """
     This function loop through all jobs in the input list, then extract their
     detailed information, e.g. job description, job note, job post date-time...
+    Each JobInfo row is written to the output file (sink, see
+    scraping_utils/sinks.py) as soon as it is extracted, nothing is kept in
+    memory. Return the number of rows written.
+    
+    Note: jobs are Job records, e.g. the generator extract_allJobs. The search
+    pages, the job pages and the output file run at the same time
+    (scraping_utils/pipeline.py): num_workers job pages are downloaded at the
+    same time, and parsed by the parse pool (--parse-workers processes) in
+    another stage, so the downloads do not wait for the parsing. The rows are
+    written in the order of jobs.
     """
-
-    # Loop through each job posting
-    allJobsInfoTb = pd.DataFrame()
-    jobCount = 0
     
-    for index, row in allJobsTb.iterrows():
-        
-        # Get the job page
-        #testURL = "https://www.indeed.fr/voir-emploi?jk=0a82fdb1b970f45b"
-        #jobPageSoup = BeautifulSoup_wrapper(testURL, 'lxml')
-        jobPageSoup = BeautifulSoup_wrapper(row['job_url'], 'lxml')
-        
-        jobCount += 1
-        #if jobCount == 1: break
-        print('Job', str(jobCount) + '/' + str(len(allJobsTb)), ':', unicode(row['job_name']), '[' + unicode(row['company']) + ']')
-        
-        # Extract main job post
-        jobSummarySoup = jobPageSoup.find('span', attrs={'id':'job_summary', 'class':'summary'})
-        jobPost = jobSummarySoup.text
-        
-        # Extract job posting date
-        infoBoxSoup = jobSummarySoup.next_sibling.next_sibling.div
-        postDate = re.sub('il y a', '', infoBoxSoup.find('span', attrs={'class':'date'}).text).strip()
-        
-        # Extract job notes
-        jobHeaderSoup = jobPageSoup.find('div', attrs={'data-tn-component':'jobHeader'})
-        jobNoteSoup = jobHeaderSoup.find(attrs={'class':'location'}).next_sibling # Ignore class company and location
-                                        
-        jobNote = ''
-        while jobNoteSoup is not None: # Loop through all element, ignore NavigableString
-            if not isinstance(jobNoteSoup, NavigableString): jobNote = jobNote + jobNoteSoup.text # Extract text
-            jobNoteSoup = jobNoteSoup.next_sibling # Next element
-        jobNote = jobNote.strip()
+    pipeline = Pipeline(jobs, [Stage('fetch', fetch_jobPage, num_workers),
+                               Stage('extract', extract_jobRow, max(get_parsePool().num_workers, 1))],
+                        sink=sink.write, name='Job pages', on_error=failed_jobRow)
+    pipeline.run()
+    pipeline.print_metrics()
         
-        # Construct result table
-        row['job_description'] = jobPost
-        row['job_note'] = jobNote
-        row['post_from'] = postDate
-        row['sraping_date'] = str(datetime.now())
-        allJobsInfoTb = allJobsInfoTb.append(row, ignore_index=True)
-        
-    return allJobsInfoTb
+    return len(sink)
 
 #------------------------------------------------------------------------------
 # MAIN
@@ -343,10 +399,25 @@ if __name__ == '__main__':
     if not os.path.exists('output'): os.makedirs('output')
     
     # Search term identify
-    jobSearch_name = sys.argv[1] # 'data analyst'
-    jobSearch_location = sys.argv[2] # 'Paris'
+    parser = argparse.ArgumentParser(description='Scrape Indeed.fr job postings')
+    parser.add_argument('jobSearch_name', help="job name, e.g. 'data analyst'")
+    parser.add_argument('jobSearch_location', help="French location, e.g. 'Paris'")
+    add_fetch_arguments(parser)
+    add_parse_arguments(parser, ['selectolax', 'lxml.html'], parse_pool=True) # Fastest parsers for this site (benchmarks/parser_benchmark.py)
+    add_journal_arguments(parser)
+    add_listing_arguments(parser)
+    args = parser.parse_args()
+    HTML_PARSER = args.parser # Parser backend of BeautifulSoup_wrapper
+    configure_parse(args) # Parse worker processes, started before the downloads
+    configure_fetch(args)
+    
+    jobSearch_name = args.jobSearch_name # 'data analyst'
+    jobSearch_location = args.jobSearch_location # 'Paris'
     print('Job search:', jobSearch_name, '|', 'Location:', jobSearch_location)
     
+    # Journal of the run, read again by --resume after a crash
+    configure_journal(args, 'output/' + slugify(jobSearch_name) + '_' + slugify(jobSearch_location) + '_journal.jsonl')
+    
     #--------------------------------------------------------------------------    
     # STEP 1. INITIATE CONNECTION
     #--------------------------------------------------------------------------
@@ -358,29 +429,29 @@ if __name__ == '__main__':
     IndeedFR_jobSearchURL = "https://www.indeed.fr/emplois?q="
     IndeedFR_viewJobURL = "https://www.indeed.fr/voir-emploi?jk="
     
-    # Try to open the page and extract the HTML structure
+    # First search page, read with the next ones in Step 2
     firstPageURL = IndeedFR_jobSearchURL + quote_plus(jobSearch_name) + '&l=' + quote_plus(jobSearch_location)
-    soup = BeautifulSoup_wrapper(firstPageURL)
-    
-    #--------------------------------------------------------------------------
-    # STEP 2. EXTRACT ALL JOBS' BASIC INFORMATION
-    #--------------------------------------------------------------------------
-    
-    print("Step 2. Extract and create a jobs list")
-
-    allJobsTb = extract_allJobs(firstPageURL)
-    fileOut = 'output/' + slugify(jobSearch_name) + '_' + slugify(jobSearch_location) + '_jobList.csv'
-    allJobsTb.to_csv(fileOut, index=False, encoding='utf-8')
     
     #--------------------------------------------------------------------------
-    # STEP 3. LOOP THROUGH EACH JOB, EXTRACT ALL JOBS' FULL INFORMATION
+    # STEP 2. EXTRACT THE JOBS LIST, LOOP THROUGH EACH JOB, EXTRACT ALL JOBS'
+    # FULL INFORMATION
     #--------------------------------------------------------------------------
     
-    print("Step 3. Loop through all jobs and extract detailed information")
-    
-    allJobsInfoTb = extract_allJobsInfo(allJobsTb)
-    fileOut = 'output/' + slugify(jobSearch_name) + '_' + slugify(jobSearch_location) + '_jobsInfo.pkl'
-    allJobsInfoTb.to_pickle(fileOut) # DO NOT save to CSV (or TSV), text field will create a big mess
+    print("Step 2. Extract a jobs list, loop through all jobs and extract detailed information")
+    
+    # The job pages are visited as soon as their search page is read. The
+    # rows are written as soon as they are extracted, the detailed information
+    # in JSON lines (DO NOT save to CSV (or TSV), text field will create a big
+    # mess). The rows of an interrupted run are kept in the .part files.
+    listFileOut = 'output/' + slugify(jobSearch_name) + '_' + slugify(jobSearch_location) + '_jobList.csv'
+    fileOut = 'output/' + slugify(jobSearch_name) + '_' + slugify(jobSearch_location) + '_jobsInfo.jsonl'
+    with open_sink(listFileOut, Job) as allJobsSink, open_sink(fileOut, JobInfo) as allJobsInfoSink:
+        jobs = tap(extract_allJobs(firstPageURL, args.listing_workers, args.top_k), allJobsSink.write)
+        extract_allJobsInfo(jobs, allJobsInfoSink)
+    
+    # Data frame read by Job_description_mining.py
+    allJobsInfoTb = read_jsonl(fileOut, JobInfo)
+    allJobsInfoTb.to_pickle(re.sub(r'\.jsonl$', '.pkl', fileOut))
     
     print()
     
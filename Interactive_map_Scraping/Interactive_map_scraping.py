@@ -38,8 +38,6 @@ import pandas as pd
 
 # Web scraping packages
 from bs4 import BeautifulSoup # Web scraping
-import urllib2
-from urllib2 import urlopen # Download link
 
 # If selenium does not run, downgrade it: pip install selenium==2.53.6
 from selenium import webdriver as web # Open a web browser
@@ -52,10 +50,16 @@ from selenium.webdriver.common.keys import Keys
 
 # Other packages
 import os
+import sys
 import numpy as np
 from time import sleep
 from datetime import datetime
 
+# Shared scraping packages (repository root folder)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from scraping_utils.fetch import urlopen_wrapper
+from scraping_utils.browser import click_wrapper
+
 #------------------------------------------------------------------------------
 # Self-defined functions
 #------------------------------------------------------------------------------
@@ -69,49 +73,6 @@ def update_errorLog(text):
         f.write(str(datetime.now()) + ' : ' + text)
         f.write('\n')
 
-def urlopen_wrapper(url, num_retry=5, delay=10):
-    """
-    Function to open a page, try several times if the page gets stuck
-    """
-    
-    count_retry = 0
-    while  count_retry < num_retry:
-        try:
-            page = urlopen(url, timeout=30)
-            return page # If no error, end function
-            
-        except urllib2.URLError as e:
-            print('ERROR opening url:', e)
-            print('Retrying...')
-            count_retry += 1
-            sleep(delay)
-    
-    # If try many times but failed
-    print('FAILED to open this url.', url)
-    update_errorLog('FAILED_OPENING_URL' + ' | ' + url) # Add to log
-    return None
-
-def click_wrapper(object_click, num_retry=5, delay=5):    
-    """
-    Function to simulate a click, try several times if cannot click
-    """
-    
-    count_retry = 0
-    while  count_retry < num_retry:
-        try:
-            object_click.click()
-            #print('Click successful!')
-            return True
-            
-        except:
-            print('ERROR clicking. Retrying...')
-            count_retry += 1
-            sleep(delay)
-    
-    # If try many time but failed
-    print('FAILED to click on this object.')
-    update_errorLog('FAILED_CLICKING_OBJECT' + ' | ' + object_click.text.strip()) # Add to log
-    return False
             
 def extract_exhibitorInfo(areaExhibitorList):
     """
@@ -10,6 +10,13 @@ from __future__ import print_function, division
 #------------------------------------------------------------------------------
 
 import os
+import sys
+
+# Shared scraping packages (repository root folder)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from scraping_utils.fetch import urlopen_wrapper as shared_urlopen_wrapper
+from scraping_utils.browser import click_wrapper as shared_click_wrapper
+
 os.chdir('D:\\Userfiles\\mphan\\Desktop\\Lazada')
 
 # Essential packages
@@ -19,8 +26,6 @@ from time import time, sleep
 
 # Other functional packages
 from bs4 import BeautifulSoup # Web scrapping
-import urllib2
-from urllib2 import urlopen # Download link
 from urlparse import urlparse # Parse URL
 from datetime import datetime # Parse date time
 
@@ -38,36 +43,15 @@ def domain_extract(url):
 
 # Function to open a page, try several times if the page gets stuck
 def urlopen_wrapper(url, num_retry=3, delay=30):
-    count_retry = 0
-    while  count_retry < num_retry:
-        try:
-            page = urlopen(url, timeout=30)
-            print('Page load sucessful!')
-            break # If no error, exit while loop
-            
-        except urllib2.URLError as e:
-            print('Page load error:', e)
-            print('Waiting and retrying...')
-            count_retry += 1
-            sleep(delay)
-    
+    page = shared_urlopen_wrapper(url, num_retry, delay)
+    if page is not None: print('Page load sucessful!')
     return page
 
 # Function to simulate a click, try several times if cannot click
 def click_wrapper(object_click, num_retry=5, delay=5):    
-    count_retry = 0
-    while  count_retry < num_retry:
-        try:
-            object_click.click()
-            print('Click successful!')
-            return True
-            
-        except:
-            print('Click failed. Retrying...')
-            count_retry += 1
-            sleep(delay)
-    
-    return False
+    clicked = shared_click_wrapper(object_click, num_retry, delay)
+    if clicked: print('Click successful!')
+    return clicked
        
 # Function to scrap a single product page, return product ratings, commments, etc.
 def scrap_product_reviews(product_url):
@@ -154,18 +138,16 @@ def scrap_product_reviews(product_url):
     
     return df
     
-# Function to scrap a single product page, return product ratings, commments, etc.
-def scrap_product_links(category_url):
+# Function to scrap the product links of a category, page by page. Generator of
+# [product_name, product_url], given as soon as their page is read. top_k: stop
+# after the first top_k products, the next pages are not read (None: all)
+def scrap_product_links(category_url, top_k=None):
     
     page = urlopen_wrapper(category_url)
-    soup = BeautifulSoup(page, "html.parser")
+    soup = BeautifulSoup(page.body, "html.parser", from_encoding=page.encoding) # Encoding of the host, not detected again
     
-    # Find product grid
-    product_grid_block = soup.find('div', attrs={'class':'component component-product_list product_list grid toclear'})
-    product_card_list = product_grid_block.find_all('div', attrs={'class':'product-card'})
-
     finish = False
-    product_list = []
+    product_seen = set() # Products shown again by a next page
     page_count = 0
     
     while finish != True:
@@ -173,6 +155,10 @@ def scrap_product_links(category_url):
         page_count += 1
         print('Page', page_count)
         
+        # Find product grid of the current page
+        product_grid_block = soup.find('div', attrs={'class':'component component-product_list product_list grid toclear'})
+        product_card_list = product_grid_block.find_all('div', attrs={'class':'product-card'})
+        
         # Get all product information in the current page
         for product_card in product_card_list:
             
@@ -183,21 +169,20 @@ def scrap_product_links(category_url):
             product_description_block = product_card.find('div', attrs={'class':'product-card__description'})
             product_name = product_description_block.next.next.text.strip()
             
-            product_list.append([product_name, product_url])
+            if product_url in product_seen: continue
+            product_seen.add(product_url)
+            yield [product_name, product_url]
+            if len(product_seen) == top_k: return # Top k products found
 
         # Find next button and click     
         next_button = soup.find('a', attrs={'class':'c-paging__next-link','title':'next page'})
         if next_button != None:
             next_page = next_button['href'] # Next page url
             page = urlopen_wrapper(next_page)
-            soup = BeautifulSoup(page, "html.parser") # Get new page content
+            soup = BeautifulSoup(page.body, "html.parser", from_encoding=page.encoding) # Get new page content
             finish = False
         else:
             finish = True
-
-    df = pd.DataFrame(product_list, columns=['product_name', 'product_url'])
-    
-    return df
                
 #------------------------------------------------------------------------------
 # MAIN
@@ -213,22 +198,25 @@ galaxy_j3_review = scrap_product_reviews(product_url)
 
 # Category: Dien Thoai Di Dong
 category_url = 'http://www.lazada.vn/dien-thoai-di-dong/'
-products_links = scrap_product_links(category_url)
+top_k = None # Only the first products of the category, e.g. 50 (None: all)
+products_links = pd.DataFrame(list(scrap_product_links(category_url, top_k)),
+                              columns=['product_name', 'product_url'])
 
 products_links.to_json('products_links.json', orient='records') # Save to JSON
 products_links['product_name'] = products_links['product_name'].str.replace(r'[\n\r\t]', ' ')
 products_links.to_csv('products_links.tsv', sep='\t', encoding='utf-8', index=False)
 
 # Get all products reviews in categorical Dien Thoai Di Dong
-all_products_reviews = pd.DataFrame()
+all_products_reviews_list = [] # Data frames, concatenated once at the end
 for idx, row in products_links.iterrows():
     product_url = row['product_url']
     product_reviews = scrap_product_reviews(product_url)
-    all_products_reviews = all_products_reviews.append(product_reviews)
+    all_products_reviews_list.append(product_reviews)
     
     file_json_out = '.\\reviews_json\\' + str(idx) + '.json'
     product_reviews.to_json(file_json_out, orient='records')
 
+all_products_reviews = pd.concat(all_products_reviews_list) if all_products_reviews_list else pd.DataFrame()
 all_products_reviews.to_json('products_reviews.json', orient='records') # Save to JSON
 #all_products_reviews.to_csv('products_reviews.tsv', sep='\t', encoding='utf-8', index=False)
 
@@ -16,11 +16,18 @@ from time import time, sleep
 
 # Other functional packages
 from bs4 import BeautifulSoup, SoupStrainer # Web scrapping
-import urllib2
-from urllib2 import urlopen # Download link
 from urlparse import urlparse # Parse URL
 from datetime import datetime # Parse date time
 
+# Shared scraping packages (repository root folder)
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from scraping_utils.fetch import urlopen_wrapper as shared_urlopen_wrapper
+from scraping_utils.crawl import UrlFrontier, MemoryGuard
+from scraping_utils.records import record_type, RecordBuffer
+from scraping_utils.sinks import open_sink
+
 #------------------------------------------------------------------------------
 # Function to do web scrapping
 #------------------------------------------------------------------------------
@@ -33,35 +40,23 @@ def domain_extract(url):
 
 # Function to open a page, try several times if the page gets stuck
 def urlopen_wrapper(url, num_retry=3, delay=30):
-    count_retry = 0
-    while  count_retry < num_retry:
-        try:
-            page = urlopen(url, timeout=30)
-            break # If no error, exit while loop
-            
-        except urllib2.URLError as e:
-            print('Page load error:', e)
-            print('Waiting and retrying...')
-            count_retry += 1
-            sleep(delay)
-    
-    return page
+    return shared_urlopen_wrapper(url, num_retry, delay)
 
 # Function to get all the news' links in a home page    
 def homepage_initiate(url_homepage):
 
     #url_homepage = 'http://tuoitre.vn/'
-    news_df = pd.DataFrame()
+    news_buffer = RecordBuffer(['url', 'title'])
     
-    # Try to open the page
-    try:
-        page = urlopen_wrapper(url_homepage)
-    except:
+    # Try to open the page (None if it cannot be opened)
+    page = urlopen_wrapper(url_homepage)
+    if page is None:
         print('Page load failed. Webscrapping stopped.')
-        return news_df # Blank data frame
+        return news_buffer.to_frame() # Blank data frame
         
-    # Parse the page
-    soup = BeautifulSoup(page, "html.parser")
+    # Parse the page, only the links are read
+    soup = BeautifulSoup(page.body, "html.parser", parse_only=SoupStrainer('a', href=True),
+                         from_encoding=page.encoding) # Encoding of the host, not detected again
     
     # Extract all news URL in the home page
     count = 0
@@ -74,9 +69,11 @@ def homepage_initiate(url_homepage):
             news_url = a.get('href')
             news_title = a.get('title')
     
-            news_row = pd.Series({'url':news_url, 'title':news_title})
-            news_df = news_df.append(news_row, ignore_index=True)
+            news_buffer.append(url=news_url, title=news_title)
 
+    soup.decompose() # Free the tree
+
+    news_df = news_buffer.to_frame()
     if len(news_df) != 0:
         news_df = news_df[-news_df['title'].isnull()] # Remove url without title
         news_df = news_df.drop_duplicates('url', keep='first') # Drop duplicated news
@@ -84,12 +81,24 @@ def homepage_initiate(url_homepage):
     
     return news_df 
 
+# Record of a news page, the columns of the news output file
+News = record_type('News', ['url', 'domain', 'status', 'category', 'title', 'date',
+                            'summary', 'content', 'author'])
+
 # Function to scrap a news page (e.g. title, content, date, category, other links...)
 def scrap_news_page(page_url, date_limit=''):
     
     #page_url = 'http://tuoitre.vn/tin/chinh-tri-xa-hoi/20161109/chu-tich-evn-noi-ve-ly-do-de-nghi-dung-du-an-dien-hat-nhan/1216399.html'
     page = urlopen_wrapper(page_url)
-    soup = BeautifulSoup(page, "html.parser")
+    soup = BeautifulSoup(page.body, "html.parser", from_encoding=page.encoding)
+    
+    try:
+        return extract_news_page(soup, page_url, date_limit)
+    finally:
+        soup.decompose() # Free the tree right after the extraction (long crawls)
+
+# Function to extract the information of a news page soup
+def extract_news_page(soup, page_url, date_limit=''):
     
     # Extract news information itself
     mega_menu = soup.find(attrs={'class':'mega-menu'})
@@ -107,10 +116,10 @@ def scrap_news_page(page_url, date_limit=''):
     if date_limit != '':
         date_limit = datetime.strptime(date_limit, '%d/%m/%Y %H:%M')
         if news_date < date_limit: # News date in the past
-            news_body = pd.Series({'url':page_url,
-                                   'domain':domain_extract(page_url),
-                                   'status':'out date'})
-            related_news_df = pd.DataFrame()
+            news_body = News(url=page_url,
+                             domain=domain_extract(page_url),
+                             status='out date')
+            related_news_df = RecordBuffer(['url', 'title']).to_frame()
             return news_body, related_news_df
     
     txt_head = soup.find(attrs={'class':'txt-head'})
@@ -125,18 +134,18 @@ def scrap_news_page(page_url, date_limit=''):
     lower_bar = soup.find(attrs={'class':'wrapper-qt'})
     news_reporter = lower_bar.text.strip() # News reporter's name
     
-    news_body = pd.Series({'category':news_category,
-                           'title':news_title,
-                           'date':news_date,
-                           'summary':news_text_head,
-                           'content':news_content,
-                           'author':news_reporter,
-                           'url':page_url,
-                           'domain':domain_extract(page_url),
-                           'status':'done'})
+    news_body = News(category=news_category,
+                     title=news_title,
+                     date=news_date,
+                     summary=news_text_head,
+                     content=news_content,
+                     author=news_reporter,
+                     url=page_url,
+                     domain=domain_extract(page_url),
+                     status='done')
     
     # Extract all other news url
-    related_news_df = pd.DataFrame()
+    related_news_buffer = RecordBuffer(['url', 'title'])
         
     count = 0
     for a in soup.find_all('a', href=True):
@@ -148,9 +157,9 @@ def scrap_news_page(page_url, date_limit=''):
             news_url = a.get('href')
             news_title = a.get('title')
     
-            news_row = pd.Series({'url':news_url, 'title':news_title})
-            related_news_df = related_news_df.append(news_row, ignore_index=True)
+            related_news_buffer.append(url=news_url, title=news_title)
 
+    related_news_df = related_news_buffer.to_frame()
     if len(related_news_df) != 0:
         related_news_df = related_news_df[-related_news_df['title'].isnull()] # Remove url without title
         related_news_df = related_news_df.drop_duplicates('url', keep='first') # Drop duplicated news
@@ -163,17 +172,17 @@ def scrap_news_page_wrapper(page_url, date_limit=''):
     try:
         news_body, related_news_df = scrap_news_page(page_url, date_limit)
     except:
-        news_body = pd.Series({'url':page_url,
-                               'domain':domain_extract(page_url),
-                               'status':'failed'})
-        related_news_df = pd.DataFrame()
+        news_body = News(url=page_url,
+                         domain=domain_extract(page_url),
+                         status='failed')
+        related_news_df = RecordBuffer(['url', 'title']).to_frame()
     return news_body, related_news_df
 
 # Function to scrap a list of multiple urls    
 def scrap_url_list(url_df, date_limit=''):
     
-    news_list_df = pd.DataFrame()
-    related_url_list_df = pd.DataFrame()
+    news_buffer = RecordBuffer(News)
+    related_url_list = [] # Data frames, concatenated once at the end
     
     count = 0
     for idx, row in url_df.iterrows():
@@ -186,42 +195,77 @@ def scrap_url_list(url_df, date_limit=''):
         news_body, related_news_df = scrap_news_page_wrapper(row['url'], date_limit)
         print(news_body['status'])
         
-        news_list_df = news_list_df.append(news_body, ignore_index=True)
-        related_url_list_df = related_url_list_df.append(related_news_df, ignore_index=True)
+        news_buffer.append(news_body)
+        related_url_list.append(related_news_df)
 
+    news_list_df = news_buffer.to_frame()
+    related_url_list_df = pd.concat(related_url_list, ignore_index=True) if related_url_list else pd.DataFrame()
     if len(related_url_list_df) != 0:
         related_url_list_df = related_url_list_df.drop_duplicates('url', keep='first') # Drop duplicated news
         related_url_list_df.reset_index(drop=True, inplace=True)
     
     return news_list_df, related_url_list_df    
+
+# Function to crawl the news pages from a list of urls, following the related
+# news links, with a fixed memory ceiling: the urls waiting and seen are kept in
+# files, each news is written to the output file as soon as it is scrapped (see
+# scraping_utils/sinks.py), no new link is followed when the memory goes above
+# memory_limit_mb, and the crawl stops when it goes far above it
+def crawl_news(url_df, file_out, date_limit='', max_pages=10000, memory_limit_mb=512):
+    
+    frontier = UrlFrontier(file_out + '.frontier')
+    for idx, row in url_df.iterrows():
+        frontier.add(row['url'], row['title'])
+    
+    guard = MemoryGuard(memory_limit_mb)
+    
+    count = 0
+    with open_sink(file_out, News) as news_sink:
+        
+        while count < max_pages and not guard.stop: # Stop conditions
+            item = frontier.pop()
+            if item is None: break # No new url
+            url, title = item
+            
+            count += 1
+            print(count, '/', max_pages, '|', len(frontier), 'urls waiting')
+            print(title)
+            print(url)
+            
+            news_body, related_news_df = scrap_news_page_wrapper(url, date_limit)
+            print(news_body['status'])
+            
+            # Write the news now, nothing is kept in memory
+            news_sink.write(news_body)
+            
+            # New unique URLs to continue scrap, unless the memory is above the limit
+            if not guard.over_limit:
+                for idx, row in related_news_df.iterrows():
+                    frontier.add(row['url'], row['title'])
+            
+            guard.check(count)
+    
+    frontier.close()
+    os.remove(file_out + '.frontier')
+    
+    return count
    
 #------------------------------------------------------------------------------
 # MAIN: Web scrapping
 #------------------------------------------------------------------------------
 
-# Scrapping homepage to get initial news' links
-homepage_news_df = homepage_initiate('http://tuoitre.vn/')
+MEMORY_LIMIT_MB = 512 # Memory ceiling of the crawl (RSS)
 
-# Scrapping news pages until meet stop conditions
-all_url = homepage_news_df # Unique URL list to compare
-next_urls = all_url # Initiate URL to scrap
+if not os.path.exists('output'): os.makedirs('output')
 
-count = 0
+# Scrapping homepage to get initial news' links
+homepage_news_df = homepage_initiate('http://tuoitre.vn/')
 
-while True:
-    # Scrap URL list
-    news_list_df, related_news_df = scrap_url_list(next_urls, date_limit='01/11/2016 00:00')
-    
-    # Stop conditions
-    count += len(next_urls)
-    if count == 10000: break
-    
-    # Extract new unique URLs to continue scrap
-    if len(related_news_df) != 0:
-        unique_new_url = related_news_df[-related_news_df['url'].isin(all_url['url'])]
-        all_url = all_url.append(unique_new_url) # Update all URLs list
-        next_urls = unique_new_url # Continue scrap new URLs
-    else: break
+# Scrapping news pages until meet stop conditions, the news are written to the
+# output file page by page
+count = crawl_news(homepage_news_df, 'output/tuoitre_news.csv', date_limit='01/11/2016 00:00',
+                   max_pages=10000, memory_limit_mb=MEMORY_LIMIT_MB)
+print(count, 'news pages scrapped')
     
 #------------------------------------------------------------------------------
 # Scrapping a specific news group
@@ -230,7 +274,7 @@ while True:
 page_url = 'http://tuoitre.vn/tin/chinh-tri-xa-hoi'
 
 news_content = pd.DataFrame()
-news_urls = pd.DataFrame()
+news_urls_buffer = RecordBuffer(['title', 'url'])
 
 # Try to open the page
 try:
@@ -239,43 +283,42 @@ except:
     print('Page load failed. Webscrapping stopped.')
     
 # Parse the page
-soup = BeautifulSoup(page, "html.parser")
+soup = BeautifulSoup(page.body, "html.parser", from_encoding=page.encoding)
 
 content = soup.find('section', attrs={'class':'content'})
 left_side = content.find('div', attrs={'class':'left-side'})
 
 # Add the 1st top news
 top_news_1 = left_side.find('div', attrs={'class':'block-feature'})
-news_url = pd.Series({'title':top_news_1.h1.text.strip(),
-                      'url':top_news_1.h1.a.get('href')})
-news_urls = news_urls.append(news_url, ignore_index=True)
+news_urls_buffer.append(title=top_news_1.h1.text.strip(),
+                        url=top_news_1.h1.a.get('href'))
 
 # Add the 2nd, 3rd, 4th top news
 list_news = content.find('ul', attrs={'class':'list-news'})
 for li in list_news.find_all('li'):
-    news_url = pd.Series({'title':li.h4.text.strip(),
-                          'url':li.h4.a.get('href')})
-    news_urls = news_urls.append(news_url, ignore_index=True)
+    news_urls_buffer.append(title=li.h4.text.strip(),
+                            url=li.h4.a.get('href'))
     
 # Add 1st latest news
 latest_news = content.find('div', attrs={'class':'newhot_most_content'})
 
 latest_news_1 = latest_news.find('div', attrs={'class':'block-left block-top'})
-news_url = pd.Series({'title':latest_news_1.h3.text.strip(),
-                      'url':latest_news_1.h3.a.get('href')})
+news_urls_buffer.append(title=latest_news_1.h3.text.strip(),
+                        url=latest_news_1.h3.a.get('href'))
 news_date = datetime.strptime(latest_news_1.span.text.strip(), '%d/%m/%Y %H:%M')
-news_urls = news_urls.append(news_url, ignore_index=True)
 
 # Add other latest news
 for div in latest_news.find_all('div', attrs={'class':'block-left'}):
-    news_url = pd.Series({'title':div.h3.text.strip(),
-                          'url':div.h3.a.get('href')})
+    news_urls_buffer.append(title=div.h3.text.strip(),
+                            url=div.h3.a.get('href'))
     news_date = datetime.strptime(div.span.text.strip(), '%d/%m/%Y %H:%M')
     print(news_date)
-    news_urls = news_urls.append(news_url, ignore_index=True)
+
+news_urls = news_urls_buffer.to_frame()
 
 
 # Extract all news URL in the home page
+news_buffer = RecordBuffer(['url', 'title'])
 count = 0
 for a in soup.find_all('a', href=True):
     if (re.search('tuoitre.vn', domain_extract(a.get('href'))) and # Belong to the page
@@ -286,9 +329,9 @@ for a in soup.find_all('a', href=True):
         news_url = a.get('href')
         news_title = a.get('title')
 
-        news_row = pd.Series({'url':news_url, 'title':news_title})
-        news_df = news_df.append(news_row, ignore_index=True)
+        news_buffer.append(url=news_url, title=news_title)
 
+news_df = news_buffer.to_frame()
 if len(news_df) != 0:
     news_df = news_df[-news_df['title'].isnull()] # Remove url without title
     news_df = news_df.drop_duplicates('url', keep='first') # Drop duplicated news
@@ -32,13 +32,7 @@ Environment:
 # Libraries
 #------------------------------------------------------------------------------
 
-# Data handling packages
-import pandas as pd
-
 # Web scraping packages
-from bs4 import BeautifulSoup # Web scraping
-import urllib2
-from urllib2 import urlopen # Download link
 
 # If selenium does not run, do these things:
 # (1) Downgrade it: pip install selenium==2.53.6
@@ -50,11 +44,23 @@ from selenium.webdriver.common.keys import Keys
 # Other packages
 import os
 import sys
+import argparse
 import re
 from time import sleep
 from datetime import datetime
 import unicodedata
 
+# Shared scraping packages (repository root folder)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from scraping_utils.parse import BeautifulSoup_wrapper
+from scraping_utils.backends import Region
+from scraping_utils.cli import add_fetch_arguments, add_parse_arguments, add_listing_arguments, configure_fetch
+from scraping_utils.browser import click_wrapper
+from scraping_utils.records import record_type
+from scraping_utils.sinks import open_sink
+from scraping_utils.pipeline import Pipeline
+from scraping_utils.pagination import walk_pages, count_pages, PageNotRead, DEFAULT_NUM_WORKERS as DEFAULT_LISTING_WORKERS
+
 #------------------------------------------------------------------------------
 # Self-defined functions
 #------------------------------------------------------------------------------
@@ -68,72 +74,6 @@ def update_errorLog(text):
         f.write(str(datetime.now()) + ' : ' + text)
         f.write('\n')
 
-def urlopen_wrapper(url, num_retry=5, delay=10):
-    """
-    Function to open a page, try several times if the page gets stuck
-    """
-    
-    count_retry = 0
-    while  count_retry < num_retry:
-        try:
-            page = urlopen(url, timeout=30)
-            return page # If no error, end function
-            
-        except urllib2.URLError as e:
-            print('ERROR opening url:', e)
-            print('Retrying...')
-            count_retry += 1
-            sleep(delay)
-    
-    # If try many times but failed
-    print('FAILED to open this url.', url)
-    update_errorLog('FAILED_OPENING_URL' + ' | ' + url) # Add to log
-    return None
-
-def BeautifulSoup_wrapper(url, parser_type='lxml', num_retry=5, delay=10):
-    """
-    This function will try several times to extract the HTML structure of the page
-    """
-    
-    count_retry = 0
-    while count_retry < num_retry:
-        try:
-            page = urlopen_wrapper(url) # Try to open the page
-            soup = BeautifulSoup(page, parser_type) # Parse the page
-            return soup # If no error, end function
-            
-        except:
-            print('ERROR extracting HTML structure. Retrying...')
-            count_retry += 1
-            sleep(delay)
-
-    # If try many time but failed
-    print('FAILED to extract HTML structure.', url)
-    update_errorLog('FAILED_EXTRACTING_HTML' + ' | ' + url) # Add to log
-    return None
-
-def click_wrapper(object_click, num_retry=5, delay=5):    
-    """
-    Function to simulate a click, try several times if cannot click
-    """
-    
-    count_retry = 0
-    while  count_retry < num_retry:
-        try:
-            object_click.click()
-            #print('Click successful!')
-            return True
-            
-        except:
-            print('ERROR clicking. Retrying...')
-            count_retry += 1
-            sleep(delay)
-    
-    # If try many time but failed
-    print('FAILED to click on this object.')
-    update_errorLog('FAILED_CLICKING_OBJECT' + ' | ' + object_click.text.strip()) # Add to log
-    return False
-
 def slugify(string):
     """
     This small function convert a search term (string) to another string that
@@ -147,54 +87,81 @@ def slugify(string):
                 .strip()
                 .lower()))
    
-def extract_tourismLocations(beginURL):
+# Regions of a locations page read by extract_tourismLocations (the rest of
+# the page is not kept), the download stops at the next button (after the
+# locations)
+locationListRegions = [Region('div', attrs={"class": "listing_title"}),
+                       Region(attrs={"class": "nav next rndBtn ui_button primary taLnk"}, required='next button'),
+                       Region(attrs={"class": "nav next disabled"}, required='next button')]
+
+# Row of the locations table
+Location = record_type('Location', ['location_name',
+                                    'location_url',
+                                    'search_rank',
+                                    'search_term',
+                                    'location_found'])
+
+def read_locationsPage(url):
+    """
+    This function will extract the tourism names and page links of 1 page, and
+    the link of the next page (None if the Next button is blocked). Raise
+    PageNotRead if the page cannot be opened (e.g. past the last page).
+    """
+    
+    # Extract the HTML structure of the page
+    soup = BeautifulSoup_wrapper(url, HTML_PARSER, regions=locationListRegions, stream=True)
+    if soup is None: raise PageNotRead(url)
+    
+    # Extract all location text
+    locations = [[dest.text.strip(), TripAdvisor_url + dest.a.get('href')]
+                 for dest in soup.findAll('div', attrs={"class": "listing_title"})]
+    
+    # Find Next button
+    nextButtonSoup = soup.find(attrs={"class": "nav next rndBtn ui_button primary taLnk"})
+    disabled_nextButtonSoup = soup.findAll(attrs={"class": "nav next disabled"})
+    
+    # Check the NEXT button, if it was blocked, last page
+    if (nextButtonSoup is None) or disabled_nextButtonSoup:
+        nextURL = None
+    else:
+        nextURL = TripAdvisor_url + str(nextButtonSoup.get('href'))
+    
+    return {'locations':locations, 'next':nextURL}
+
+def extract_tourismLocations(beginURL, searchTerm=None, actualLocation=None, num_workers=DEFAULT_LISTING_WORKERS,
+                             top_k=None):
     """
     This function will loop through page by page of TripAdvisor and extract all
     tourism names and their page links until can not find the Next button to
     continue.
+    
+    Note: this function is a generator of Location records (search_rank order),
+    the locations of a page are given (e.g. written to the output file) as soon
+    as the page is read. From page 3, num_workers pages are read at the same
+    time (-oa60-, -oa90-..., see scraping_utils/pagination.py). top_k: stop
+    after the first top_k locations, no page is read after them (None: all).
     """
     
-    locationNameList = []
-    locationLinkList = []
+    locationCount = 0
     pageCount = 0
-    currentURL = beginURL
     
-    while True: # Loop until cannot find next button
-
-        # Extract the HTML structure of the page
-        soup = BeautifulSoup_wrapper(currentURL, 'lxml')
+    def count_locationsPages(pageRecord):
+        return count_pages(len(pageRecord['locations']), top_k)
+    
+    for pageRecord in walk_pages(beginURL, read_locationsPage, count_locationsPages, num_workers):
         
-        # Extract all location text
-        countLocation = 0
-        for dest in soup.findAll('div', attrs={"class": "listing_title"}):
-            locationNameList.append(dest.text.strip())
-            locationLinkList.append(TripAdvisor_url + dest.a.get('href'))
-            countLocation += 1
+        for locationName, locationURL in pageRecord['locations']:
+            locationCount += 1
+            yield Location(location_name=locationName,
+                           location_url=locationURL,
+                           search_rank=locationCount, # Add the search rank
+                           search_term=searchTerm,
+                           location_found=actualLocation)
+            if locationCount == top_k: return # Top k locations found
         
         # Print out to track
         pageCount += 1
-        print('Page', str(pageCount), ':', countLocation, 'locations extracted')
-        
-        # Find Next button
-        nextButtonSoup = soup.find(attrs={"class": "nav next rndBtn ui_button primary taLnk"})
-        disabled_nextButtonSoup = soup.findAll(attrs={"class": "nav next disabled"})
-        
-        # Check the NEXT button, if it was blocked, end loop
-        if (nextButtonSoup is None) or disabled_nextButtonSoup: break
-        
-        # Else, jump to next page, continue loop
-        currentURL = TripAdvisor_url + str(nextButtonSoup.get('href'))
-    
-    # Construct result table
-    locationTb = pd.DataFrame({'location_name':pd.Series(locationNameList),
-                               'location_url':pd.Series(locationLinkList)},
-                              columns=['location_name',
-                                       'location_url'])
-    
-    # Add the search rank
-    locationTb['search_rank'] = locationTb.index + 1
-    
-    return locationTb
+        print('Page', str(pageCount), ':', len(pageRecord['locations']), 'locations extracted')
 
 #------------------------------------------------------------------------------
 # MAIN
@@ -210,7 +177,16 @@ if __name__ == '__main__':
     if not os.path.exists('output'): os.makedirs('output')
     
     # Search term identify
-    searchTerm = sys.argv[1]
+    parser = argparse.ArgumentParser(description='Scrape TripAdvisor.com tourism locations')
+    parser.add_argument('searchTerm', help="location name, e.g. 'Paris' or 'Hue, Vietnam'")
+    add_fetch_arguments(parser)
+    add_parse_arguments(parser, ['selectolax', 'lxml.html']) # Fastest parsers for this site (benchmarks/parser_benchmark.py)
+    add_listing_arguments(parser)
+    args = parser.parse_args()
+    configure_fetch(args)
+    HTML_PARSER = args.parser # Parser backend of BeautifulSoup_wrapper
+    
+    searchTerm = args.searchTerm
     #searchTerm = 'UK'
     print('Location name:', searchTerm)
     
@@ -287,21 +263,22 @@ if __name__ == '__main__':
 
     print('Step 3. Scraping tourism locations')
     
-    # Run webscraping
-    locationTb = extract_tourismLocations(beginURL)
+    # Run webscraping, the locations are written as soon as their page is read
+    # (the rows of an interrupted run are kept in the .part file)
+    fileOut = 'output/' + slugify(searchTerm) + '_locationInfo.csv'
+    with open_sink(fileOut, Location) as locationSink:
+        locations = extract_tourismLocations(beginURL, searchTerm, actualLocation, args.listing_workers, args.top_k)
+        pipeline = Pipeline(locations, [],
+                            sink=locationSink.write, name='Locations')
+        pipeline.run()
+    pipeline.print_metrics()
     
     # Create clean location keywords
-    locationTb['search_term'] = searchTerm
-    locationTb['location_found'] = actualLocation
     #df['location_keyword'] = df['location'].str.replace(r'(\([0-9]+\))', ' ')
     #df['location_keyword'] = df['location_keyword'].str.replace(r'[^a-zA-Z0-9]', ' ')
     #df['location_keyword'] = df['location_keyword'].str.replace(r' +', ' ')
     #df['location_keyword'] = df['location_keyword'].str.strip().str.lower()
     
-    # Save to file
-    fileOut = 'output/' + slugify(searchTerm) + '_locationInfo.csv'
-    locationTb.to_csv(fileOut, encoding='utf-8', index=False)
-    
     print()
 
 #------------------------------------------------------------------------------
@@ -36,9 +36,6 @@ Environment:
 import pandas as pd
 
 # Web scraping packages
-from bs4 import BeautifulSoup # Web scraping
-import urllib2
-from urllib2 import urlopen # Download link
 
 # If selenium does not run, do these things:
 # (1) Downgrade it: pip install selenium==2.53.6
@@ -50,11 +47,19 @@ from selenium.webdriver.common.keys import Keys
 # Other packages
 import os
 import sys
+import argparse
 import re
 from time import sleep
 from datetime import datetime
 import unicodedata
 
+# Shared scraping packages (repository root folder)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from scraping_utils.parse import BeautifulSoup_wrapper
+from scraping_utils.backends import Region
+from scraping_utils.cli import add_fetch_arguments, add_parse_arguments, configure_fetch
+from scraping_utils.browser import click_wrapper
+
 #------------------------------------------------------------------------------
 # Self-defined functions
 #------------------------------------------------------------------------------
@@ -68,72 +73,6 @@ def update_errorLog(text):
         f.write(str(datetime.now()) + ' : ' + text)
         f.write('\n')
 
-def urlopen_wrapper(url, num_retry=5, delay=10):
-    """
-    Function to open a page, try several times if the page gets stuck
-    """
-    
-    count_retry = 0
-    while  count_retry < num_retry:
-        try:
-            page = urlopen(url, timeout=30)
-            return page # If no error, end function
-            
-        except urllib2.URLError as e:
-            print('ERROR opening url:', e)
-            print('Retrying...')
-            count_retry += 1
-            sleep(delay)
-    
-    # If try many times but failed
-    print('FAILED to open this url.', url)
-    update_errorLog('FAILED_OPENING_URL' + ' | ' + url) # Add to log
-    return None
-
-def BeautifulSoup_wrapper(url, parser_type='lxml', num_retry=5, delay=10):
-    """
-    This function will try several times to extract the HTML structure of the page
-    """
-    
-    count_retry = 0
-    while count_retry < num_retry:
-        try:
-            page = urlopen_wrapper(url) # Try to open the page
-            soup = BeautifulSoup(page, parser_type) # Parse the page
-            return soup # If no error, end function
-            
-        except:
-            print('ERROR extracting HTML structure. Retrying...')
-            count_retry += 1
-            sleep(delay)
-
-    # If try many time but failed
-    print('FAILED to extract HTML structure.', url)
-    update_errorLog('FAILED_EXTRACTING_HTML' + ' | ' + url) # Add to log
-    return None
-
-def click_wrapper(object_click, num_retry=5, delay=5):    
-    """
-    Function to simulate a click, try several times if cannot click
-    """
-    
-    count_retry = 0
-    while  count_retry < num_retry:
-        try:
-            object_click.click()
-            #print('Click successful!')
-            return True
-            
-        except:
-            print('ERROR clicking. Retrying...')
-            count_retry += 1
-            sleep(delay)
-    
-    # If try many time but failed
-    print('FAILED to click on this object.')
-    update_errorLog('FAILED_CLICKING_OBJECT' + ' | ' + object_click.text.strip()) # Add to log
-    return False
-
 def slugify(string):
     """
     This small function convert a search term (string) to another string that
@@ -147,6 +86,13 @@ def slugify(string):
                 .strip()
                 .lower()))
    
+# Regions of a locations page read by extract_tourismLocations (the rest of
+# the page is not kept), the download stops at the next button (after the
+# locations)
+locationListRegions = [Region('div', attrs={"class": "listing_title"}),
+                       Region(attrs={"class": "nav next rndBtn ui_button primary taLnk"}, required='next button'),
+                       Region(attrs={"class": "nav next disabled"}, required='next button')]
+
 def extract_tourismLocations(beginURL):
     """
     This function will loop through page by page of TripAdvisor and extract all
@@ -162,7 +108,7 @@ def extract_tourismLocations(beginURL):
     while True: # Loop until cannot find next button
 
         # Extract the HTML structure of the page
-        soup = BeautifulSoup_wrapper(currentURL, 'lxml')
+        soup = BeautifulSoup_wrapper(currentURL, HTML_PARSER, regions=locationListRegions, stream=True)
         
         # Extract all location text
         countLocation = 0
@@ -210,7 +156,15 @@ if __name__ == '__main__':
     if not os.path.exists('output'): os.makedirs('output')
     
     # Search term identify
-    searchTerm = sys.argv[1]
+    parser = argparse.ArgumentParser(description='Scrape TripAdvisor.com tourism locations')
+    parser.add_argument('searchTerm', help="location name, e.g. 'Paris' or 'Hue, Vietnam'")
+    add_fetch_arguments(parser)
+    add_parse_arguments(parser, ['selectolax', 'lxml.html']) # Fastest parsers for this site (benchmarks/parser_benchmark.py)
+    args = parser.parse_args()
+    configure_fetch(args)
+    HTML_PARSER = args.parser # Parser backend of BeautifulSoup_wrapper
+    
+    searchTerm = args.searchTerm
     #searchTerm = 'Paris'
     print('Location name:', searchTerm)
     
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, division
+
+"""
+Benchmark of the compiled extraction schema (scraping_utils/extract.py)
+against the former per-field soup.find functions, on a generated Firefox
+addon page (same fields and markup as addons.mozilla.org, with the size and
+depth of a real detail page).
+
+Usage:
+
+    python extract_benchmark.py [--pages 200]
+
+Environment:
+    1. Python 2.7, beautifulsoup4, lxml
+"""
+
+#------------------------------------------------------------------------------
+# Libraries
+#------------------------------------------------------------------------------
+
+import argparse
+import os
+import re
+import sys
+from time import time
+
+from bs4 import BeautifulSoup
+import lxml.html
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir,
+                             'Firefox_extension_page_scraping'))
+from Firefox_extensions import addonSchema
+
+#------------------------------------------------------------------------------
+# Self-defined functions
+#------------------------------------------------------------------------------
+
+def make_addonPage(i):
+    """
+    Return the HTML of an addon page: the fields, inside ~60 KB of navigation,
+    description and review blocks.
+    """
+
+    filler = ''.join('<div class="section"><ul class="nav">%s</ul><div class="review">'
+                     '<p class="description">Lorem ipsum dolor sit amet %d</p>'
+                     '<span class="meta">posted by <a href="/u/%d">user %d</a></span></div></div>\n'
+                     % (''.join('<li><a href="/c/%d">Category %d</a></li>' % (k, k) for k in range(5)),
+                        j, j, j)
+                     for j in range(150))
+    return ('<html><head><title>Addon %d</title></head><body>\n' % i + filler[:len(filler) // 2] +
+            '<div id="daily-users">%d users</div><span class="filesize">%d KiB</span>\n' % (1000 + i, i) +
+            '<div class="version item"><div><h3><a>Version 1.%d</a></h3></div>'
+            '<span class="meta"><time datetime="2017-01-%02d">Jan</time></span></div>\n' % (i, i % 28 + 1) +
+            filler[len(filler) // 2:] +
+            '<span itemprop="ratingCount">%d reviews</span><meta itemprop="ratingValue" content="4.%d">\n'
+            % (i * 3, i % 10) +
+            '<p class="author">by <a href="/en-US/firefox/user/u%d/">Author</a></p></body></html>' % i)
+
+def extract_soupFields(addonSoup):
+    """
+    The former extract_activeUser, extract_size... functions of
+    Firefox_extensions.py, one soup.find per field.
+    """
+
+    def find(function):
+        try:
+            return function()
+        except Exception:
+            return None
+
+    return {'active_user':find(lambda: int(re.sub('[^0-9]', '', addonSoup.find('div', attrs={'id':'daily-users'}).text.strip()))),
+            'size':find(lambda: addonSoup.find('span', attrs={'class':'filesize'}).text.strip()),
+            'version':find(lambda: re.sub('Version', '', addonSoup.find('div', attrs={'class':'version item'}).div.h3.a.text).strip()),
+            'release_date':find(lambda: addonSoup.find('div', attrs={'class':'version item'}).find('span', attrs={'class':'meta'}).time.get('datetime')),
+            'number_review':find(lambda: int(re.sub('[^0-9]', '', addonSoup.find('span', attrs={'itemprop':'ratingCount'}).text.strip()))),
+            'rating':find(lambda: float(addonSoup.find('meta', attrs={'itemprop':'ratingValue'}).get('content'))),
+            'author_url':find(lambda: addonSoup.find(attrs={'class':'author'}).a.get('href'))}
+
+def measure(function, items):
+    startTime = time()
+    results = [function(item) for item in items]
+    return (time() - startTime) / len(items), results
+
+#------------------------------------------------------------------------------
+# MAIN
+#------------------------------------------------------------------------------
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--pages', type=int, default=200)
+    args = parser.parse_args()
+
+    pages = [make_addonPage(i) for i in range(args.pages)]
+    print('%d pages of %.0f KB' % (len(pages), sum(len(page) for page in pages) / len(pages) / 1024))
+
+    soupParse, soups = measure(lambda page: BeautifulSoup(page, 'lxml'), pages)
+    treeParse, trees = measure(lxml.html.document_fromstring, pages)
+    soupExtract, soupFields = measure(extract_soupFields, soups)
+    schemaExtract, schemaFields = measure(addonSchema.extract, trees)
+
+    assert soupFields == schemaFields, 'the schema does not return the same fields'
+
+    print('Extraction per page: soup.find %.2f ms, schema %.3f ms (%.0fx faster)'
+          % (soupExtract * 1000, schemaExtract * 1000, soupExtract / schemaExtract))
+    print('Parse + extraction per page: BeautifulSoup %.2f ms, lxml.html + schema %.2f ms (%.1fx faster)'
+          % ((soupParse + soupExtract) * 1000, (treeParse + schemaExtract) * 1000,
+             (soupParse + soupExtract) / (treeParse + schemaExtract)))
+
+#------------------------------------------------------------------------------
@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, division
+
+"""
+Benchmark of the HTTP/2 transport of the fetch layer against the pooled
+HTTP/1.1 path, offline, with the local test server (http2_test_server.py).
+
+The same detail-stage workload (many small GET requests to one host, sent by
+the workers of engine.map_ordered) is run once with HTTP/1.1 and once with
+HTTP/2, then once with HTTP/2 enabled against a server without h2 to check the
+fallback to HTTP/1.1. The servers run in their own processes, with a simulated
+round trip time, so the handshakes of new connections cost as on a network.
+
+Usage:
+
+    python http2_benchmark.py [--pages 500] [--workers 32] [--delay 0.05] [--rtt 0.02]
+
+Environment:
+    1. Python 2.7, h2 (pip install h2), openssl command
+"""
+
+#------------------------------------------------------------------------------
+# Libraries
+#------------------------------------------------------------------------------
+
+import argparse
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+from time import time, sleep
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from scraping_utils.fetch import HTTPClient
+from scraping_utils.engine import map_ordered
+from http2_test_server import make_certificate
+
+#------------------------------------------------------------------------------
+# Global variables
+#------------------------------------------------------------------------------
+
+SERVER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'http2_test_server.py')
+
+#------------------------------------------------------------------------------
+# Self-defined functions
+#------------------------------------------------------------------------------
+
+def get_freePort():
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+def start_server(args, certFile, keyFile, http1_only=False):
+    """
+    Start the test server in a new process, return (process, port).
+    """
+
+    port = get_freePort()
+    command = [sys.executable, SERVER_SCRIPT, '--port', str(port), '--delay', str(args.delay),
+               '--rtt', str(args.rtt), '--cert', certFile, '--key', keyFile]
+    if http1_only: command.append('--http1-only')
+    with open(os.devnull, 'w') as devnull:
+        process = subprocess.Popen(command, stdout=devnull)
+
+    for _ in range(100): # Wait until the server accepts connections
+        try:
+            socket.create_connection(('127.0.0.1', port), 1).close()
+            break
+        except socket.error:
+            sleep(0.1)
+    return process, port
+
+def make_client(certFile, http2, workers):
+    client = HTTPClient(max_per_host=workers)
+    client.ssl_context.load_verify_locations(certFile)
+    client.set_http2(http2)
+    if client.http2: client.http2_ssl_context.load_verify_locations(certFile)
+    return client
+
+def get_stats(client, port):
+    """
+    Return (requests, connections) served by the test server so far.
+    """
+
+    page = client.download('https://localhost:%d/stats' % port)
+    return [int(n) for n in page.read().split()]
+
+def run_benchmark(name, port, certFile, http2, pages, workers):
+    """
+    Download pages pages from the test server, print the throughput and the
+    number of connections opened.
+    """
+
+    statsClient = make_client(certFile, False, 1)
+    _, connections = get_stats(statsClient, port)
+
+    client = make_client(certFile, http2, workers)
+    urls = ['https://localhost:%d/detail/%d' % (port, i) for i in range(pages)]
+    startTime = time()
+    results = map_ordered(client.download, urls, num_workers=workers)
+    duration = time() - startTime
+    client.close()
+
+    assert all(page.code == 200 for page in results)
+    _, newConnections = get_stats(statsClient, port)
+    statsClient.close()
+    print('%-22s %5d pages in %6.2fs, %7.1f pages/s, %4d connections opened'
+          % (name, pages, duration, pages / duration, newConnections - connections))
+    return duration
+
+#------------------------------------------------------------------------------
+# MAIN
+#------------------------------------------------------------------------------
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--pages', type=int, default=500)
+    parser.add_argument('--workers', type=int, default=32)
+    parser.add_argument('--delay', type=float, default=0.05,
+                        help='server delay of each response in seconds (default: 0.05)')
+    parser.add_argument('--rtt', type=float, default=0.02,
+                        help='simulated round trip time in seconds (default: 0.02)')
+    args = parser.parse_args()
+
+    tmpDir = tempfile.mkdtemp()
+    certFile, keyFile = make_certificate(tmpDir)
+    server, port = start_server(args, certFile, keyFile)
+    http1Server, http1Port = start_server(args, certFile, keyFile, http1_only=True)
+
+    try:
+        http1Duration = run_benchmark('HTTP/1.1 pool', port, certFile, False,
+                                      args.pages, args.workers)
+        http2Duration = run_benchmark('HTTP/2 multiplexed', port, certFile, True,
+                                      args.pages, args.workers)
+        run_benchmark('HTTP/2 -> 1.1 fallback', http1Port, certFile, True,
+                      args.pages, args.workers)
+        print('HTTP/2 speedup: %.2fx' % (http1Duration / http2Duration))
+    finally:
+        server.terminate()
+        http1Server.terminate()
+        shutil.rmtree(tmpDir, ignore_errors=True)
+
+#------------------------------------------------------------------------------
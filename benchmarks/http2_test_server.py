@@ -0,0 +1,249 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, division
+
+"""
+Local HTTPS test server speaking HTTP/2 and HTTP/1.1 (chosen by ALPN), used to
+measure the HTTP/2 transport of the fetch layer offline.
+
+Every GET request is answered with a small HTML page after a fixed delay (the
+server "think time"), like a detail page of AMO or Indeed. With HTTP/2 the
+requests of one connection are answered concurrently, with HTTP/1.1 one at a
+time per connection. A network round trip time can be simulated: a new
+connection costs 2 round trips (TCP and TLS handshakes), a request 1 round trip.
+
+The path /stats returns the number of requests and connections served.
+
+Usage (a self-signed certificate is created with the openssl command if no
+certificate is given):
+
+    python http2_test_server.py [--port 8443] [--delay 0.05] [--rtt 0.02]
+                                [--cert FILE --key FILE] [--http1-only]
+
+Environment:
+    1. Python 2.7, h2 (pip install h2), openssl command
+"""
+
+#------------------------------------------------------------------------------
+# Libraries
+#------------------------------------------------------------------------------
+
+import argparse
+import os
+import select
+import shutil
+import socket
+import ssl
+import subprocess
+import tempfile
+import threading
+import time
+
+import h2.config
+import h2.connection
+import h2.events
+import h2.settings
+
+#------------------------------------------------------------------------------
+# Global variables
+#------------------------------------------------------------------------------
+
+DEFAULT_PORT = 8443
+DEFAULT_DELAY = 0.05 # Seconds before each response
+DEFAULT_RTT = 0 # Simulated round trip time (seconds)
+MAX_STREAMS = 100 # SETTINGS_MAX_CONCURRENT_STREAMS sent to the clients
+PAGE_SIZE = 20 * 1024 # Bytes
+
+#------------------------------------------------------------------------------
+# Self-defined functions
+#------------------------------------------------------------------------------
+
+def make_certificate(folder):
+    """
+    Create a self-signed certificate for localhost in folder, return
+    (certFile, keyFile).
+    """
+
+    certFile = os.path.join(folder, 'localhost.crt')
+    keyFile = os.path.join(folder, 'localhost.key')
+    with open(os.devnull, 'w') as devnull:
+        subprocess.check_call(['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes',
+                               '-keyout', keyFile, '-out', certFile, '-days', '1',
+                               '-subj', '/CN=localhost'],
+                              stdout=devnull, stderr=devnull)
+    return certFile, keyFile
+
+def make_page(path, server):
+    if path == '/stats': return '%d %d' % (server.requests, server.connections)
+    line = '<p>Test page %s</p>\n' % path
+    return '<html><body>\n' + line * (PAGE_SIZE // len(line)) + '</body></html>\n'
+
+class TestServer(object):
+    """
+    Threaded HTTPS server. ALPN selects h2 for the clients which offer it,
+    unless http1_only is set.
+    """
+
+    def __init__(self, port=DEFAULT_PORT, delay=DEFAULT_DELAY, rtt=DEFAULT_RTT,
+                 http1_only=False, cert_file=None, key_file=None):
+        self.port = port
+        self.delay = delay
+        self.rtt = rtt
+        self.http1_only = http1_only
+        self.requests = 0
+        self.connections = 0
+        self._lock = threading.Lock()
+
+        self._tmpDir = None
+        if cert_file is None:
+            self._tmpDir = tempfile.mkdtemp()
+            cert_file, key_file = make_certificate(self._tmpDir)
+        self.cert_file = cert_file
+        self.context = ssl.SSLContext(ssl.PROTOCOL_SSLv23)
+        self.context.load_cert_chain(cert_file, key_file)
+        self.context.set_alpn_protocols(['http/1.1'] if http1_only else ['h2', 'http/1.1'])
+
+        self.sock = socket.socket()
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind(('127.0.0.1', port))
+        self.sock.listen(128)
+
+    def start(self):
+        t = threading.Thread(target=self.serve_forever)
+        t.daemon = True
+        t.start()
+
+    def serve_forever(self):
+        while True:
+            try:
+                sock, _ = self.sock.accept()
+            except socket.error: # Server closed
+                return
+            t = threading.Thread(target=self.handle_connection, args=(sock,))
+            t.daemon = True
+            t.start()
+
+    def close(self):
+        self.sock.close()
+        if self._tmpDir is not None: shutil.rmtree(self._tmpDir, ignore_errors=True)
+
+    def count(self, requests=0, connections=0):
+        with self._lock:
+            self.requests += requests
+            self.connections += connections
+
+    def handle_connection(self, sock):
+        time.sleep(2 * self.rtt) # TCP and TLS handshakes
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        try:
+            sock = self.context.wrap_socket(sock, server_side=True)
+        except (socket.error, ssl.SSLError):
+            sock.close()
+            return
+        self.count(connections=1)
+        try:
+            if sock.selected_alpn_protocol() == 'h2':
+                self.handle_http2(sock)
+            else:
+                self.handle_http1(sock)
+        except (socket.error, ssl.SSLError):
+            pass
+        finally:
+            sock.close()
+
+    def handle_http1(self, sock):
+        """
+        Keep-alive HTTP/1.1, one request at a time.
+        """
+
+        f = sock.makefile('rb')
+        while True:
+            requestLine = f.readline()
+            if not requestLine: return
+            while f.readline() not in ('\r\n', '\n', ''): # Skip the headers
+                pass
+            path = requestLine.split()[1]
+
+            time.sleep(self.delay + self.rtt)
+            body = make_page(path, self)
+            sock.sendall('HTTP/1.1 200 OK\r\nContent-Type: text/html\r\n'
+                         'Content-Length: %d\r\n\r\n' % len(body) + body)
+            self.count(requests=1)
+
+    def handle_http2(self, sock):
+        """
+        HTTP/2, every stream is answered by its own thread after the delay.
+        """
+
+        config = h2.config.H2Configuration(client_side=False)
+        conn = h2.connection.H2Connection(config=config)
+        cond = threading.Condition() # Protects conn and the socket writes
+        with cond:
+            conn.initiate_connection()
+            conn.update_settings({h2.settings.SettingCodes.MAX_CONCURRENT_STREAMS:MAX_STREAMS})
+            sock.sendall(conn.data_to_send())
+
+        def respond(streamId, path):
+            time.sleep(self.delay + self.rtt)
+            body = make_page(path, self)
+            with cond:
+                conn.send_headers(streamId, [(':status', '200'),
+                                             ('content-type', 'text/html'),
+                                             ('content-length', str(len(body)))])
+                while body: # Respect the flow control window of the client
+                    size = min(len(body), conn.local_flow_control_window(streamId),
+                               conn.max_outbound_frame_size)
+                    if size <= 0:
+                        sock.sendall(conn.data_to_send())
+                        cond.wait(1) # Until a WINDOW_UPDATE frame
+                        continue
+                    conn.send_data(streamId, body[:size])
+                    body = body[size:]
+                conn.end_stream(streamId)
+                sock.sendall(conn.data_to_send())
+            self.count(requests=1)
+
+        while True:
+            select.select([sock], [], []) # Read under the lock, an SSL socket cannot
+            with cond:                    # be read and written at the same time
+                data = sock.recv(65536)
+                while data and sock.pending():
+                    data += sock.recv(sock.pending())
+                if not data: return
+                for event in conn.receive_data(data):
+                    if isinstance(event, h2.events.RequestReceived):
+                        path = dict(event.headers)[':path']
+                        t = threading.Thread(target=respond, args=(event.stream_id, path))
+                        t.daemon = True
+                        t.start()
+                    elif isinstance(event, h2.events.ConnectionTerminated):
+                        return
+                sock.sendall(conn.data_to_send())
+                cond.notify_all()
+
+#------------------------------------------------------------------------------
+# MAIN
+#------------------------------------------------------------------------------
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--delay', type=float, default=DEFAULT_DELAY,
+                        help='seconds before each response (default: %s)' % DEFAULT_DELAY)
+    parser.add_argument('--rtt', type=float, default=DEFAULT_RTT,
+                        help='simulated round trip time in seconds (default: %s)' % DEFAULT_RTT)
+    parser.add_argument('--cert', help='certificate file (default: self-signed)')
+    parser.add_argument('--key', help='private key file of the certificate')
+    parser.add_argument('--http1-only', action='store_true',
+                        help='do not offer h2 (test the fallback to HTTP/1.1)')
+    args = parser.parse_args()
+
+    server = TestServer(args.port, args.delay, args.rtt, args.http1_only,
+                        args.cert, args.key)
+    print('Serving on https://localhost:%d/ (certificate: %s)' % (args.port, server.cert_file))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.close()
+
+#------------------------------------------------------------------------------
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, division
+
+"""
+Benchmark of the parse pool (scraping_utils/parsepool.py) on the detail
+stages of Firefox (addon pages, compiled schema) and Indeed (job pages): the
+pages are given to the pool by 8 threads, as the download threads of
+map_ordered do, with 0 (extract in the threads), 1, 2... worker processes.
+The records must be the same for every number of workers, the throughput
+should grow with the number of workers up to the number of CPU cores.
+
+Usage:
+
+    python parsepool_benchmark.py [--pages 400] [--max-workers 8]
+
+Environment:
+    1. Python 2.7, beautifulsoup4, lxml
+    2. selectolax (optional)
+"""
+
+#------------------------------------------------------------------------------
+# Libraries
+#------------------------------------------------------------------------------
+
+import argparse
+import multiprocessing
+import os
+import sys
+from time import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir,
+                             'Firefox_extension_page_scraping'))
+from scraping_utils.parsepool import set_parsePool
+from scraping_utils.engine import map_ordered
+from scraping_utils.backends import first_backend
+from extract_benchmark import make_addonPage
+from parser_benchmark import indeed_jobPage, extract_indeedJob, SITES
+from Firefox_extensions import extract_addonPage
+
+#------------------------------------------------------------------------------
+# Self-defined functions
+#------------------------------------------------------------------------------
+
+def run_pool(num_workers, pages, extract, parser_type, regions):
+    """
+    Return (pages per second, records) with num_workers worker processes.
+    """
+
+    pool = set_parsePool(num_workers) # Workers started (and warmed) before the timer
+    startTime = time()
+    records = map_ordered(lambda page: pool.extract(extract, page, parser_type, regions), pages)
+    elapsed = time() - startTime
+    pool.close()
+    return len(pages) / elapsed, records
+
+#------------------------------------------------------------------------------
+# MAIN
+#------------------------------------------------------------------------------
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--pages', type=int, default=400)
+    parser.add_argument('--max-workers', type=int, default=multiprocessing.cpu_count())
+    args = parser.parse_args()
+
+    print('%d CPU cores' % multiprocessing.cpu_count())
+    workerCounts = [0] + [n for n in [1, 2, 4, 8, 16] if n < args.max_workers] + [args.max_workers]
+
+    indeedBackend = first_backend(['selectolax', 'lxml.html'])
+    stages = [('Firefox addon pages (lxml.html + schema)', make_addonPage, extract_addonPage, 'lxml.html', None),
+              ('Indeed job pages (%s + regions)' % indeedBackend, indeed_jobPage, extract_indeedJob,
+               indeedBackend, dict((site[0], site[3]) for site in SITES)['Indeed job page'])]
+
+    for stageName, make, extract, parserType, regions in stages:
+        pages = [make(i) for i in range(args.pages)]
+        print('\n%s, %d pages' % (stageName, len(pages)))
+
+        baseline = None
+        for numWorkers in workerCounts:
+            rate, records = run_pool(numWorkers, pages, extract, parserType, regions)
+            if baseline is None: baseline, expected = rate, records
+            print('    %2d workers: %6.0f pages/s (x%.1f)%s'
+                  % (numWorkers, rate, rate / baseline, '' if records == expected else ' (DIFFERENT RECORDS)'))
+
+#------------------------------------------------------------------------------
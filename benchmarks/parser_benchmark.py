@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, division
+
+"""
+Benchmark of the HTML parser backends (scraping_utils/backends.py) on the
+pages of each site: parse + the extract code of the script, on generated pages
+with the same markup as the real ones. A backend passes when it returns the
+same results as BeautifulSoup with lxml, the fastest passing backend is the
+one chosen by the script (HTML_PARSER). The BeautifulSoup backends also run
+with the page regions declared by the script (Region), the number of elements
+kept in the tree is shown (lxml.html and selectolax ignore the regions).
+
+Usage:
+
+    python parser_benchmark.py [--pages 100]
+
+Environment:
+    1. Python 2.7, beautifulsoup4, lxml
+    2. selectolax (optional)
+"""
+
+#------------------------------------------------------------------------------
+# Libraries
+#------------------------------------------------------------------------------
+
+import argparse
+import os
+import re
+import sys
+from time import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from scraping_utils.backends import parse_html, is_text, uses_regions, Region, PARSER_BACKENDS, HTMLParser
+
+#------------------------------------------------------------------------------
+# Self-defined functions
+#------------------------------------------------------------------------------
+
+def make_filler(count):
+    """
+    Navigation, description and review blocks around the extracted fields.
+    """
+
+    return ''.join('<div class="section"><ul class="nav">%s</ul><div class="review">'
+                   '<p class="description">Lorem ipsum <b>dolor</b> sit amet %d</p>'
+                   '<span class="meta">posted by <a href="/u/%d">user %d</a></span></div></div>\n'
+                   % (''.join('<li><a href="/c/%d">Category %d</a></li>' % (k, k) for k in range(5)),
+                      j, j, j)
+                   for j in range(count))
+
+def make_page(body):
+    return ('<!DOCTYPE html>\n<html><head><meta charset="utf-8"><title>Page</title></head><body>\n'
+            + make_filler(40) + body + make_filler(40) + '</body></html>')
+
+def firefox_listPage(i):
+    items = ''.join('<div class="item addon%s"><div><h3><a href="/en-US/firefox/addon/a%d-%d/?src=search">'
+                    'Addon %d</a></h3></div><p class="desc">Description</p></div>\n'
+                    % (' incompatible' if k % 7 == 0 else '', i, k, k) for k in range(20))
+    return make_page(items + '<p class="paginator"><a class="button next" href="/search/?page=%d">Next</a></p>'
+                     % (i + 2))
+
+def extract_firefoxList(soup):
+    """
+    extract_addonsList of Firefox_extensions.py (one page).
+    """
+
+    items = [(item.div.h3.a.text.strip(), item.div.h3.a.get('href'))
+             for item in soup.findAll('div', attrs={'class':'item addon'})]
+    nextButton = soup.find('a', attrs={'class':'button next'})
+    return items, nextButton.get('href') if nextButton is not None else None
+
+def tripadvisor_listPage(i):
+    items = ''.join('<div class="listing"><div class="listing_title"><a href="/Attraction_Review-d%d">'
+                    'Location %d</a></div><div class="rating">4.5</div></div>\n' % (i * 30 + k, k)
+                    for k in range(30))
+    return make_page(items + '<div class="unified pagination"><a class="nav next rndBtn ui_button primary taLnk" '
+                     'href="/Attractions-oa%d">Next</a></div>' % (i * 30 + 30))
+
+def extract_tripadvisorList(soup):
+    """
+    extract_tourismLocations of TripAdvisor_scraping.py (one page).
+    """
+
+    items = [(dest.text.strip(), dest.a.get('href'))
+             for dest in soup.findAll('div', attrs={"class": "listing_title"})]
+    nextButtonSoup = soup.find(attrs={"class": "nav next rndBtn ui_button primary taLnk"})
+    disabled_nextButtonSoup = soup.findAll(attrs={"class": "nav next disabled"})
+    return items, nextButtonSoup.get('href'), len(disabled_nextButtonSoup)
+
+def indeed_listPage(i):
+    jobs = ''.join('<div class="row result" data-jk="%x%02d" %s><h2><a href="/rc/clk?jk=%d">Data analyst %d</a></h2>'
+                   '<span class="company">Company %d</span> - <span class="location">Paris</span></div>\n'
+                   % (i, k, 'data-tn-component="organicJob"' if k > 2 else '', k, k, k)
+                   for k in range(15))
+    return make_page('<div id="searchCount">Emplois 1 a 10 sur 1234</div><table><tr><td id="resultsCol">'
+                     + jobs + '</td></tr></table><div class="pagination"><a href="/emplois?start=%d">'
+                     '<span class="pn"><span class="np">Suivant\xc2\xa0\xc2\xbb</span></span></a></div>' % (i * 10))
+
+def extract_indeedList(soup):
+    """
+    extract_jobs, get_nextPageURL and get_total_organicJobs of Indeed_skills_scraping.py.
+    """
+
+    resultsColSoup = soup.find('td', attrs={'id':'resultsCol'})
+    jobs = [(jobSoup.a.text.strip(), jobSoup.get('data-jk'),
+             jobSoup.find('span', attrs={'class':'location'}).text.strip(),
+             jobSoup.get('data-tn-component'),
+             jobSoup.find('span', attrs={'class':'company'}).text.strip())
+            for jobSoup in resultsColSoup.findAll('div', attrs={'data-jk':not None})]
+    pageBoxSoup = soup.find('div', attrs={'class':'pagination'})
+    np = pageBoxSoup.find('span', attrs={'class':'np'}, text=u'Suivant\xa0\xbb')
+    total = int(soup.find('div', attrs={'id':'searchCount'}).text.strip().split(' ')[-1])
+    return jobs, np.parent.parent.get('href'), total
+
+def indeed_jobPage(i):
+    return make_page('<div data-tn-component="jobHeader"><b class="jobtitle">Data analyst %d</b>\n'
+                     '<span class="company">Company</span> - <span class="location">Paris</span>\n'
+                     '<span class="no-wrap"> - CDI</span> <span>Salaire : 35 000 EUR</span></div>\n'
+                     '<table><tr><td><span id="job_summary" class="summary"><p>Mission %d</p>'
+                     '<ul><li>SQL</li><li>Python</li></ul>Profil <b>junior</b></span>\n'
+                     '<div class="result-link-bar-container"><div class="result-link-bar">'
+                     '<span class="date">il y a %d jours</span></div></div></td></tr></table>' % (i, i, i % 30))
+
+def extract_indeedJob(jobPageSoup):
+    """
+    extract_allJobsInfo of Indeed_skills_scraping.py (one job page).
+    """
+
+    jobSummarySoup = jobPageSoup.find('span', attrs={'id':'job_summary', 'class':'summary'})
+    jobPost = jobSummarySoup.text
+    infoBoxSoup = jobSummarySoup.find_next_sibling('div', attrs={'class':'result-link-bar-container'}).div
+    postDate = re.sub('il y a', '', infoBoxSoup.find('span', attrs={'class':'date'}).text).strip()
+    jobHeaderSoup = jobPageSoup.find('div', attrs={'data-tn-component':'jobHeader'})
+    jobNoteSoup = jobHeaderSoup.find(attrs={'class':'location'}).next_sibling
+    jobNote = ''
+    while jobNoteSoup is not None:
+        if not is_text(jobNoteSoup): jobNote = jobNote + jobNoteSoup.text
+        jobNoteSoup = jobNoteSoup.next_sibling
+    return jobPost, postDate, jobNote.strip()
+
+# Site name, page generator, extract function, regions of the script
+SITES = [('Firefox addon list', firefox_listPage, extract_firefoxList,
+          [Region('div', attrs={'class':'item addon'}),
+           Region('a', attrs={'class':'button next'})]),
+         ('TripAdvisor location list', tripadvisor_listPage, extract_tripadvisorList,
+          [Region('div', attrs={"class": "listing_title"}),
+           Region(attrs={"class": "nav next rndBtn ui_button primary taLnk"}),
+           Region(attrs={"class": "nav next disabled"})]),
+         ('Indeed job list', indeed_listPage, extract_indeedList,
+          [Region('td', attrs={'id':'resultsCol'}),
+           Region('div', attrs={'class':'pagination'}),
+           Region('div', attrs={'id':'searchCount'})]),
+         ('Indeed job page', indeed_jobPage, extract_indeedJob,
+          [Region('div', attrs={'data-tn-component':'jobHeader'}),
+           Region('span', attrs={'id':'job_summary'}),
+           Region('div', attrs={'class':'result-link-bar-container'})])]
+
+def run_backend(pages, backend, extract, regions=None):
+    """
+    Return (time per page, results) of parse + extract with a backend.
+    """
+
+    startTime = time()
+    results = []
+    for page in pages:
+        try:
+            results.append(extract(parse_html(page, backend, regions)))
+        except Exception as e:
+            results.append(repr(e))
+    return (time() - startTime) / len(pages), results
+
+def count_elements(page, regions=None):
+    return len(parse_html(page, 'lxml', regions).find_all(True))
+
+#------------------------------------------------------------------------------
+# MAIN
+#------------------------------------------------------------------------------
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--pages', type=int, default=100)
+    args = parser.parse_args()
+
+    backends = [backend for backend in PARSER_BACKENDS if backend != 'selectolax' or HTMLParser is not None]
+    if HTMLParser is None: print('selectolax is not installed, backend skipped')
+
+    for siteName, make, extract, regions in SITES:
+        pages = [make(i) for i in range(args.pages)]
+        print('\n%s (%d pages of %.0f KB, %d elements, %d in the regions)'
+              % (siteName, len(pages), sum(len(page) for page in pages) / len(pages) / 1024,
+                 count_elements(pages[0]), count_elements(pages[0], regions)))
+        print('    %-12s %15s %15s' % ('', 'whole page', 'regions'))
+
+        _, expected = run_backend(pages, 'lxml', extract)
+        passing = []
+        for backend in backends:
+            line = '    %-12s' % backend
+            for backendRegions in [None, regions] if uses_regions(backend) else [None]:
+                pageTime, results = run_backend(pages, backend, extract, backendRegions)
+                passed = results == expected
+                if passed: passing.append((pageTime, backend + (' + regions' if backendRegions else '')))
+                line += ' %7.2f ms/page%s' % (pageTime * 1000, '' if passed else ' (DIFFERENT RESULTS)')
+            print(line)
+
+        print('    fastest passing backend:', min(passing)[1])
+
+#------------------------------------------------------------------------------
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, division
+
+"""
+Benchmark of the result tables (scraping_utils/records.py): a table of the
+Firefox addon info (12 columns) built one row at a time with DataFrame.append,
+as the scripts did, then with a RecordBuffer of records turned into a
+DataFrame once. The tables must be the same, the RecordBuffer should take
+milliseconds for 10k rows.
+
+Usage:
+
+    python records_benchmark.py [--rows 10000] [--append-rows 2000]
+
+The append loop is quadratic, it is only run on --append-rows rows.
+
+Environment:
+    1. Python 2.7, pandas
+"""
+
+#------------------------------------------------------------------------------
+# Libraries
+#------------------------------------------------------------------------------
+
+import argparse
+import os
+import sys
+from time import time
+
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from scraping_utils.records import record_type, RecordBuffer
+
+#------------------------------------------------------------------------------
+# Global variables
+#------------------------------------------------------------------------------
+
+AddonInfo = record_type('AddonInfo', ['search_rank', 'addon_name', 'addon_url',
+                                      'active_user', 'version', 'size',
+                                      'release_date', 'number_review', 'rating',
+                                      'author_name', 'author_homepage', 'is_error'])
+
+#------------------------------------------------------------------------------
+# Self-defined functions
+#------------------------------------------------------------------------------
+
+def make_record(i):
+    return AddonInfo(search_rank=i,
+                     addon_name=u'Addon %d' % i,
+                     addon_url='https://addons.mozilla.org/addon/addon-%d/' % i,
+                     active_user=str(1000 + i),
+                     version='1.%d' % (i % 10),
+                     size='%d KiB' % (i % 500),
+                     release_date='2016-11-%02d' % (i % 28 + 1),
+                     number_review=str(i % 300),
+                     rating=str(i % 5),
+                     author_name=u'Author %d' % (i % 100),
+                     author_homepage=None,
+                     is_error=False)
+
+def build_append(records):
+    """
+    Table built with DataFrame.append, one row at a time.
+    """
+
+    table = pd.DataFrame(columns=list(AddonInfo.fields))
+    for record in records:
+        table = table.append(pd.Series(dict(record.items())), ignore_index=True)
+    return table[list(AddonInfo.fields)]
+
+def build_buffer(records):
+    """
+    Table built with a RecordBuffer, once at the end.
+    """
+
+    buffer = RecordBuffer(AddonInfo)
+    for record in records:
+        buffer.append(record)
+    return buffer.to_frame()
+
+def timed(build, records):
+    startTime = time()
+    table = build(records)
+    return time() - startTime, table
+
+#------------------------------------------------------------------------------
+# MAIN
+#------------------------------------------------------------------------------
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--append-rows', type=int, default=2000)
+    args = parser.parse_args()
+
+    records = [make_record(i) for i in range(args.rows)]
+
+    appendRows = min(args.append_rows, args.rows)
+    appendTime, appendTable = timed(build_append, records[:appendRows])
+    bufferTime, bufferTable = timed(build_buffer, records[:appendRows])
+    same = appendTable.astype(object).equals(bufferTable)
+    print('%6d rows: DataFrame.append %8.1f ms, RecordBuffer %6.1f ms (x%.0f)%s'
+          % (appendRows, appendTime * 1000, bufferTime * 1000, appendTime / bufferTime,
+             '' if same else ' (DIFFERENT TABLES)'))
+
+    bufferTime, bufferTable = timed(build_buffer, records)
+    print('%6d rows: RecordBuffer %6.1f ms' % (args.rows, bufferTime * 1000))
+
+#------------------------------------------------------------------------------
@@ -0,0 +1,10 @@
+# -*- coding: utf-8 -*-
+
+"""
+Shared functions used by all the web scraping projects in this repository.
+
+The scripts in each project folder add the repository root to sys.path and
+import from this package, e.g.:
+
+    from scraping_utils.fetch import urlopen_wrapper
+"""
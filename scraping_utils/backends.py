@@ -0,0 +1,770 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, division
+
+"""
+HTML parser backends of BeautifulSoup_wrapper.
+
+Building a BeautifulSoup tree is most of the CPU time of a run once the pages
+are downloaded concurrently. BeautifulSoup_wrapper(url, parser_type) now
+accepts one of these backends:
+    - 'html.parser': BeautifulSoup with the pure-Python parser (slowest)
+    - 'lxml': BeautifulSoup with the lxml parser
+    - 'lxml.html': lxml.html tree (C), no BeautifulSoup tree
+    - 'selectolax': selectolax (C, Modest engine), optional package
+      (pip install selectolax)
+
+The 'lxml.html' and 'selectolax' trees are wrapped in nodes with the part of
+the BeautifulSoup API used by the extract functions of the scripts: find,
+find_all/findAll (name, attrs, text, recursive, limit), text, string, get,
+[], child tag access (node.div), parent, contents, next_sibling,
+previous_sibling and next_element/next. The searches are done in C (XPath
+for lxml, CSS selectors for selectolax) when the filters are plain strings.
+
+Each site chooses the fastest backend which gives the same results as
+BeautifulSoup for its extract functions, see benchmarks/parser_benchmark.py.
+
+A site can also declare the page regions its extract functions read, with the
+same filters as find():
+
+    addonListRegions = [Region('div', {'class':'item addon'}),
+                        Region('a', {'class':'button next'})]
+    soup = BeautifulSoup_wrapper(url, HTML_PARSER, regions=addonListRegions)
+
+With BeautifulSoup, the tree then only contains these regions (with
+everything inside them), in page order, as children of the root: the other
+tags are skipped while parsing (SoupStrainer), the Python objects of the rest
+of the page are never built. lxml.html and selectolax build the whole tree in
+C anyway, faster than any walk in Python to keep only the regions (which made
+their parse slower, with no memory saved for selectolax): they ignore the
+regions and return the whole page, on which find() gives the same results.
+
+The page is given as bytes with its encoding when it is known (learned per
+host, see charset.py): BeautifulSoup tries this encoding first, lxml.html
+decodes the bytes in C, selectolax gets the page decoded in one pass. Without
+encoding, the page is decoded the same way as BeautifulSoup (UnicodeDammit).
+"""
+
+#------------------------------------------------------------------------------
+# Libraries
+#------------------------------------------------------------------------------
+
+import re
+import threading
+
+from bs4 import BeautifulSoup, SoupStrainer, UnicodeDammit
+from bs4.element import NavigableString
+from lxml import etree
+import lxml.html
+
+# Optional package
+try:
+    from selectolax.parser import HTMLParser
+except ImportError:
+    HTMLParser = None
+
+#------------------------------------------------------------------------------
+# Global variables
+#------------------------------------------------------------------------------
+
+BEAUTIFULSOUP_PARSERS = ('html.parser', 'lxml', 'html5lib')
+PARSER_BACKENDS = ('html.parser', 'lxml', 'lxml.html', 'selectolax')
+
+MULTI_VALUED_ATTRIBUTES = ('class', 'rel') # Returned as a list by get(), as in BeautifulSoup
+
+NAME_PATTERN = re.compile(r'^[A-Za-z_][\w.-]*$') # Tag and attribute names usable in XPath and CSS
+
+_local = threading.local() # Compiled XPath queries of each thread
+
+#------------------------------------------------------------------------------
+# Self-defined functions
+#------------------------------------------------------------------------------
+
+def parse_html(markup, backend='lxml', regions=None, encoding=None):
+    """
+    Parse an HTML page (string or file-like object) with a backend, return the
+    root node. If regions (list of Region) is given, BeautifulSoup only keeps
+    these regions (see uses_regions).
+    encoding is the encoding of a page given as bytes, None to detect it.
+    """
+
+    if backend in BEAUTIFULSOUP_PARSERS:
+        if isinstance(markup, unicode): encoding = None # BeautifulSoup warns about it
+        if regions: return BeautifulSoup(markup, backend, parse_only=region_strainer(regions),
+                                         from_encoding=encoding)
+        return BeautifulSoup(markup, backend, from_encoding=encoding)
+
+    if hasattr(markup, 'read'): markup = markup.read()
+
+    if backend == 'lxml.html':
+        return LxmlNode(_lxml_document(markup, encoding))
+
+    if backend == 'selectolax':
+        if HTMLParser is None:
+            raise ImportError('the selectolax backend needs the selectolax package (pip install selectolax)')
+        return SelectolaxNode(HTMLParser(to_unicode(markup, encoding)).css_first(u'html'))
+
+    raise ValueError('unknown parser backend: %s (choose from %s)'
+                     % (backend, ', '.join(PARSER_BACKENDS)))
+
+def first_backend(backends):
+    """
+    Return the first installed backend of a list, e.g. ['selectolax', 'lxml.html']
+    (selectolax is optional).
+    """
+
+    for backend in backends:
+        if backend != 'selectolax' or HTMLParser is not None: return backend
+    return 'lxml'
+
+def to_unicode(markup, encoding=None):
+    """
+    Decode a page with its encoding, else the same way as BeautifulSoup
+    (declared encoding, else detected), so all backends read the same text.
+    """
+
+    if isinstance(markup, unicode): return markup
+    if encoding is not None:
+        try:
+            return markup.decode(encoding)
+        except (UnicodeDecodeError, LookupError):
+            pass # Wrong encoding for this page, detect it
+    return UnicodeDammit(markup, is_html=True).unicode_markup
+
+def is_text(node):
+    """
+    Tell if a node is a text node (isinstance(node, NavigableString) for all
+    backends).
+    """
+
+    return isinstance(node, (NavigableString, TextNode))
+
+def normalize_filters(name, attrs, kwargs):
+    """
+    Return the (name, attrs) filters of find(), same arguments as BeautifulSoup.
+    """
+
+    if isinstance(attrs, basestring): attrs = {'class':attrs} # find('div', 'item')
+    attrs = dict(attrs or {})
+    for key, value in kwargs.items():
+        attrs['class' if key == 'class_' else key] = value
+    return name, attrs
+
+def match_value(value, expected):
+    """
+    Match one attribute (or tag name) value against a find() filter.
+    """
+
+    if expected is True: return value is not None
+    if expected is None or expected is False: return value is None
+    if value is None: return False
+    if isinstance(expected, basestring): return value == expected
+    if isinstance(expected, (list, tuple, set)): return any(match_value(value, e) for e in expected)
+    if hasattr(expected, 'search'): return expected.search(value) is not None
+    if callable(expected): return expected(value)
+    return value == expected
+
+def match_attribute(key, value, expected):
+    """
+    Match an attribute, the class attribute matches one of its classes or the
+    whole attribute, as in BeautifulSoup.
+    """
+
+    if key == 'class' and value is not None and expected not in (True, None, False):
+        return match_value(value, expected) or any(match_value(c, expected) for c in value.split())
+    return match_value(value, expected)
+
+def match_text(node, text):
+    if text is None: return True
+    return match_value(node.string, text)
+
+def is_simple(name, attrs):
+    """
+    Tell if the filters can be translated into an XPath or CSS query.
+    """
+
+    if name is not None and name is not True and not (isinstance(name, basestring) and NAME_PATTERN.match(name)):
+        return False
+    for key, value in attrs.items():
+        if not NAME_PATTERN.match(key): return False
+        if value not in (True, None, False) and not isinstance(value, basestring): return False
+    return True
+
+class Region(object):
+    """
+    A region of a page read by the extract functions: the tags matching a
+    name and attrs filter, same arguments as find().
+
+    required tells when a streamed page has everything the extract functions
+    need (see stream.py): True if the region must be found, or a group name
+    if one region of the group must be found (e.g. the 'next' and 'disabled
+    next' buttons).
+    """
+
+    def __init__(self, name=None, attrs={}, required=False, **kwargs):
+        self.name, self.attrs = normalize_filters(name, attrs, kwargs)
+        self.required = required
+        self.key = (repr(self.name), tuple(sorted((key, repr(value)) for key, value in self.attrs.items())))
+
+    def __repr__(self):
+        return 'Region(%r, %r)' % (self.name, self.attrs)
+
+    def matches_name(self, name):
+        return self.name is None or self.name is True or match_value(name, self.name)
+
+    def matches(self, name, attrs):
+        """
+        Tell if a tag (name, attributes dict) is in this region.
+        """
+
+        if not self.matches_name(name): return False
+        for key, expected in self.attrs.items():
+            value = attrs.get(key)
+            if isinstance(value, list): value = u' '.join(value) # Multi-valued attribute parsed by BeautifulSoup
+            elif value is None and key in attrs: value = u'' # Attribute without value (selectolax)
+            if not match_attribute(key, value, expected): return False
+        return True
+
+def uses_regions(backend):
+    """
+    Tell if a backend only builds the regions of a page: the BeautifulSoup
+    parsers, the C trees are always built whole.
+    """
+
+    return backend in BEAUTIFULSOUP_PARSERS
+
+def regions_key(regions):
+    """
+    Hashable key of a list of regions (parse memo).
+    """
+
+    return tuple(region.key for region in regions) if regions else None
+
+def region_strainer(regions):
+    """
+    Return the SoupStrainer of a list of regions: BeautifulSoup only builds
+    the matching tags (and their content).
+    """
+
+    return SoupStrainer(lambda name, attrs: any(region.matches(name, attrs) for region in regions))
+
+class PageElement(object):
+    """
+    Navigation shared by the element and text nodes.
+    """
+
+    @property
+    def next(self):
+        return self.next_element
+
+    def find_next_sibling(self, name=None, attrs={}, text=None, **kwargs):
+        name, attrs = normalize_filters(name, attrs, kwargs)
+        node = self.next_sibling
+        while node is not None:
+            if not is_text(node) and node.matches(name, attrs) and match_text(node, text): return node
+            node = node.next_sibling
+        return None
+    findNextSibling = find_next_sibling
+
+class TextNode(unicode, PageElement):
+    """
+    A text node, the string itself, with the navigation attributes of
+    BeautifulSoup NavigableString.
+    """
+
+    name = None
+
+    @property
+    def text(self):
+        return unicode(self)
+
+    @property
+    def string(self):
+        return self
+
+    def get_text(self, separator=u'', strip=False):
+        return self.strip() if strip else unicode(self)
+
+class Node(PageElement):
+    """
+    An element node, with the part of the BeautifulSoup Tag API used by the
+    scripts. Subclasses implement the tree access of one backend.
+    """
+
+    # Tree access, implemented by the backends
+    name = None
+    attrs = {}
+    parent = None
+    contents = []
+    next_sibling = None
+    previous_sibling = None
+    next_element = None
+
+    def _select(self, name, attrs, recursive, limit):
+        raise NotImplementedError
+
+    def _descendants(self):
+        """
+        All the nodes inside this node (elements and texts), in document order.
+        """
+
+        for child in self.contents:
+            yield child
+            if not is_text(child):
+                for node in child._descendants(): yield node
+
+    # BeautifulSoup API
+    def __nonzero__(self):
+        return True
+    __bool__ = __nonzero__
+
+    def __iter__(self):
+        return iter(self.contents)
+
+    def __len__(self):
+        return len(self.contents)
+
+    def __getattr__(self, name):
+        if name.startswith('_'): raise AttributeError(name)
+        return self.find(name) # node.div is the first div inside node
+
+    def __getitem__(self, key):
+        value = self.get(key)
+        if value is None: raise KeyError(key)
+        return value
+
+    def get(self, key, default=None):
+        value = self.attrs.get(key)
+        if value is None: return default
+        if key in MULTI_VALUED_ATTRIBUTES: return value.split()
+        return value
+
+    def has_attr(self, key):
+        return key in self.attrs
+
+    @property
+    def children(self):
+        return iter(self.contents)
+
+    @property
+    def descendants(self):
+        return self._descendants()
+
+    @property
+    def string(self):
+        contents = self.contents
+        if len(contents) != 1: return None
+        if is_text(contents[0]): return contents[0]
+        return contents[0].string
+
+    def get_text(self, separator=u'', strip=False):
+        if not separator and not strip: return self.text
+        texts = [node for node in self._descendants() if is_text(node) and not isinstance(node, CommentNode)]
+        if strip: texts = [t.strip() for t in texts if t.strip()]
+        return separator.join(texts)
+    getText = get_text
+
+    def matches(self, name, attrs):
+        if name is not None and name is not True and not match_value(self.name, name): return False
+        return all(match_attribute(key, self.attrs.get(key), expected)
+                   for key, expected in attrs.items())
+
+    def find_all(self, name=None, attrs={}, recursive=True, text=None, limit=None, **kwargs):
+        name, attrs = normalize_filters(name, attrs, kwargs)
+
+        if name is None and not attrs and text is not None: # Search text nodes
+            nodes = self._descendants() if recursive else iter(self.contents)
+            results = [node for node in nodes
+                       if is_text(node) and not isinstance(node, CommentNode) and match_value(node, text)]
+            return results[:limit] if limit else results
+
+        if is_simple(name, attrs):
+            nodes = self._select(name, attrs, recursive, None if text is not None else limit)
+        else: # Filters with lists, regular expressions or functions
+            nodes = self._descendants() if recursive else iter(self.contents)
+            nodes = [node for node in nodes if not is_text(node) and node.matches(name, attrs)]
+
+        if text is not None: nodes = [node for node in nodes if match_text(node, text)]
+        return nodes[:limit] if limit else nodes
+    findAll = find_all
+    findChildren = find_all
+
+    def find(self, name=None, attrs={}, recursive=True, text=None, **kwargs):
+        results = self.find_all(name, attrs, recursive, text, 1, **kwargs)
+        return results[0] if results else None
+    findChild = find
+
+#------------------------------------------------------------------------------
+# lxml.html backend
+#------------------------------------------------------------------------------
+
+def _lxml_wrap(el):
+    if el is None: return None
+    if not isinstance(el.tag, basestring): return CommentNode(el.text or u'', el, 'comment')
+    return LxmlNode(el)
+
+def _lxml_after(el):
+    """
+    The sibling node after the element el.
+    """
+
+    if el.tail: return LxmlText(el.tail, el, 'tail')
+    return _lxml_wrap(el.getnext())
+
+def _lxml_afterEnd(el):
+    """
+    The next node in document order after the end of the element el.
+    """
+
+    while el is not None:
+        node = _lxml_after(el)
+        if node is not None: return node
+        el = el.getparent()
+    return None
+
+def _lxml_before(el):
+    """
+    The sibling node before the element el.
+    """
+
+    previous = el.getprevious()
+    if previous is not None:
+        return LxmlText(previous.tail, previous, 'tail') if previous.tail else _lxml_wrap(previous)
+    parent = el.getparent()
+    if parent is not None and parent.text: return LxmlText(parent.text, parent, 'text')
+    return None
+
+def _lxml_parser(encoding):
+    """
+    Return the lxml.html parser of an encoding (one per thread and encoding).
+    """
+
+    parsers = getattr(_local, 'lxmlParsers', None)
+    if parsers is None: parsers = _local.lxmlParsers = {}
+    parser = parsers.get(encoding)
+    if parser is None:
+        parser = parsers[encoding] = lxml.html.HTMLParser(encoding=encoding)
+    return parser
+
+def _lxml_document(markup, encoding=None):
+    """
+    Parse a page with lxml.html. Bytes with a known encoding are decoded by
+    libxml2, else the page is decoded first (to_unicode).
+    """
+
+    if encoding is not None and not isinstance(markup, unicode):
+        try:
+            return lxml.html.document_fromstring(markup, parser=_lxml_parser(encoding))
+        except (LookupError, etree.ParserError):
+            pass # Encoding unknown by libxml2, or empty document
+    text = to_unicode(markup, encoding)
+    try:
+        return lxml.html.document_fromstring(text)
+    except ValueError: # Unicode page with an XML encoding declaration
+        return lxml.html.document_fromstring(markup)
+
+def _lxml_predicates(attrs, prefix='v'):
+    """
+    Return (XPath predicates, variables) of find() attrs filters.
+    """
+
+    predicates = []
+    variables = {}
+    for index, (key, value) in enumerate(sorted(attrs.items())):
+        if value is True:
+            predicates.append('@%s' % key)
+        elif value is None or value is False:
+            predicates.append('not(@%s)' % key)
+        else:
+            variable = '%s%d' % (prefix, index)
+            variables[variable] = value
+            if key == 'class' and ' ' not in value.strip(): # One of the classes (contains() first, faster)
+                predicates.append('contains(@class, $%s)' % variable)
+                predicates.append("contains(concat(' ', normalize-space(@class), ' '), concat(' ', $%s, ' '))"
+                                  % variable)
+            else:
+                predicates.append('@%s=$%s' % (key, variable))
+    return predicates, variables
+
+def _lxml_query(name, attrs, recursive):
+    """
+    Return (XPath query, variables) of find() filters.
+    """
+
+    predicates, variables = _lxml_predicates(attrs)
+    query = '%s::%s' % ('descendant' if recursive else 'child',
+                        name if isinstance(name, basestring) else '*')
+    query += ''.join('[%s]' % predicate for predicate in predicates)
+    return query, variables
+
+def _lxml_xpath(query):
+    cache = getattr(_local, 'xpaths', None)
+    if cache is None:
+        cache = _local.xpaths = {}
+    xpath = cache.get(query)
+    if xpath is None:
+        xpath = cache[query] = etree.XPath(query)
+    return xpath
+
+class LxmlText(TextNode):
+    """
+    Text of an lxml element: its text (kind 'text') or its tail ('tail').
+    """
+
+    def __new__(cls, value, el, kind):
+        node = TextNode.__new__(cls, value)
+        node._el = el
+        node._kind = kind
+        return node
+
+    @property
+    def parent(self):
+        return LxmlNode(self._el) if self._kind == 'text' else _lxml_wrap(self._el.getparent())
+
+    @property
+    def next_sibling(self):
+        if self._kind == 'text': return _lxml_wrap(self._el[0]) if len(self._el) else None
+        if self._kind == 'tail': return _lxml_wrap(self._el.getnext())
+        return _lxml_after(self._el) # Comment
+
+    @property
+    def previous_sibling(self):
+        if self._kind == 'text': return None
+        if self._kind == 'tail': return _lxml_wrap(self._el)
+        return _lxml_before(self._el)
+
+    @property
+    def next_element(self):
+        if self._kind == 'text' and len(self._el): return _lxml_wrap(self._el[0])
+        if self._kind == 'tail':
+            nextEl = self._el.getnext()
+            if nextEl is not None: return _lxml_wrap(nextEl)
+            return _lxml_afterEnd(self._el.getparent())
+        return _lxml_afterEnd(self._el) # End of the element or comment
+
+class CommentNode(LxmlText):
+    """
+    An HTML comment (not part of the text of its parent).
+    """
+
+class LxmlNode(Node):
+    """
+    Element of an lxml.html tree. The lxml element is node.element.
+    """
+
+    def __init__(self, el):
+        self.element = el
+
+    def __eq__(self, other):
+        return isinstance(other, LxmlNode) and other.element is self.element
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self.element)
+
+    def __unicode__(self):
+        return etree.tostring(self.element, encoding=unicode, method='html', with_tail=False)
+
+    def __repr__(self):
+        return self.__unicode__().encode('utf-8')
+    __str__ = __repr__
+
+    @property
+    def name(self):
+        return self.element.tag
+
+    @property
+    def attrs(self):
+        return dict(self.element.attrib)
+
+    def get(self, key, default=None):
+        value = self.element.get(key)
+        if value is None: return default
+        if key in MULTI_VALUED_ATTRIBUTES: return value.split()
+        return value
+
+    def has_attr(self, key):
+        return key in self.element.attrib
+
+    @property
+    def text(self):
+        return self.element.text_content()
+
+    @property
+    def parent(self):
+        return _lxml_wrap(self.element.getparent())
+
+    @property
+    def contents(self):
+        el = self.element
+        nodes = [LxmlText(el.text, el, 'text')] if el.text else []
+        for child in el:
+            nodes.append(_lxml_wrap(child))
+            if child.tail: nodes.append(LxmlText(child.tail, child, 'tail'))
+        return nodes
+
+    @property
+    def next_sibling(self):
+        return _lxml_after(self.element)
+
+    @property
+    def previous_sibling(self):
+        return _lxml_before(self.element)
+
+    @property
+    def next_element(self):
+        el = self.element
+        if el.text: return LxmlText(el.text, el, 'text')
+        if len(el): return _lxml_wrap(el[0])
+        return _lxml_afterEnd(el)
+
+    def _select(self, name, attrs, recursive, limit):
+        query, variables = _lxml_query(name, attrs, recursive)
+        elements = _lxml_xpath(query)(self.element, **variables)
+        if limit: elements = elements[:limit]
+        return [LxmlNode(el) for el in elements]
+
+#------------------------------------------------------------------------------
+# selectolax backend
+#------------------------------------------------------------------------------
+
+def _selectolax_wrap(node):
+    if node is None: return None
+    if node.tag == u'-text': return SelectolaxText(node.text(deep=False), node)
+    if node.tag.startswith((u'-', u'_')): # Comment...
+        return SelectolaxComment(u'', node)
+    return SelectolaxNode(node)
+
+def _css_string(value):
+    return u'"%s"' % value.replace(u'\\', u'\\\\').replace(u'"', u'\\"')
+
+def _selectolax_query(name, attrs):
+    """
+    Return the CSS selector of find() filters.
+    """
+
+    selector = name if isinstance(name, basestring) else u'*'
+    for key, value in sorted(attrs.items()):
+        if value is True:
+            selector += u'[%s]' % key
+        elif value is None or value is False:
+            selector += u':not([%s])' % key
+        elif key == 'class' and ' ' not in value.strip():
+            selector += u'[class~=%s]' % _css_string(value)
+        else:
+            selector += u'[%s=%s]' % (key, _css_string(value))
+    return unicode(selector)
+
+class SelectolaxText(TextNode):
+    def __new__(cls, value, node):
+        textNode = TextNode.__new__(cls, value)
+        textNode._node = node
+        return textNode
+
+    @property
+    def parent(self):
+        return _selectolax_wrap(self._node.parent)
+
+    @property
+    def next_sibling(self):
+        return _selectolax_wrap(self._node.next)
+
+    @property
+    def previous_sibling(self):
+        return _selectolax_wrap(self._node.prev)
+
+    @property
+    def next_element(self):
+        return _selectolax_wrap(_selectolax_following(self._node))
+
+class SelectolaxComment(SelectolaxText, CommentNode):
+    pass
+
+def _selectolax_following(node):
+    """
+    The next node in document order after the end of node.
+    """
+
+    while node is not None:
+        if node.next is not None: return node.next
+        node = node.parent
+    return None
+
+class SelectolaxNode(Node):
+    """
+    Element of a selectolax tree. The selectolax node is node.element.
+    """
+
+    def __init__(self, node):
+        self.element = node
+
+    def __eq__(self, other):
+        return isinstance(other, SelectolaxNode) and other.element == self.element # Same HTML
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __unicode__(self):
+        return self.element.html
+
+    def __repr__(self):
+        return self.element.html.encode('utf-8')
+    __str__ = __repr__
+
+    @property
+    def name(self):
+        return self.element.tag
+
+    @property
+    def attrs(self):
+        return dict((key, value if value is not None else u'')
+                    for key, value in self.element.attributes.items())
+
+    @property
+    def text(self):
+        return self.element.text(deep=True)
+
+    @property
+    def parent(self):
+        parent = self.element.parent
+        if parent is None or parent.tag == u'-undef': return None
+        return _selectolax_wrap(parent)
+
+    @property
+    def contents(self):
+        nodes = []
+        child = self.element.child
+        while child is not None:
+            nodes.append(_selectolax_wrap(child))
+            child = child.next
+        return nodes
+
+    @property
+    def next_sibling(self):
+        return _selectolax_wrap(self.element.next)
+
+    @property
+    def previous_sibling(self):
+        return _selectolax_wrap(self.element.prev)
+
+    @property
+    def next_element(self):
+        if self.element.child is not None: return _selectolax_wrap(self.element.child)
+        return _selectolax_wrap(_selectolax_following(self.element))
+
+    def _select(self, name, attrs, recursive, limit):
+        if not recursive:
+            return [node for node in self.contents
+                    if not is_text(node) and node.matches(name, attrs)][:limit]
+        # node.css() also matches the node itself: search from each child element
+        query = _selectolax_query(name, attrs)
+        nodes = []
+        child = self.element.child
+        while child is not None and not (limit and len(nodes) >= limit):
+            if not child.tag.startswith((u'-', u'_')): nodes.extend(child.css(query))
+            child = child.next
+        if limit: nodes = nodes[:limit]
+        return [SelectolaxNode(node) for node in nodes]
+
+#------------------------------------------------------------------------------
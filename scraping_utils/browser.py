@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, division
+
+"""
+Shared functions for the scripts driving a web browser with Selenium.
+
+click_wrapper was copied in every Selenium script and retried every error.
+Now only the errors which can disappear by waiting (element not visible or
+covered yet, page still loading, lost connection to the driver) are retried,
+with the shared retry policy (retry.py). A stale element or a missing element
+(the page layout changed) gives the same error at every try, so the click
+fails at once.
+"""
+
+#------------------------------------------------------------------------------
+# Libraries
+#------------------------------------------------------------------------------
+
+from selenium.common.exceptions import (WebDriverException, StaleElementReferenceException,
+                                        NoSuchElementException)
+
+from scraping_utils.fetch import update_errorLog
+from scraping_utils.failures import classify_error, record_failure, TRANSIENT
+from scraping_utils.retry import call_with_retry
+
+#------------------------------------------------------------------------------
+# Self-defined functions
+#------------------------------------------------------------------------------
+
+def is_transient_click(e):
+    """
+    Tell if a click error can disappear by waiting.
+    """
+
+    if isinstance(e, (StaleElementReferenceException, NoSuchElementException)):
+        return False
+    if isinstance(e, WebDriverException): # Not clickable, not visible, timeout...
+        return True
+    return classify_error(e) == TRANSIENT
+
+def click_wrapper(object_click, num_retry=5, delay=5):
+    """
+    Function to simulate a click, try several times if cannot click
+    """
+
+    try:
+        call_with_retry(object_click.click, (), num_retry, delay, retry_on=is_transient_click)
+        #print('Click successful!')
+        return True
+
+    except Exception as e:
+        print('ERROR clicking:', e)
+        error = e
+
+    # If try many time but failed
+    try:
+        objectText = object_click.text.strip()
+    except Exception: # Element not in the page any more
+        objectText = ''
+    print('FAILED to click on this object.')
+    update_errorLog('FAILED_CLICKING_OBJECT' + ' | ' + objectText) # Add to log
+    record_failure('click: ' + objectText, error, TRANSIENT if is_transient_click(error) else None)
+    return False
+
+#------------------------------------------------------------------------------
@@ -0,0 +1,285 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, division
+
+"""
+Persistent on-disk cache of downloaded pages.
+
+Every run of a script used to download every page again, even the pages
+downloaded a few minutes before by a crashed run. The shared HTTP client
+(fetch.py) now looks in this cache first:
+    - A fresh entry (younger than its TTL) is returned without any request.
+    - A stale entry is revalidated with If-None-Match / If-Modified-Since,
+    a 304 response only refreshes the entry (no download).
+    - The cache size is limited, least recently used entries are removed first.
+
+Folder structure (content-addressed, the same page body is stored once):
+    cache/meta/<sha1 of url>.json : url, headers, ETag, Last-Modified, TTL...
+    cache/body/<sha1 of body>     : page body
+
+Cache modes:
+    - normal  : use fresh entries, revalidate stale entries
+    - refresh : always download again, then update the cache
+    - offline : only use the cache, never open a connection
+The scripts do not use the cache unless --cache-mode is given (cli.py): a
+fresh listing page would give the search ranks of a previous run.
+"""
+
+#------------------------------------------------------------------------------
+# Libraries
+#------------------------------------------------------------------------------
+
+import hashlib
+import json
+import mimetools
+import threading
+from StringIO import StringIO
+
+# Other packages
+import os
+from time import time
+
+#------------------------------------------------------------------------------
+# Global variables
+#------------------------------------------------------------------------------
+
+CACHE_MODES = ['normal', 'refresh', 'offline']
+
+DEFAULT_TTL = 24 * 3600 # Seconds
+DEFAULT_MAX_SIZE = 500 * 1024 * 1024 # Bytes
+
+#------------------------------------------------------------------------------
+# Self-defined functions
+#------------------------------------------------------------------------------
+
+def url_key(url):
+    """
+    Return the file name used to store the information of an url.
+    """
+
+    if isinstance(url, unicode): url = url.encode('utf-8')
+    return hashlib.sha1(url).hexdigest()
+
+def write_file(path, data):
+    """
+    Write a file atomically: write to a temporary file, then rename it.
+    """
+
+    tmpPath = '%s.%d.%d.tmp' % (path, os.getpid(), threading.current_thread().ident)
+    with open(tmpPath, 'wb') as f:
+        f.write(data)
+    os.rename(tmpPath, path)
+
+class CacheEntry(object):
+    """
+    A page stored in the cache.
+    """
+
+    def __init__(self, meta, body):
+        self.meta = meta
+        self.body = body
+
+    @property
+    def etag(self):
+        return self.meta.get('etag')
+
+    @property
+    def last_modified(self):
+        return self.meta.get('last_modified')
+
+    @property
+    def digest(self):
+        return self.meta['digest']
+
+    def is_fresh(self, max_ttl=None):
+        """
+        The entry is fresh if it is younger than its TTL (and than max_ttl,
+        the TTL currently configured for the cache).
+        """
+
+        ttl = self.meta['ttl'] if max_ttl is None else min(self.meta['ttl'], max_ttl)
+        return self.meta['stored'] + ttl > time()
+
+    def get_headers(self):
+        """
+        Return the stored response headers as a mimetools.Message, the same
+        type as the headers of a urllib2 response.
+        """
+
+        return mimetools.Message(StringIO(''.join(self.meta['headers'])))
+
+    def conditional_headers(self):
+        """
+        Return the request headers used to revalidate this entry.
+        """
+
+        headers = {}
+        if self.etag is not None: headers['If-None-Match'] = self.etag
+        if self.last_modified is not None: headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+class DiskCache(object):
+    """
+    Thread-safe on-disk page cache with a LRU size cap.
+    """
+
+    def __init__(self, folder='cache', mode='normal', ttl=DEFAULT_TTL,
+                 max_size=DEFAULT_MAX_SIZE):
+
+        if mode not in CACHE_MODES:
+            raise ValueError('Unknown cache mode: %s' % mode)
+
+        self.folder = folder
+        self.mode = mode
+        self.ttl = ttl
+        self.max_size = max_size
+
+        self.metaFolder = os.path.join(folder, 'meta')
+        self.bodyFolder = os.path.join(folder, 'body')
+        for path in [self.metaFolder, self.bodyFolder]:
+            if not os.path.exists(path): os.makedirs(path)
+
+        self._lock = threading.Lock()
+        self._index = {} # url key -> [last access time, body digest]
+        self._bodySize = {} # body digest -> size in bytes
+        self._bodyCount = {} # body digest -> number of urls using it
+        self.size = 0
+        self._load_index()
+        self._evict()
+
+    def _load_index(self):
+        """
+        Scan the cache folder to build the LRU index (last access time is the
+        modification time of the meta file).
+        """
+
+        for name in os.listdir(self.metaFolder):
+            if not name.endswith('.json'): continue
+            path = os.path.join(self.metaFolder, name)
+            try:
+                with open(path, 'rb') as f:
+                    digest = json.load(f)['digest']
+                bodySize = os.path.getsize(os.path.join(self.bodyFolder, digest))
+            except (IOError, OSError, ValueError, KeyError):
+                os.remove(path) # Broken entry
+                continue
+            self._add_index(name[:-5], os.path.getmtime(path), digest, bodySize)
+
+    def _add_index(self, key, lastAccess, digest, bodySize):
+        self._index[key] = [lastAccess, digest]
+        if digest not in self._bodyCount:
+            self._bodyCount[digest] = 0
+            self._bodySize[digest] = bodySize
+            self.size += bodySize
+        self._bodyCount[digest] += 1
+
+    def _remove_index(self, key):
+        """
+        Remove an url from the index, delete its body if no other url uses it.
+        """
+
+        _, digest = self._index.pop(key)
+        self._bodyCount[digest] -= 1
+        if self._bodyCount[digest] == 0:
+            del self._bodyCount[digest]
+            self.size -= self._bodySize.pop(digest)
+            try:
+                os.remove(os.path.join(self.bodyFolder, digest))
+            except OSError:
+                pass
+
+    def _meta_path(self, key):
+        return os.path.join(self.metaFolder, key + '.json')
+
+    def get(self, url):
+        """
+        Return the CacheEntry of the url, or None if it is not in the cache.
+        """
+
+        key = url_key(url)
+        with self._lock:
+            if key not in self._index: return None
+            try:
+                with open(self._meta_path(key), 'rb') as f:
+                    meta = json.load(f)
+                with open(os.path.join(self.bodyFolder, meta['digest']), 'rb') as f:
+                    body = f.read()
+            except (IOError, OSError, ValueError, KeyError):
+                return None
+
+            # Update the last access time
+            self._index[key][0] = time()
+            os.utime(self._meta_path(key), None)
+
+        return CacheEntry(meta, body)
+
+    def put(self, url, page, ttl=None):
+        """
+        Store a downloaded page (a fetch.Response object) in the cache.
+        """
+
+        key = url_key(url)
+        digest = page.digest
+        headers = page.headers
+        meta = {'url':url,
+                'final_url':page.url,
+                'code':page.code,
+                'msg':page.msg,
+                'headers':list(headers.headers) if headers is not None else [],
+                'etag':headers.getheader('etag') if headers is not None else None,
+                'last_modified':headers.getheader('last-modified') if headers is not None else None,
+                'digest':digest,
+                'stored':time(),
+                'ttl':self.ttl if ttl is None else ttl}
+
+        with self._lock:
+            if key in self._index and self._index[key][1] == digest: # Same body
+                write_file(self._meta_path(key), json.dumps(meta))
+                self._index[key][0] = time()
+                return
+
+            if key in self._index: self._remove_index(key)
+
+            bodyPath = os.path.join(self.bodyFolder, digest)
+            if digest not in self._bodyCount:
+                write_file(bodyPath, page.body)
+            write_file(self._meta_path(key), json.dumps(meta))
+
+            self._add_index(key, time(), digest, len(page.body))
+            self._evict()
+
+    def revalidate(self, url, entry, headers=None):
+        """
+        Mark the entry as fresh again after a 304 (Not Modified) response, keep
+        the new ETag / Last-Modified if the server sent them.
+        """
+
+        meta = dict(entry.meta)
+        meta['stored'] = time()
+        if headers is not None:
+            if headers.getheader('etag'): meta['etag'] = headers.getheader('etag')
+            if headers.getheader('last-modified'): meta['last_modified'] = headers.getheader('last-modified')
+
+        key = url_key(url)
+        with self._lock:
+            if key not in self._index: return
+            write_file(self._meta_path(key), json.dumps(meta))
+            self._index[key][0] = time()
+        entry.meta = meta
+
+    def _evict(self):
+        """
+        Remove the least recently used entries until the cache fits max_size.
+        """
+
+        if self.size <= self.max_size: return
+
+        lruKeys = sorted(self._index, key=lambda k: self._index[k][0])
+        for key in lruKeys:
+            if self.size <= self.max_size: break
+            self._remove_index(key)
+            try:
+                os.remove(self._meta_path(key))
+            except OSError:
+                pass
+
+#------------------------------------------------------------------------------
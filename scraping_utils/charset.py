@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, division
+
+"""
+Character encoding of the downloaded pages, learned once per host.
+
+BeautifulSoup (UnicodeDammit) looked for the encoding of every page: declared
+encodings, then a detection over the whole page, then several decode attempts,
+each one a full copy of the page (the Vietnamese pages of tuoitre/Lazada and
+the French pages of Indeed are not ASCII). The pages of one host almost always
+have the same encoding, so it is now found once per host:
+    1. the charset of the Content-Type header of the response, if any
+    2. else the encoding already learned for the host
+    3. else the <meta charset> (or http-equiv Content-Type) tag at the start
+    of the page, else the encoding detected by UnicodeDammit
+and kept for the next pages of the host. The page bytes are then given to the
+parser with this encoding (Response.encoding, see backends.parse_html), which
+decodes them in one pass (in C for lxml.html) without detection.
+"""
+
+#------------------------------------------------------------------------------
+# Libraries
+#------------------------------------------------------------------------------
+
+import codecs
+import re
+import threading
+
+from bs4 import UnicodeDammit
+
+from scraping_utils.retry import get_host
+
+#------------------------------------------------------------------------------
+# Global variables
+#------------------------------------------------------------------------------
+
+META_SNIFF_BYTES = 4096 # The meta tag must be at the start of the page
+
+HEADER_CHARSET = re.compile(r'charset\s*=\s*["\']?([\w.:-]+)', re.I)
+META_CHARSET = re.compile(r'<meta[^>]+charset\s*=\s*["\']?([\w.:-]+)', re.I)
+
+#------------------------------------------------------------------------------
+# Self-defined functions
+#------------------------------------------------------------------------------
+
+def normalize_encoding(name):
+    """
+    Return the Python codec name of an encoding name, None if it is unknown.
+    """
+
+    if not name: return None
+    try:
+        return codecs.lookup(name).name
+    except LookupError:
+        return None
+
+def header_charset(headers):
+    """
+    Return the charset of the Content-Type header (httplib.HTTPMessage or
+    dict), None if there is none.
+    """
+
+    if headers is None: return None
+    match = HEADER_CHARSET.search(headers.get('content-type') or '')
+    return normalize_encoding(match.group(1)) if match else None
+
+def meta_charset(body):
+    """
+    Return the encoding declared by a meta tag at the start of the page.
+    """
+
+    match = META_CHARSET.search(body, 0, META_SNIFF_BYTES)
+    return normalize_encoding(match.group(1)) if match else None
+
+def detect_charset(body):
+    """
+    Return the encoding detected by UnicodeDammit (slow, full page).
+    """
+
+    return normalize_encoding(UnicodeDammit(body, is_html=True).original_encoding)
+
+class HostCharsets(object):
+    """
+    Encoding of the pages of each host (thread-safe).
+    """
+
+    def __init__(self):
+        self._charsets = {}
+        self._lock = threading.Lock()
+
+    def get_encoding(self, url, headers, body):
+        """
+        Return the encoding of a page (see the module docstring), None if it
+        cannot be found (the parser detects it).
+        """
+
+        encoding = header_charset(headers)
+        if encoding is not None: return encoding
+
+        host = get_host(url)
+        with self._lock:
+            encoding = self._charsets.get(host)
+        if encoding is not None: return encoding
+
+        encoding = meta_charset(body) or detect_charset(body)
+        if encoding is not None:
+            with self._lock:
+                self._charsets[host] = encoding
+        return encoding
+
+    def forget(self, url):
+        """
+        Forget the encoding of a host (e.g. a page cannot be decoded with it).
+        """
+
+        with self._lock:
+            self._charsets.pop(get_host(url), None)
+
+_hostCharsets = HostCharsets()
+
+def get_hostCharsets():
+    return _hostCharsets
+
+#------------------------------------------------------------------------------
@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, division
+
+"""
+Shared command line options of the scripts.
+
+Usage in a script:
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('searchTerm')
+    add_fetch_arguments(parser)
+    add_parse_arguments(parser, ['selectolax', 'lxml.html'], parse_pool=True)
+    add_journal_arguments(parser)
+    add_listing_arguments(parser)
+    args = parser.parse_args()
+    configure_parse(args)
+    configure_fetch(args)
+    configure_journal(args, 'output/' + args.searchTerm + '_journal.jsonl')
+"""
+
+#------------------------------------------------------------------------------
+# Libraries
+#------------------------------------------------------------------------------
+
+import atexit
+
+from scraping_utils.fetch import get_client, DEFAULT_MAX_PER_HOST
+from scraping_utils.warc import WARCWriter, WARCArchive
+from scraping_utils.cache import DiskCache, CACHE_MODES, DEFAULT_TTL, DEFAULT_MAX_SIZE
+from scraping_utils.retry import get_policy, RetryBudget, RETRY_BUDGET_MIN
+from scraping_utils.failures import get_failureReport
+from scraping_utils.backends import PARSER_BACKENDS, first_backend
+from scraping_utils.parsepool import set_parsePool
+from scraping_utils.journal import set_journal
+from scraping_utils.pagination import DEFAULT_NUM_WORKERS as LISTING_WORKERS
+
+#------------------------------------------------------------------------------
+# Self-defined functions
+#------------------------------------------------------------------------------
+
+def add_fetch_arguments(parser):
+    """
+    Add the options of the shared fetch layer to an argparse parser.
+    """
+
+    group = parser.add_argument_group('fetch options')
+    group.add_argument('--cache-mode', choices=CACHE_MODES + ['off'], default='off',
+                       help='normal: use fresh pages, revalidate stale pages; '
+                            'refresh: download all pages again; '
+                            'offline: only use cached pages; '
+                            'off: do not use the cache (default: off, a run reads '
+                            'the current listing pages)')
+    group.add_argument('--cache-dir', default='cache',
+                       help='cache folder (default: ./cache)')
+    group.add_argument('--cache-ttl', type=float, default=DEFAULT_TTL / 3600,
+                       help='hours before a cached page is revalidated (default: 24)')
+    group.add_argument('--cache-size', type=float, default=DEFAULT_MAX_SIZE / 1024 / 1024,
+                       help='maximum cache size in MB (default: 500)')
+    group.add_argument('--record', metavar='WARC_FILE',
+                       help='append every HTTP response to this .warc.gz file')
+    group.add_argument('--replay', metavar='WARC_FILE',
+                       help='answer every request from this .warc.gz file, '
+                            'without network access (the cache is not used)')
+    group.add_argument('--max-per-host', type=int, default=DEFAULT_MAX_PER_HOST,
+                       help='maximum number of requests sent at the same time to one '
+                            'host, the actual number is tuned for each host '
+                            '(default: %d)' % DEFAULT_MAX_PER_HOST)
+    group.add_argument('--retry-budget', type=int, default=RETRY_BUDGET_MIN,
+                       help='retries always allowed in this run, more retries are '
+                            'allowed as the run sends requests (default: %d)' % RETRY_BUDGET_MIN)
+    group.add_argument('--http2', action='store_true',
+                       help='use one multiplexed HTTP/2 connection per https host when '
+                            'the host supports it (needs the h2 package)')
+    return group
+
+def add_parse_arguments(parser, backends, parse_pool=False):
+    """
+    Add the --parser option. backends is the choice of the site, fastest first
+    (benchmarks/parser_benchmark.py), the default is the first one installed.
+    parse_pool: add the --parse-workers option, for the scripts extracting
+    their pages with extract_wrapper (see parsepool.py).
+    """
+
+    group = parser.add_argument_group('parse options')
+    group.add_argument('--parser', choices=PARSER_BACKENDS, default=first_backend(backends),
+                       help='HTML parser backend (default: %s)' % first_backend(backends))
+    if parse_pool:
+        group.add_argument('--parse-workers', type=int, default=0,
+                           help='number of processes parsing the pages, e.g. the number of '
+                                'CPU cores; 0: parse in the download threads (default: 0)')
+    return group
+
+def configure_parse(args, initializer=None, initargs=()):
+    """
+    Start the parse pool (--parse-workers), before the downloads start.
+    initializer(*initargs) sets up the state of each worker process.
+    """
+
+    pool = set_parsePool(getattr(args, 'parse_workers', 0), initializer, initargs)
+    atexit.register(pool.print_metrics)
+    atexit.register(pool.close)
+    return pool
+
+def add_journal_arguments(parser):
+    """
+    Add the --resume option, for the scripts writing a journal of their run
+    (see journal.py).
+    """
+
+    group = parser.add_argument_group('run options')
+    group.add_argument('--resume', action='store_true',
+                       help='resume an interrupted run: the listing and detail pages '
+                            'in its journal are not downloaded again')
+    return group
+
+def add_listing_arguments(parser, pagination=True):
+    """
+    Add the --top-k option (the listing functions stop after their first k
+    items). pagination: add the --listing-workers option, for the scripts
+    walking their listing pages with walk_pages (see pagination.py).
+    """
+
+    group = parser.add_argument_group('listing options')
+    group.add_argument('--top-k', type=int, metavar='K',
+                       help='only the first K items of the listing (search_rank 1 to K): '
+                            'no listing or detail page is read after them (default: all)')
+    if pagination:
+        group.add_argument('--listing-workers', type=int, default=LISTING_WORKERS,
+                           help='number of listing pages read at the same time when their urls '
+                                'can be predicted; 0: read them one by one (default: %d)' % LISTING_WORKERS)
+    return group
+
+def configure_journal(args, path):
+    """
+    Start the journal of the run in path (--resume: keep the entries of the
+    interrupted run).
+    """
+
+    journal = set_journal(path, args.resume)
+    if args.resume: print('Resume:', journal.loaded, 'entries in', path)
+    atexit.register(journal.print_metrics)
+    atexit.register(journal.close)
+    return journal
+
+def configure_fetch(args):
+    """
+    Set up the shared HTTP client from the parsed command line options.
+    """
+
+    client = get_client()
+
+    get_policy().budget = RetryBudget(args.retry_budget)
+
+    client.set_max_per_host(args.max_per_host)
+    client.set_http2(args.http2)
+
+    # At the end of the run, print the concurrency window of each host, the
+    # fetches saved, print the failures and write log/failureReport.csv
+    atexit.register(get_failureReport().write)
+    atexit.register(client.singleflight.print_metrics)
+    atexit.register(client.print_hostMetrics)
+
+    if args.replay is not None:
+        client.set_replay(WARCArchive(args.replay))
+        print('Replay mode:', len(client.archive), 'responses in', args.replay)
+
+    if args.record is not None:
+        recorder = WARCWriter(args.record)
+        atexit.register(recorder.close)
+        client.set_recorder(recorder)
+
+    if args.cache_mode != 'off' and args.replay is None:
+        cache = DiskCache(args.cache_dir, args.cache_mode,
+                          ttl=args.cache_ttl * 3600,
+                          max_size=int(args.cache_size * 1024 * 1024))
+        client.set_cache(cache)
+    else:
+        client.set_cache(None)
+
+    return client
+
+#------------------------------------------------------------------------------
@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, division
+
+"""
+Compressed transfers (Content-Encoding gzip, deflate and brotli).
+
+urllib2 never sent Accept-Encoding, so every page arrived uncompressed, while
+HTML pages compress 5-10 times. The shared HTTP client now asks for gzip and
+deflate (and brotli if the brotli package is installed), and decompresses the
+body while it is read from the socket, chunk by chunk, so the compressed body
+is never stored in memory as a whole. The headers given to the rest of the
+fetch layer (cache, WARC archive, BeautifulSoup) describe the decoded body.
+
+The compressed (received) and decompressed byte counts of each host are
+metrics of the HTTP client, see fetch.HTTPClient.get_hostMetrics.
+
+The decoded chunks can also be given to a consumer while they arrive, which
+can stop the download early (streaming parse, see stream.py).
+"""
+
+#------------------------------------------------------------------------------
+# Libraries
+#------------------------------------------------------------------------------
+
+import httplib
+import threading
+import zlib
+
+# Optional package
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+#------------------------------------------------------------------------------
+# Global variables
+#------------------------------------------------------------------------------
+
+CHUNK_SIZE = 64 * 1024 # Bytes read from the socket at a time
+STREAM_CHUNK_SIZE = 8 * 1024 # Smaller chunks when streaming, to stop as soon as possible
+
+ACCEPT_ENCODING = 'gzip, deflate, br' if brotli is not None else 'gzip, deflate'
+
+DECODING_ERRORS = (zlib.error,) + tuple(getattr(brotli, name) for name in ('error', 'Error')
+                                        if hasattr(brotli, name))
+
+#------------------------------------------------------------------------------
+# Self-defined functions
+#------------------------------------------------------------------------------
+
+class DecodingError(httplib.HTTPException):
+    """
+    The body cannot be decompressed (handled as a network error by fetch.py).
+    """
+
+class GzipDecoder(object):
+    def __init__(self):
+        self._decoder = zlib.decompressobj(16 + zlib.MAX_WBITS)
+
+    def decompress(self, data):
+        return self._decoder.decompress(data)
+
+    def flush(self):
+        return self._decoder.flush()
+
+class DeflateDecoder(object):
+    """
+    "deflate" is zlib data for most servers, raw deflate data for some.
+    """
+
+    def __init__(self):
+        self._decoder = zlib.decompressobj()
+        self._started = False
+
+    def decompress(self, data):
+        if not self._started:
+            self._started = True
+            try:
+                return self._decoder.decompress(data)
+            except zlib.error: # Raw deflate data
+                self._decoder = zlib.decompressobj(-zlib.MAX_WBITS)
+        return self._decoder.decompress(data)
+
+    def flush(self):
+        return self._decoder.flush()
+
+class BrotliDecoder(object):
+    def __init__(self):
+        self._decoder = brotli.Decompressor()
+
+    def decompress(self, data):
+        if hasattr(self._decoder, 'process'): # Google brotli package
+            return self._decoder.process(data)
+        return self._decoder.decompress(data) # brotlipy package
+
+    def flush(self):
+        return ''
+
+def get_decoder(encoding):
+    """
+    Return a decoder for a Content-Encoding value, None if the body is not
+    compressed or if the encoding is not supported.
+    """
+
+    if encoding in ('gzip', 'x-gzip'): return GzipDecoder()
+    if encoding == 'deflate': return DeflateDecoder()
+    if encoding == 'br' and brotli is not None: return BrotliDecoder()
+    return None
+
+def read_body(resp, chunk_size=CHUNK_SIZE, consumer=None):
+    """
+    Read the body of an httplib response, decompress it while reading.
+    Return (body, number of bytes received). If the body was decompressed, the
+    Content-Encoding header is removed and Content-Length is the decoded size.
+
+    If consumer is given, each decoded chunk is passed to consumer.feed(data),
+    the reading stops when it returns True (the rest of the body is not read,
+    so the connection cannot be reused).
+    """
+
+    encoding = (resp.getheader('content-encoding') or '').strip().lower()
+    decoder = get_decoder(encoding)
+    if consumer is not None: chunk_size = min(chunk_size, STREAM_CHUNK_SIZE)
+
+    chunks = []
+    wireBytes = 0
+    stopped = False
+    try:
+        while True:
+            chunk = resp.read(chunk_size)
+            if not chunk: break
+            wireBytes += len(chunk)
+            chunks.append(decoder.decompress(chunk) if decoder is not None else chunk)
+            if consumer is not None and consumer.feed(chunks[-1]): # Stop early
+                stopped = True
+                break
+        if decoder is not None and not stopped: chunks.append(decoder.flush())
+    except DECODING_ERRORS as e:
+        raise DecodingError('cannot decode %s body: %s' % (encoding, e))
+    body = ''.join(chunks)
+
+    if decoder is not None:
+        del resp.msg['content-encoding']
+        del resp.msg['content-length']
+        resp.msg['Content-Length'] = str(len(body))
+
+    return body, wireBytes
+
+class ByteCounter(object):
+    """
+    Bytes received and bytes of decoded pages of one host. Thread-safe.
+    """
+
+    def __init__(self):
+        self.wire_bytes = 0
+        self.body_bytes = 0
+        self._lock = threading.Lock()
+
+    def add(self, wireBytes, bodyBytes):
+        with self._lock:
+            self.wire_bytes += wireBytes
+            self.body_bytes += bodyBytes
+
+    def get_metrics(self):
+        with self._lock:
+            return {'wire_bytes':self.wire_bytes,
+                    'body_bytes':self.body_bytes}
+
+#------------------------------------------------------------------------------
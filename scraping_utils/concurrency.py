@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, division
+
+"""
+Adaptive number of requests sent at the same time to one host.
+
+A fixed limit per host is too low for a fast site and too high for a site
+which starts to answer 503 or to slow down. Each host has an AIMDLimiter
+(additive increase, multiplicative decrease, as the TCP congestion window):
+    - every successful response with a normal latency increases the window by
+    1/window, i.e. by 1 when a full window of requests succeeded (only if the
+    window is full, a window larger than the number of workers is useless)
+    - a 429/503 response or a timeout halves the window
+    - a latency too high (p95 of the last responses above LATENCY_TOLERANCE
+    times the lowest p50 seen for the host) reduces the window by 20%
+The window stays between MIN_WINDOW and the maximum given by the HTTP client
+(fetch.HTTPClient.set_max_per_host). Only one decrease is applied for the
+requests sent before the last decrease, so a burst of errors from the same
+window only counts once.
+
+The current window of every host is a metric of the HTTP client, see
+fetch.HTTPClient.get_hostMetrics.
+"""
+
+#------------------------------------------------------------------------------
+# Libraries
+#------------------------------------------------------------------------------
+
+import socket
+import threading
+
+# Other packages
+from time import time
+
+from scraping_utils.latency import LatencyTracker
+
+#------------------------------------------------------------------------------
+# Global variables
+#------------------------------------------------------------------------------
+
+INITIAL_WINDOW = 2
+MIN_WINDOW = 1
+
+OVERLOAD_CODES = (429, 503) # The server asks to slow down
+OVERLOAD_DECREASE = 0.5
+LATENCY_DECREASE = 0.8
+LATENCY_TOLERANCE = 3 # p95 / lowest p50
+LATENCY_SAMPLES = 50 # Size of the rolling latency window
+MIN_SAMPLES = 10 # Samples needed before using the percentiles
+
+#------------------------------------------------------------------------------
+# Self-defined functions
+#------------------------------------------------------------------------------
+
+def is_timeout(error):
+    """
+    Tell if a request error is a timeout (socket.timeout, possibly wrapped in
+    a urllib2.URLError).
+    """
+
+    return isinstance(error, socket.timeout) or isinstance(getattr(error, 'reason', None), socket.timeout)
+
+class AIMDLimiter(object):
+    """
+    Limit of the number of requests sent at the same time to one host, tuned
+    with additive increase / multiplicative decrease.
+
+    Usage:
+        startTime = limiter.acquire()
+        ... send the request ...
+        limiter.release(startTime, status, error)
+    """
+
+    def __init__(self, host, max_window, initial_window=INITIAL_WINDOW, min_window=MIN_WINDOW):
+        self.host = host
+        self.max_window = max_window
+        self.min_window = min_window
+        self.window = float(max(min_window, min(initial_window, max_window)))
+        self.inflight = 0
+        self.latency = LatencyTracker(LATENCY_SAMPLES)
+        self.baseline = None # Lowest p50 latency seen
+        self.increases = 0
+        self.decreases = 0
+        self._lastDecrease = 0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        """
+        Wait until a request can be sent to the host, return the start time to
+        give to release.
+        """
+
+        with self._cond:
+            while self.inflight >= max(1, int(self.window)):
+                self._cond.wait()
+            self.inflight += 1
+        return time()
+
+    def release(self, startTime, status=None, error=None):
+        """
+        Update the window with the outcome of a request: its HTTP status, or
+        the error if there was no response.
+        """
+
+        with self._cond:
+            self.inflight -= 1
+
+            if status in OVERLOAD_CODES:
+                self._decrease(startTime, OVERLOAD_DECREASE, 'HTTP %d' % status)
+            elif error is not None:
+                if is_timeout(error): self._decrease(startTime, OVERLOAD_DECREASE, 'timeout')
+            elif status is not None and status < 400:
+                self.latency.add(time() - startTime)
+                if self._is_slow():
+                    if self._decrease(startTime, LATENCY_DECREASE, 'latency'):
+                        self.latency = LatencyTracker(LATENCY_SAMPLES) # Measure again with the new window
+                elif self.window < self.max_window and self.inflight + 1 >= int(self.window):
+                    # Only grow a window which is used (not limited by the workers)
+                    self.window = min(self.max_window, self.window + 1 / self.window)
+                    self.increases += 1
+
+            self._cond.notify_all()
+
+    def _is_slow(self):
+        if len(self.latency) < MIN_SAMPLES: return False
+        p50 = self.latency.percentile(50)
+        if self.baseline is None or p50 < self.baseline: self.baseline = p50
+        return self.latency.percentile(95) > LATENCY_TOLERANCE * self.baseline
+
+    def _decrease(self, startTime, factor, reason):
+        if startTime < self._lastDecrease: return False # Request sent before the last decrease
+        oldWindow = self.window
+        self.window = max(self.min_window, self.window * factor)
+        self._lastDecrease = time()
+        self.decreases += 1
+        print('Concurrency window of host %s: %.1f -> %.1f (%s)' % (self.host, oldWindow,
+                                                                   self.window, reason))
+        return True
+
+    def set_max_window(self, max_window):
+        with self._cond:
+            self.max_window = max_window
+            self.window = max(self.min_window, min(self.window, max_window))
+            self._cond.notify_all()
+
+    def get_metrics(self):
+        with self._cond:
+            return {'window':round(self.window, 2),
+                    'inflight':self.inflight,
+                    'p50':self.latency.percentile(50),
+                    'p95':self.latency.percentile(95),
+                    'increases':self.increases,
+                    'decreases':self.decreases}
+
+#------------------------------------------------------------------------------
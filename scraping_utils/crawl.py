@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, division
+
+"""
+Bounded-memory long crawls.
+
+A crawl following the links of the pages it visits (e.g. the tuoitre news
+crawl of Lazada.vn_comments_scraping) kept everything in memory: the data
+frame of all the urls found, the urls waiting, the results and the soups, so
+its memory grew with the number of pages. For a crawl of 100k pages on a
+small VM:
+    - UrlFrontier keeps the urls waiting in a file (first in, first out) and
+    a short digest of each url already seen in an SQLite file next to it (a
+    set of digests in memory would still grow with the crawl; anydbm falls
+    back to dumbdbm, which keeps its index in memory)
+    - the results are written to the output file page by page (the script
+    does it) and the soups are freed after the extraction (soup.decompose())
+    - MemoryGuard reports the resident memory (RSS) of the process. When it
+    approaches the limit, the in-memory memos of the fetch layer are cleared
+    and the garbage collector runs. If the RSS is still above the limit, the
+    crawl stops following new links (over_limit, the urls waiting are still
+    crawled), and above HARD_LIMIT times the limit it stops (stop), with a
+    message telling why
+
+Usage:
+
+    frontier = UrlFrontier('output/frontier.txt')
+    guard = MemoryGuard(512) # MB
+    frontier.add(url, title)
+    while not guard.stop:
+        url, title = frontier.pop()
+        ...
+        if not guard.over_limit: frontier.add(newURL, newTitle)
+        guard.check(pageCount)
+    frontier.close()
+"""
+
+#------------------------------------------------------------------------------
+# Libraries
+#------------------------------------------------------------------------------
+
+import gc
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+
+# Not available on Windows
+try:
+    import resource
+except ImportError:
+    resource = None
+
+from scraping_utils.singleflight import canonical_url
+from scraping_utils.fetch import get_client
+from scraping_utils.parse import clear_memos
+
+#------------------------------------------------------------------------------
+# Global variables
+#------------------------------------------------------------------------------
+
+URL_DIGEST_SIZE = 8 # Bytes kept per url seen
+
+SEEN_COMMIT_EVERY = 1000 # Urls added between two commits of the seen database
+
+SOFT_LIMIT = 0.9 # Fraction of the limit where the memos are cleared
+HARD_LIMIT = 1.25 # Fraction of the limit where the crawl stops
+REPORT_EVERY = 100 # Pages between two memory reports
+
+try:
+    PAGE_SIZE = os.sysconf('SC_PAGE_SIZE')
+except (AttributeError, ValueError, OSError):
+    PAGE_SIZE = 4096
+
+#------------------------------------------------------------------------------
+# Self-defined functions
+#------------------------------------------------------------------------------
+
+def get_rss():
+    """
+    Return the resident memory (RSS) of the process in bytes, None if it
+    cannot be read. Without /proc, the peak RSS is returned.
+    """
+
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except (IOError, ValueError, IndexError):
+        pass
+
+    if resource is None: return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024 # Bytes on macOS, KB on Linux
+
+def format_mb(size):
+    return 'n/a' if size is None else '%.0f MB' % (size / 1024 / 1024)
+
+def free_memos():
+    """
+    Clear the in-memory memos of the fetch layer (parsed pages, raw HTML,
+    downloaded pages).
+    """
+
+    clear_memos()
+    get_client().singleflight.clear_memo()
+
+class UrlFrontier(object):
+    """
+    Urls waiting to be crawled, in a file (first in, first out), and digests
+    of the urls already added, in an SQLite file (path + '.seen'), so an url is
+    only crawled once. Both files are on disk, the memory used does not grow
+    with the crawl.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.seen_path = path + '.seen'
+        if os.path.exists(self.seen_path): os.remove(self.seen_path) # A new crawl starts with no url seen
+        self._seen = sqlite3.connect(self.seen_path, check_same_thread=False)
+        self._seen.execute('PRAGMA journal_mode=OFF') # Only used by this crawl, no recovery needed
+        self._seen.execute('PRAGMA synchronous=OFF')
+        self._seen.execute('CREATE TABLE seen (key BLOB PRIMARY KEY) WITHOUT ROWID')
+        self._uncommitted = 0
+        self._writer = open(path, 'wb') # A new crawl starts with an empty file
+        self._reader = open(path, 'rb')
+        self._pending = 0
+
+    def __len__(self):
+        return self._pending
+
+    def add(self, url, title=None):
+        """
+        Add an url (and its title) if it was never added, return True if added.
+        """
+
+        if isinstance(url, unicode): url = url.encode('utf-8')
+        key = hashlib.sha1(canonical_url(url)).digest()[:URL_DIGEST_SIZE]
+        if self._seen.execute('INSERT OR IGNORE INTO seen VALUES (?)', (buffer(key),)).rowcount == 0:
+            return False
+        self._uncommitted += 1
+        if self._uncommitted >= SEEN_COMMIT_EVERY: # Written to the file, not kept in memory
+            self._seen.commit()
+            self._uncommitted = 0
+        self._writer.write(json.dumps([url.decode('utf-8', 'replace'), title]) + '\n')
+        self._pending += 1
+        return True
+
+    def pop(self):
+        """
+        Return the next (url, title), None if no url is waiting.
+        """
+
+        if self._pending == 0: return None
+        self._writer.flush()
+        url, title = json.loads(self._reader.readline())
+        self._pending -= 1
+        return url, title
+
+    def close(self):
+        """
+        Close the files, remove the seen database (the file of the urls waiting
+        is left to the caller).
+        """
+
+        self._writer.close()
+        self._reader.close()
+        self._seen.close()
+        os.remove(self.seen_path)
+
+class MemoryGuard(object):
+    """
+    Report the RSS of the process and tell the crawl to stop following new
+    links (over_limit) or to stop (stop) when it goes above limit_mb.
+    """
+
+    def __init__(self, limit_mb, report_every=REPORT_EVERY, free=free_memos):
+        self.limit = limit_mb * 1024 * 1024
+        self.report_every = report_every
+        self.free = free
+        self.peak = 0
+        self.over_limit = False # Above the limit after freeing the memos: no new links
+        self.stop = False # Above HARD_LIMIT times the limit: stop the crawl
+
+    def check(self, pages=None):
+        """
+        Call it after each page. Return the RSS in bytes (None if unknown).
+        """
+
+        rss = get_rss()
+        if rss is None: return None
+        self.peak = max(self.peak, rss)
+
+        if pages is not None and pages % self.report_every == 0:
+            print('Memory: RSS %s (limit %s, peak %s), %d pages'
+                  % (format_mb(rss), format_mb(self.limit), format_mb(self.peak), pages))
+
+        if rss < self.limit * SOFT_LIMIT:
+            self.over_limit = False
+            return rss
+
+        # Approaching the limit: free the memos
+        if self.free is not None: self.free()
+        gc.collect()
+        rss = get_rss()
+
+        overLimit = rss >= self.limit
+        if overLimit and not self.over_limit:
+            print('Memory: RSS %s above the limit %s, no new links followed'
+                  % (format_mb(rss), format_mb(self.limit)))
+        elif self.over_limit and not overLimit:
+            print('Memory: RSS %s below the limit %s, new links followed again'
+                  % (format_mb(rss), format_mb(self.limit)))
+        self.over_limit = overLimit
+
+        if rss >= self.limit * HARD_LIMIT:
+            self.stop = True
+            print('Memory: RSS %s above %s (%g times the limit), the crawl stops'
+                  % (format_mb(rss), format_mb(self.limit * HARD_LIMIT), HARD_LIMIT))
+
+        return rss
+
+#------------------------------------------------------------------------------
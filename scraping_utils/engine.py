@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, division
+
+"""
+Concurrent engine to visit many detail pages at the same time.
+
+The detail steps of the scripts (e.g. extract_allAddonInfo) visit pages one by
+one, so the run time is the sum of all page latencies. map_ordered runs the
+same per-page function in a pool of worker threads and returns the results in
+the input order, so the result table keeps the search_rank order. The number
+of requests sent to one host at the same time is limited by the shared HTTP
+client, the limit is tuned for each host (see concurrency.py).
+
+A failed request does not block its worker during the retry delay: the task is
+put in the retry scheduler and runs again later (see scheduler.py), meanwhile
+the workers go on with the other items.
+
+Environment:
+    1. Python 2.7 (no asyncio, threads are used instead)
+"""
+
+#------------------------------------------------------------------------------
+# Libraries
+#------------------------------------------------------------------------------
+
+import threading
+from Queue import Queue
+
+from scraping_utils.scheduler import RetryScheduler, RetryLater, set_deferrable
+
+#------------------------------------------------------------------------------
+# Global variables
+#------------------------------------------------------------------------------
+
+DEFAULT_NUM_WORKERS = 8
+
+#------------------------------------------------------------------------------
+# Self-defined functions
+#------------------------------------------------------------------------------
+
+def map_ordered(func, items, num_workers=DEFAULT_NUM_WORKERS, callback=None):
+    """
+    Apply func to every item with num_workers threads. Return the list of
+    results in the same order as items. If func raises an exception, the other
+    items are still processed, then the first exception is raised again.
+
+    With a callback (e.g. the write method of a sink, see sinks.py), each
+    result is given to callback(result) in the order of the items, as soon as
+    the results before it are ready (None for a failed item), and is not kept:
+    the returned list is then a list of None.
+
+    Note: a task waiting for a retry runs func again from the start, so func
+    must be safe to run several times for the same item.
+    """
+
+    items = list(items)
+    results = [None] * len(items)
+    errors = []
+
+    if len(items) == 0: return results
+
+    ready = [False] * len(items)
+    nextResult = [0] # Index of the next result given to callback
+    callbackLock = threading.Lock()
+
+    def deliver(index):
+        """
+        Give the results ready, in the order of the items, to callback.
+        """
+
+        with callbackLock:
+            ready[index] = True
+            while nextResult[0] < len(items) and ready[nextResult[0]]:
+                i = nextResult[0]
+                try:
+                    callback(results[i])
+                except Exception as e:
+                    errors.append((i, e))
+                results[i] = None # Not kept
+                nextResult[0] += 1
+
+    taskQueue = Queue()
+    for index, item in enumerate(items):
+        taskQueue.put((index, item))
+
+    scheduler = RetryScheduler()
+    remaining = [len(items)] # Tasks not finished yet
+    changed = threading.Condition()
+
+    def worker():
+        set_deferrable(True) # Retry loops raise RetryLater instead of sleeping
+        while True:
+            task = taskQueue.get()
+            if task is None: # Stop signal
+                return
+            index, item = task
+            try:
+                results[index] = func(item)
+            except RetryLater as r:
+                scheduler.schedule(task, r.delay) # Run again later
+                with changed: changed.notify()
+                continue
+            except Exception as e:
+                errors.append((index, e))
+            if callback is not None: deliver(index)
+            with changed:
+                remaining[0] -= 1
+                changed.notify()
+
+    # Start the workers
+    num_workers = max(1, min(num_workers, len(items)))
+    threads = []
+    for _ in range(num_workers):
+        t = threading.Thread(target=worker)
+        t.daemon = True
+        t.start()
+        threads.append(t)
+
+    # Send the tasks waiting for a retry back to the workers when they are due
+    with changed:
+        while remaining[0] > 0:
+            for task in scheduler.pop_due():
+                taskQueue.put(task)
+            nextDelay = scheduler.next_delay()
+            changed.wait(1 if nextDelay is None else min(nextDelay, 1)) # Short waits, Ctrl+C still works
+
+    # Send one stop signal per worker
+    for _ in threads:
+        taskQueue.put(None)
+    for t in threads:
+        t.join()
+
+    if errors:
+        raise min(errors, key=lambda e: e[0])[1]
+
+    return results
+
+#------------------------------------------------------------------------------
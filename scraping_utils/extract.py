@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, division
+
+"""
+Declarative field extraction with compiled lxml XPath.
+
+The detail pages were read by one function per field (extract_activeUser,
+extract_size...), each one running its own soup.find over the whole
+BeautifulSoup tree. A site now declares its fields once, in a Schema:
+
+    addonSchema = Schema([
+        Field('size', "//span[%s]" % xpath_class('filesize'), required=True),
+        Field('rating', "//meta[@itemprop='ratingValue']", attr='content', convert=float),
+        ...])
+
+    fields = addonSchema.extract(HTMLTree_wrapper(url)) # {'size':..., 'rating':...}
+
+The whole schema is compiled into one XPath expression (evaluated by libxml2
+in C) which returns the value of every field in a single call, on an lxml.html
+tree (no BeautifulSoup tree is built). As with soup.find, a field is the
+first matching node, its text (or one of its attributes), then the converter.
+A field which is not found, or which cannot be converted, is None.
+
+Benchmark: benchmarks/extract_benchmark.py
+"""
+
+#------------------------------------------------------------------------------
+# Libraries
+#------------------------------------------------------------------------------
+
+import re
+import threading
+
+from lxml import etree
+
+# Optional package, only needed for the fields declared with a CSS selector
+try:
+    from cssselect import HTMLTranslator
+except ImportError:
+    HTMLTranslator = None
+
+#------------------------------------------------------------------------------
+# Global variables
+#------------------------------------------------------------------------------
+
+FIELD_SEPARATOR = u'\ue000' # Between the field values of the schema expression (private use character)
+
+#------------------------------------------------------------------------------
+# Self-defined functions
+#------------------------------------------------------------------------------
+
+def xpath_class(value):
+    """
+    Return an XPath predicate matching the class attribute the same way as
+    soup.find(attrs={'class':value}): one of the classes for a single class
+    name, the whole attribute for several class names.
+    """
+
+    if ' ' in value.strip(): return "@class='%s'" % value
+    return "contains(concat(' ', normalize-space(@class), ' '), ' %s ')" % value
+
+def to_int(text):
+    """
+    Keep the digits of a text, e.g. '1,234 users' -> 1234.
+    """
+
+    return int(re.sub('[^0-9]', '', text))
+
+def remove_text(pattern):
+    """
+    Return a converter removing a pattern from the text, e.g. remove_text('Version').
+    """
+
+    return lambda text: re.sub(pattern, '', text).strip()
+
+class Field(object):
+    """
+    One field of a page: the first node matching an XPath (or CSS) selector,
+    its text or one of its attributes, and a converter.
+
+    xpath can also be a list of selectors, the first one found is used.
+    """
+
+    def __init__(self, name, xpath=None, css=None, attr=None, convert=None, required=False):
+        if css is not None:
+            if HTMLTranslator is None:
+                raise ImportError('CSS selectors need the cssselect package (pip install cssselect)')
+            xpath = HTMLTranslator().css_to_xpath(css)
+        if xpath is None: raise ValueError('field %s has no selector' % name)
+
+        self.name = name
+        self.paths = [xpath] if isinstance(xpath, basestring) else list(xpath)
+        self.attr = attr
+        self.convert = convert
+        self.required = required
+
+    def expression(self):
+        """
+        Return an XPath expression of the text value of the field ('' if not
+        found).
+        """
+
+        if self.attr is None:
+            target = ''
+        elif ':' in self.attr: # e.g. g:rating_override, not a namespace in HTML
+            target = "/@*[name()='%s']" % self.attr
+        else:
+            target = '/@' + self.attr
+
+        values = ['string((%s)%s)' % (path, target) for path in self.paths]
+
+        # First value found: concat(A, substring(B, 1 div (string-length(A) = 0))),
+        # the substring is B if A is empty, '' otherwise (1 div 0 = Infinity)
+        expression = values[0]
+        for value in values[1:]:
+            expression = ("concat(%s, substring(%s, 1 div (string-length(%s) = 0)))"
+                          % (expression, value, expression))
+        return expression
+
+    def to_value(self, text):
+        text = text.strip()
+        if not text: return None
+        if self.convert is None: return text
+        try:
+            return self.convert(text)
+        except Exception:
+            return None
+
+class Schema(object):
+    """
+    The fields of one kind of page, compiled into one XPath expression.
+    """
+
+    def __init__(self, fields):
+        self.fields = list(fields)
+        expressions = [field.expression() for field in self.fields]
+        if len(expressions) == 1:
+            self.expression = expressions[0]
+        else:
+            self.expression = 'concat(%s)' % (", '%s', " % FIELD_SEPARATOR).join(expressions)
+        etree.XPath(self.expression) # Check the syntax now
+        self._local = threading.local() # XPath objects are not shared between threads
+
+    def _get_xpath(self):
+        xpath = getattr(self._local, 'xpath', None)
+        if xpath is None:
+            xpath = etree.XPath(self.expression, smart_strings=False)
+            self._local.xpath = xpath
+        return xpath
+
+    def extract(self, tree):
+        """
+        Return a dict field name -> value for an lxml tree (lxml.html page).
+        """
+
+        values = self._get_xpath()(tree).split(FIELD_SEPARATOR)
+        if len(values) != len(self.fields): # The page contains the separator
+            values = [etree.XPath(field.expression())(tree) for field in self.fields]
+        return dict((field.name, field.to_value(value))
+                    for field, value in zip(self.fields, values))
+
+    def missing(self, record):
+        """
+        Return the names of the required fields which were not found.
+        """
+
+        return [field.name for field in self.fields
+                if field.required and record.get(field.name) is None]
+
+#------------------------------------------------------------------------------
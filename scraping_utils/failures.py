@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, division
+
+"""
+Failure classification, quarantine of the pages which cannot be extracted, and
+failure report of a run.
+
+The retry loops used to catch every exception and retry after sleeping, so a
+layout change (AttributeError in an extract function) cost 5 x 10 seconds per
+page for nothing. Every failure now belongs to one of 3 classes:
+    - transient : network errors (timeout, connection refused/reset...) and
+    HTTP 429/502/503/504 (the server asks to come back later). Only this
+    class is retried.
+    - http      : other HTTP 4xx/5xx responses (404, 403, 500...)
+    - extraction: parse / schema errors, the page was downloaded but its
+    layout is not the expected one. The raw HTML of the page is saved in the
+    quarantine file (quarantine/<run time>.jsonl) to fix the selectors later.
+
+All the failures of a run are kept in the failure report, written to
+log/failureReport.csv at the end of the run.
+
+The expected failures (e.g. the listing pages read past the last page, see
+pagination.py) are read with set_quiet(True): they are not printed
+(print_failure) nor added to the report, the quarantine or the error log.
+"""
+
+#------------------------------------------------------------------------------
+# Libraries
+#------------------------------------------------------------------------------
+
+import csv
+import httplib
+import json
+import socket
+import threading
+import urllib2
+
+# Other packages
+import os
+from datetime import datetime
+
+#------------------------------------------------------------------------------
+# Global variables
+#------------------------------------------------------------------------------
+
+TRANSIENT = 'transient'
+HTTP_ERROR = 'http'
+EXTRACTION = 'extraction'
+
+FAILURE_CLASSES = [TRANSIENT, HTTP_ERROR, EXTRACTION]
+
+TRANSIENT_HTTP_CODES = (429, 502, 503, 504)
+
+QUARANTINE_FOLDER = 'quarantine'
+REPORT_PATH = 'log/failureReport.csv'
+
+#------------------------------------------------------------------------------
+# Self-defined functions
+#------------------------------------------------------------------------------
+
+class ExtractionError(Exception):
+    """
+    Raised when a downloaded page does not have the expected layout.
+    """
+
+    def __init__(self, url, message):
+        Exception.__init__(self, '%s (%s)' % (message, url))
+        self.url = url
+
+def classify_error(e):
+    """
+    Return the failure class of an exception: TRANSIENT, HTTP_ERROR or
+    EXTRACTION.
+    """
+
+    if isinstance(e, urllib2.HTTPError): # Must be tested before URLError
+        return TRANSIENT if e.code in TRANSIENT_HTTP_CODES else HTTP_ERROR
+    if isinstance(e, (urllib2.URLError, socket.error, socket.timeout,
+                      httplib.HTTPException)):
+        return TRANSIENT
+    return EXTRACTION
+
+def is_transient(e):
+    return classify_error(e) == TRANSIENT
+
+def to_text(text):
+    if isinstance(text, str): return text.decode('utf-8', 'replace')
+    return text
+
+def error_text(error):
+    if isinstance(error, Exception): return '%s: %s' % (type(error).__name__, error)
+    return error
+
+class FailureReport(object):
+    """
+    Failures of a run (url, class, error), and quarantine file of the pages
+    which failed extraction. Thread-safe.
+    """
+
+    def __init__(self, quarantine_folder=QUARANTINE_FOLDER):
+        self.quarantine_folder = quarantine_folder
+        self.quarantine_path = os.path.join(quarantine_folder,
+                                            datetime.now().strftime('%Y%m%d_%H%M%S') + '.jsonl')
+        self.failures = [] # (time, url, failure class, error)
+        self._lock = threading.Lock()
+
+    def add(self, url, error, failureClass=None):
+        if failureClass is None: failureClass = classify_error(error)
+        with self._lock:
+            self.failures.append((str(datetime.now()), url, failureClass, error_text(error)))
+
+    def quarantine(self, url, html, error):
+        """
+        Add an extraction failure, save the raw HTML of the page.
+        """
+
+        self.add(url, error, EXTRACTION)
+        record = {'time':str(datetime.now()),
+                  'url':to_text(url),
+                  'error':to_text(error_text(error)),
+                  'html':to_text(html)}
+
+        with self._lock:
+            if not os.path.exists(self.quarantine_folder): os.makedirs(self.quarantine_folder)
+            with open(self.quarantine_path, 'a') as f:
+                f.write(json.dumps(record) + '\n')
+
+    def count(self):
+        """
+        Return the number of failures of each class.
+        """
+
+        counts = dict((failureClass, 0) for failureClass in FAILURE_CLASSES)
+        with self._lock:
+            for _, _, failureClass, _ in self.failures:
+                counts[failureClass] += 1
+        return counts
+
+    def write(self, path=REPORT_PATH):
+        """
+        Print the number of failures of each class, write the full report in a
+        csv file. Nothing is written if there was no failure.
+        """
+
+        with self._lock:
+            failures = list(self.failures)
+        if len(failures) == 0: return
+
+        counts = self.count()
+        print('Failures:', ', '.join('%s %d' % (failureClass, counts[failureClass])
+                                     for failureClass in FAILURE_CLASSES))
+
+        folder = os.path.dirname(path)
+        if folder != '' and not os.path.exists(folder): os.makedirs(folder)
+        with open(path, 'wb') as f:
+            writer = csv.writer(f)
+            writer.writerow(['time', 'url', 'failure_class', 'error'])
+            for row in failures:
+                writer.writerow([to_text(value).encode('utf-8') for value in row])
+        print('Failure report:', path)
+        if counts[EXTRACTION] > 0: print('Quarantined pages:', self.quarantine_path)
+
+#------------------------------------------------------------------------------
+# Shared report
+#------------------------------------------------------------------------------
+
+_report = FailureReport()
+
+_context = threading.local()
+
+def get_failureReport():
+    """
+    Return the failure report shared by all the functions of this package.
+    """
+
+    return _report
+
+def set_quiet(quiet):
+    """
+    Tell if the failures of the current thread are expected: not recorded
+    (report, quarantine, error log). Return the previous value.
+    """
+
+    previous = is_quiet()
+    _context.quiet = quiet
+    return previous
+
+def is_quiet():
+    return getattr(_context, 'quiet', False)
+
+def print_failure(*values):
+    """
+    Print the message of a failure, except the expected failures.
+    """
+
+    if not is_quiet(): print(*values)
+
+def record_failure(url, error, failureClass=None):
+    if not is_quiet(): _report.add(url, error, failureClass)
+
+def quarantine_page(url, html, error):
+    if not is_quiet(): _report.quarantine(url, html, error)
+
+#------------------------------------------------------------------------------
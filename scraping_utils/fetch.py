@@ -0,0 +1,778 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, division
+
+"""
+Shared HTTP client for all the scraping projects.
+
+urllib2.urlopen opens a new TCP (and TLS) connection for every page, which is
+most of the wall time when a script downloads hundreds of pages from the same
+host. This module keeps a pool of keep-alive connections per host, reuses one
+SSL context for every HTTPS connection and caches DNS lookups.
+
+Pages are downloaded compressed when the server supports it (gzip, deflate,
+brotli), see compression.py.
+
+The timeout of each request is adapted to the latency of its host, and a slow
+request is hedged (sent again, the first response wins), see latency.py.
+
+Optionally, the https hosts which support HTTP/2 are contacted with one
+multiplexed HTTP/2 connection per host instead of the pool, see http2.py.
+
+The encoding of the pages is learned once per host and given to the parser
+with the page bytes (Response.encoding), see charset.py.
+
+A page can be streamed to a consumer (e.g. a parser) while it is downloaded,
+the consumer can stop the download once it has what it needs, see stream.py.
+
+The scripts only need to replace their own urlopen_wrapper with:
+
+    from scraping_utils.fetch import urlopen_wrapper
+
+Environment:
+    1. Python 2.7
+"""
+
+#------------------------------------------------------------------------------
+# Libraries
+#------------------------------------------------------------------------------
+
+import hashlib
+import httplib
+import socket
+import ssl
+import sys
+import threading
+import urllib2
+import urlparse
+from Queue import Queue, Empty
+from StringIO import StringIO
+
+# Other packages
+import os
+from time import time
+from datetime import datetime
+
+from scraping_utils.retry import call_with_retry, get_host
+from scraping_utils.failures import record_failure, print_failure, is_quiet
+from scraping_utils.concurrency import AIMDLimiter
+from scraping_utils.latency import HostLatency
+from scraping_utils.singleflight import SingleFlight
+from scraping_utils.compression import read_body, ByteCounter, ACCEPT_ENCODING
+from scraping_utils.http2 import HTTP2Connection, HTTP2NotSupported, HAS_HTTP2
+from scraping_utils.charset import get_hostCharsets
+
+#------------------------------------------------------------------------------
+# Global variables
+#------------------------------------------------------------------------------
+
+DEFAULT_TIMEOUT = 30 # Seconds, same as the old urlopen(url, timeout=30), maximum adaptive timeout
+DEFAULT_POOL_SIZE = 10 # Idle keep-alive connections kept per host
+DEFAULT_MAX_PER_HOST = 16 # Maximum window of requests sent at the same time to one host
+DNS_CACHE_TTL = 300 # Seconds
+MAX_REDIRECTS = 10
+
+DEFAULT_HEADERS = {'User-Agent':'Python-urllib/' + sys.version[:3], # Same as urllib2
+                   'Accept':'*/*',
+                   'Accept-Encoding':ACCEPT_ENCODING,
+                   'Connection':'keep-alive'}
+
+REDIRECT_CODES = (301, 302, 303, 307, 308)
+
+#------------------------------------------------------------------------------
+# Self-defined functions
+#------------------------------------------------------------------------------
+
+def format_seconds(seconds):
+    return 'n/a' if seconds is None else '%.2fs' % seconds
+
+def update_errorLog(text):
+    """
+    This function will append the error log file in ./log folder (nothing for
+    the expected failures, see failures.set_quiet).
+    """
+
+    if is_quiet(): return
+    if not os.path.exists('log'): os.makedirs('log')
+    with open('log/errorsLog.txt', 'a') as f:
+        f.write(str(datetime.now()) + ' : ' + text)
+        f.write('\n')
+
+class Response(object):
+    """
+    A file-like object holding a downloaded page. It has the same methods as
+    the object returned by urllib2.urlopen (read, geturl, info, getcode), so
+    it can be passed directly to BeautifulSoup.
+
+    The parsers read body (bytes) with encoding instead, without decoding or
+    copying the page first.
+    """
+
+    def __init__(self, url, code, msg, headers, body, digest=None, encoding=None):
+        self.url = url
+        self.code = code
+        self.msg = msg
+        self.headers = headers
+        self.body = body
+        self.from_cache = False # Served by the disk cache
+        self.not_modified = False # Revalidated by a 304 response
+        self.partial = False # Download stopped early by a stream consumer
+        self._digest = digest
+        self._encoding = encoding
+        self._fp = None # Only created if the page is read as a file
+
+    @property
+    def digest(self):
+        """
+        SHA1 of the body, used to find pages with the same content.
+        """
+
+        if self._digest is None: self._digest = hashlib.sha1(self.body).hexdigest()
+        return self._digest
+
+    @property
+    def encoding(self):
+        """
+        Character encoding of the body (see charset.py), None if unknown.
+        """
+
+        if self._encoding is None:
+            self._encoding = get_hostCharsets().get_encoding(self.url, self.headers, self.body)
+        return self._encoding
+
+    def _get_file(self):
+        if self._fp is None: self._fp = StringIO(self.body)
+        return self._fp
+
+    def read(self, size=-1):
+        return self._get_file().read(size)
+
+    def readline(self, size=-1):
+        return self._get_file().readline(size)
+
+    def close(self):
+        if self._fp is not None: self._fp.close()
+
+    def copy(self):
+        """
+        Return a new Response with the same page, read from the beginning.
+        """
+
+        page = Response(self.url, self.code, self.msg, self.headers, self.body, self._digest, self._encoding)
+        page.from_cache = self.from_cache
+        page.not_modified = self.not_modified
+        page.partial = self.partial
+        return page
+
+    def geturl(self):
+        return self.url
+
+    def info(self):
+        return self.headers
+
+    def getcode(self):
+        return self.code
+
+class DNSCache(object):
+    """
+    Keep the resolved address of each (host, port) for a while, so a new
+    connection to the same host does not make a new DNS lookup.
+    """
+
+    def __init__(self, ttl=DNS_CACHE_TTL):
+        self.ttl = ttl
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def resolve(self, host, port):
+        """
+        Return the (ip, port) address to connect to.
+        """
+
+        key = (host, port)
+        with self._lock:
+            entry = self._cache.get(key)
+        if entry is not None and entry[1] > time():
+            return entry[0]
+
+        # Resolve, prefer the first TCP address returned by the system
+        infos = socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM)
+        address = infos[0][4][:2]
+
+        with self._lock:
+            self._cache[key] = (address, time() + self.ttl)
+        return address
+
+    def forget(self, host, port):
+        with self._lock:
+            self._cache.pop((host, port), None)
+
+class HTTPConnection(httplib.HTTPConnection):
+    """
+    HTTP connection using the shared DNS cache.
+    """
+
+    def __init__(self, host, port=None, timeout=DEFAULT_TIMEOUT, dns_cache=None):
+        httplib.HTTPConnection.__init__(self, host, port, timeout=timeout)
+        self.dns_cache = dns_cache
+
+    def _open_socket(self):
+        if self.dns_cache is not None:
+            address = self.dns_cache.resolve(self.host, self.port)
+        else:
+            address = (self.host, self.port)
+
+        try:
+            sock = socket.create_connection(address, self.timeout)
+        except socket.error:
+            if self.dns_cache is not None: self.dns_cache.forget(self.host, self.port)
+            raise
+
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return sock
+
+    def connect(self):
+        self.sock = self._open_socket()
+
+class HTTPSConnection(HTTPConnection):
+    """
+    HTTPS connection using the shared DNS cache and a shared SSL context.
+    """
+
+    default_port = httplib.HTTPS_PORT
+
+    def __init__(self, host, port=None, timeout=DEFAULT_TIMEOUT, dns_cache=None,
+                 context=None):
+        HTTPConnection.__init__(self, host, port, timeout, dns_cache)
+        self.context = context or ssl.create_default_context()
+
+    def connect(self):
+        sock = self._open_socket()
+        self.sock = self.context.wrap_socket(sock, server_hostname=self.host)
+
+class ConnectionPool(object):
+    """
+    Keep-alive connections to one host. Connections are taken with get() and
+    given back with put() once their response has been fully read.
+    """
+
+    def __init__(self, scheme, host, port, maxsize=DEFAULT_POOL_SIZE,
+                 timeout=DEFAULT_TIMEOUT, dns_cache=None, ssl_context=None):
+        self.scheme = scheme
+        self.host = host
+        self.port = port
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self.dns_cache = dns_cache
+        self.ssl_context = ssl_context
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def new_connection(self):
+        if self.scheme == 'https':
+            return HTTPSConnection(self.host, self.port, self.timeout,
+                                   self.dns_cache, self.ssl_context)
+        else:
+            return HTTPConnection(self.host, self.port, self.timeout,
+                                  self.dns_cache)
+
+    def get(self):
+        """
+        Return (connection, is_reused).
+        """
+
+        with self._lock:
+            if self._idle:
+                return self._idle.pop(), True
+        return self.new_connection(), False
+
+    def put(self, conn):
+        with self._lock:
+            if len(self._idle) < self.maxsize:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle: conn.close()
+
+class HTTPClient(object):
+    """
+    A small thread-safe HTTP client keeping one connection pool per host.
+    """
+
+    def __init__(self, pool_size=DEFAULT_POOL_SIZE, timeout=DEFAULT_TIMEOUT,
+                 max_redirects=MAX_REDIRECTS, headers=None,
+                 max_per_host=DEFAULT_MAX_PER_HOST):
+        self.pool_size = pool_size
+        self.max_per_host = max_per_host
+        self.timeout = timeout
+        self.max_redirects = max_redirects
+        self.headers = dict(DEFAULT_HEADERS)
+        if headers is not None: self.headers.update(headers)
+
+        self.dns_cache = DNSCache()
+        self.ssl_context = ssl.create_default_context()
+        self.cache = None # A cache.DiskCache object, see set_cache()
+        self.recorder = None # A warc.WARCWriter object, see set_recorder()
+        self.archive = None # A warc.WARCArchive object, see set_replay()
+        self._pools = {}
+        self._hostLimits = {}
+        self._hostLatencies = {}
+        self._hostBytes = {}
+        self.singleflight = SingleFlight()
+        self._lock = threading.Lock()
+
+        self.http2 = False # See set_http2()
+        self.http2_ssl_context = None
+        self._http2Conns = {}
+        self._http1Hosts = set() # Hosts without HTTP/2 support
+        self._http2Lock = threading.Lock()
+
+    def set_max_per_host(self, max_per_host):
+        """
+        Change the maximum number of requests sent at the same time to one
+        host. The actual number is tuned for each host (see concurrency.py).
+        """
+
+        with self._lock:
+            self.max_per_host = max_per_host
+            for limiter in self._hostLimits.values():
+                limiter.set_max_window(max_per_host)
+
+    def set_cache(self, cache):
+        """
+        Use a cache.DiskCache object for all requests (None to disable it).
+        """
+
+        self.cache = cache
+
+    def set_recorder(self, recorder):
+        """
+        Append every HTTP response to a warc.WARCWriter (None to stop).
+        """
+
+        self.recorder = recorder
+
+    def set_replay(self, archive):
+        """
+        Answer every request from a warc.WARCArchive, without any network
+        access (None to go back to the network).
+        """
+
+        self.archive = archive
+
+    def set_http2(self, enabled=True):
+        """
+        Use one HTTP/2 connection per https host, for the hosts which support
+        it (see http2.py). Needs the h2 package.
+        """
+
+        if enabled and not HAS_HTTP2:
+            print('HTTP/2 needs the h2 package and an SSL module with ALPN, HTTP/1.1 is used')
+            enabled = False
+        if enabled and self.http2_ssl_context is None:
+            context = ssl.create_default_context()
+            context.set_alpn_protocols(['h2', 'http/1.1'])
+            self.http2_ssl_context = context
+        self.http2 = enabled
+
+    def is_online(self):
+        """
+        False in replay mode and in offline cache mode (no connection opened).
+        """
+
+        return self.archive is None and (self.cache is None or self.cache.mode != 'offline')
+
+    def get_hostLimit(self, host):
+        with self._lock:
+            limit = self._hostLimits.get(host)
+            if limit is None:
+                limit = AIMDLimiter(host, self.max_per_host)
+                self._hostLimits[host] = limit
+        return limit
+
+    def get_hostLatency(self, host):
+        with self._lock:
+            latency = self._hostLatencies.get(host)
+            if latency is None:
+                latency = HostLatency(host, self.timeout)
+                self._hostLatencies[host] = latency
+        return latency
+
+    def get_hostBytes(self, host):
+        with self._lock:
+            counter = self._hostBytes.get(host)
+            if counter is None:
+                counter = ByteCounter()
+                self._hostBytes[host] = counter
+        return counter
+
+    def get_hostMetrics(self):
+        """
+        Return the concurrency window, latency percentiles, timeout... of every
+        host contacted, as a dict host -> metrics.
+        """
+
+        with self._lock:
+            limits = dict(self._hostLimits)
+            latencies = dict(self._hostLatencies)
+            counters = dict(self._hostBytes)
+        metrics = {}
+        for host, limit in limits.items():
+            metrics[host] = limit.get_metrics()
+            if host in latencies: metrics[host].update(latencies[host].get_metrics())
+            if host in counters: metrics[host].update(counters[host].get_metrics())
+        return metrics
+
+    def print_hostMetrics(self):
+        for host, metrics in sorted(self.get_hostMetrics().items()):
+            print('Host %s: concurrency window %.1f, latency p50 %s, p95 %s, p99 %s, '
+                  'timeout %s, %d decreases, %d hedged requests'
+                  % (host, metrics['window'], format_seconds(metrics['p50']),
+                     format_seconds(metrics['p95']), format_seconds(metrics.get('p99')),
+                     format_seconds(metrics.get('timeout')), metrics['decreases'],
+                     metrics.get('hedges', 0)))
+            if metrics.get('body_bytes'):
+                print('Host %s: %.1f KB received for %.1f KB of pages (%.0f%% saved by compression)'
+                      % (host, metrics['wire_bytes'] / 1024, metrics['body_bytes'] / 1024,
+                         100 * (1 - metrics['wire_bytes'] / metrics['body_bytes'])))
+
+    def get_pool(self, scheme, host, port):
+        key = (scheme, host, port)
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool is None:
+                pool = ConnectionPool(scheme, host, port, self.pool_size,
+                                      self.timeout, self.dns_cache,
+                                      self.ssl_context)
+                self._pools[key] = pool
+        return pool
+
+    def get_http2Connection(self, host, port):
+        """
+        Return the HTTP/2 connection to the host, open it if needed. Return
+        None if the host does not support HTTP/2 (use the HTTP/1.1 pool).
+        """
+
+        key = (host, port)
+        with self._http2Lock: # Only one connection is opened per host
+            if key in self._http1Hosts: return None
+            conn = self._http2Conns.get(key)
+            if conn is not None and not conn.closed: return conn
+
+            try:
+                conn = HTTP2Connection(host, port, self.timeout, self.http2_ssl_context,
+                                       self.dns_cache)
+            except HTTP2NotSupported:
+                print('HTTP/2 not supported by %s, HTTP/1.1 is used' % host)
+                self._http1Hosts.add(key)
+                return None
+            self._http2Conns[key] = conn
+            return conn
+
+    def _send(self, pool, path, headers, timeout=None, stream=None):
+        """
+        Send one GET request on a pooled connection, return
+        (status, reason, headers, body, truncated).
+        A reused connection may have been closed by the server in the meantime,
+        in this case, try again once on a new connection.
+
+        stream is a function returning a new consumer for the body of a 200
+        response (see compression.read_body). If the consumer stops the
+        download, the body is truncated and the connection is closed.
+        """
+
+        conn, is_reused = pool.get()
+        while True:
+            try:
+                if timeout is not None:
+                    conn.timeout = timeout
+                    if conn.sock is not None: conn.sock.settimeout(timeout)
+                conn.request('GET', path, headers=headers)
+                resp = conn.getresponse()
+                consumer = stream() if stream is not None and resp.status == 200 else None
+                body, wireBytes = read_body(resp, consumer=consumer) # Decompressed while reading
+                truncated = not resp.isclosed() # Stopped by the consumer
+
+            except (httplib.HTTPException, socket.error) as e:
+                conn.close()
+                if is_reused: # Stale keep-alive connection
+                    conn, is_reused = pool.new_connection(), False
+                    continue
+                raise urllib2.URLError(e)
+
+            if resp.will_close or truncated: # The rest of a truncated body is not read
+                conn.close()
+            else:
+                pool.put(conn)
+            self.get_hostBytes(pool.host).add(wireBytes, len(body))
+            return resp.status, resp.reason, resp.msg, body, truncated
+
+    def _send_http2(self, conn, path, headers, timeout=None):
+        """
+        Send one GET request on a new stream of an HTTP/2 connection, return
+        (status, reason, headers, body, truncated). The body is received by
+        the I/O thread of the connection, it is never truncated.
+        """
+
+        resp = conn.request(path, headers, timeout)
+        try:
+            body, wireBytes = read_body(resp)
+        except httplib.HTTPException as e:
+            raise urllib2.URLError(e)
+        self.get_hostBytes(conn.host).add(wireBytes, len(body))
+        return resp.status, resp.reason, resp.msg, body, False
+
+    def _send_hedged(self, send, latency):
+        """
+        Call send(timeout) with the adaptive timeout of the host. If there is
+        no response after the p95 latency of the host, the same request is sent
+        again (on another connection or HTTP/2 stream), the first response wins
+        (the other one is read in the background).
+        """
+
+        timeout = latency.get_timeout()
+        hedgeDelay = latency.get_hedgeDelay()
+        if hedgeDelay is None: return send(timeout)
+
+        responses = Queue()
+
+        def attempt():
+            try:
+                responses.put((send(timeout), None))
+            except Exception as e:
+                responses.put((None, e))
+
+        def start_attempt():
+            t = threading.Thread(target=attempt)
+            t.daemon = True
+            t.start()
+
+        start_attempt()
+        pending = 1
+        try:
+            response, error = responses.get(True, hedgeDelay)
+            pending -= 1
+        except Empty: # Slower than the p95 latency
+            if latency.try_hedge():
+                start_attempt()
+                pending += 1
+            response, error = responses.get()
+            pending -= 1
+            if error is not None and pending > 0: # Wait for the other request
+                response, error = responses.get()
+
+        if error is not None: raise error
+        return response
+
+    def _exchange(self, url, headers, stream=None):
+        """
+        Send one GET request (no redirect), return (status, reason, headers,
+        body, truncated). In replay mode, the response comes from the WARC
+        archive.
+
+        A streamed request (stream, see _send) is not hedged: the consumer
+        reads one response.
+        """
+
+        if self.archive is not None:
+            response = self.archive.get(url)
+            if response is None:
+                raise urllib2.URLError('not in archive (replay mode): %s' % url)
+            return response # Truncated if recorded as such (page.partial)
+
+        parsed = urlparse.urlsplit(url)
+        scheme = parsed.scheme.lower()
+        if scheme not in ('http', 'https'):
+            raise urllib2.URLError('unknown url type: %s' % scheme)
+
+        host = parsed.hostname
+        port = parsed.port or (443 if scheme == 'https' else 80)
+        path = urlparse.urlunsplit(('', '', parsed.path or '/', parsed.query, ''))
+
+        limit = self.get_hostLimit(host)
+        latency = self.get_hostLatency(host)
+        startTime = limit.acquire()
+        try:
+            conn = None
+            if self.http2 and scheme == 'https': conn = self.get_http2Connection(host, port)
+            if conn is not None:
+                send = lambda timeout: self._send_http2(conn, path, headers, timeout)
+            else:
+                pool = self.get_pool(scheme, host, port)
+                send = lambda timeout: self._send(pool, path, headers, timeout, stream)
+            if stream is not None:
+                status, reason, respHeaders, body, truncated = send(latency.get_timeout())
+            else:
+                status, reason, respHeaders, body, truncated = self._send_hedged(send, latency)
+        except Exception as e:
+            limit.release(startTime, error=e)
+            raise
+        limit.release(startTime, status)
+        if status < 400 and not truncated: latency.add(time() - startTime)
+
+        if self.recorder is not None:
+            self.recorder.write_response(url, status, reason, respHeaders, body, truncated)
+
+        return status, reason, respHeaders, body, truncated
+
+    def download(self, url, headers=None, stream=None):
+        """
+        Download the url (GET), follow redirects and return a Response object.
+        Raise urllib2.HTTPError for 4xx/5xx status, urllib2.URLError for other
+        errors, same as urllib2.urlopen.
+
+        stream: function returning a new consumer of the page, see _send. If
+        the consumer stopped the download, page.partial is True.
+        """
+
+        requestHeaders = dict(self.headers)
+        if headers is not None: requestHeaders.update(headers)
+
+        for _ in range(self.max_redirects + 1):
+
+            status, reason, respHeaders, body, truncated = self._exchange(url, requestHeaders, stream)
+
+            # Follow redirect
+            location = respHeaders.getheader('location')
+            if status in REDIRECT_CODES and location:
+                url = urlparse.urljoin(url, location)
+                continue
+
+            if status >= 400:
+                raise urllib2.HTTPError(url, status, reason, respHeaders,
+                                        StringIO(body))
+
+            page = Response(url, status, reason, respHeaders, body)
+            page.partial = truncated
+            return page
+
+        raise urllib2.URLError('too many redirects: %s' % url)
+
+    def request(self, url, headers=None, stream=None):
+        """
+        Return the page of the url as a Response object, use the disk cache if
+        it is set (see cache.py for the cache modes).
+
+        The requests for the same url share one fetch, a page already fetched
+        in this run is not fetched again (see singleflight.py).
+
+        A streamed request (stream, see download) uses the page of the memo if
+        there is one, else it is sent on its own, as its page may be partial.
+        A partial page is neither cached nor memoized.
+        """
+
+        if stream is not None:
+            page = self.singleflight.get(url)
+            if page is not None: return page
+            return self._request(url, headers, stream)
+
+        if headers is not None: return self._request(url, headers) # Not the same request
+        return self.singleflight.do(url, self._request)
+
+    def _request(self, url, headers=None, stream=None):
+        cache = self.cache
+        if cache is None: return self.download(url, headers, stream)
+
+        entry = cache.get(url)
+
+        if cache.mode == 'offline':
+            if entry is None:
+                raise urllib2.URLError('not in cache (offline mode): %s' % url)
+            return self._cached_response(url, entry)
+
+        # Fresh entry, no request needed. Stale entry, ask the server if the
+        # page was modified since
+        requestHeaders = dict(headers or {})
+        if entry is not None and cache.mode == 'normal':
+            if entry.is_fresh(cache.ttl): return self._cached_response(url, entry)
+            requestHeaders.update(entry.conditional_headers())
+
+        page = self.download(url, requestHeaders, stream)
+
+        if page.code == 304 and entry is not None: # Not modified
+            cache.revalidate(url, entry, page.headers)
+            page = self._cached_response(url, entry)
+            page.not_modified = True
+        elif page.code == 200 and not page.partial:
+            cache.put(url, page)
+
+        return page
+
+    def _cached_response(self, url, entry):
+        page = Response(entry.meta['final_url'], entry.meta['code'],
+                        entry.meta['msg'], entry.get_headers(), entry.body,
+                        entry.digest)
+        page.from_cache = True
+
+        # Also record the pages served by the cache, so the archive is complete
+        if self.recorder is not None:
+            self.recorder.write_response(url, page.code, page.msg, page.headers, page.body)
+
+        return page
+
+    def close(self):
+        with self._lock:
+            pools, self._pools = self._pools.values(), {}
+        for pool in pools: pool.close()
+        with self._http2Lock:
+            conns, self._http2Conns = self._http2Conns.values(), {}
+        for conn in conns: conn.close()
+
+#------------------------------------------------------------------------------
+# Shared client
+#------------------------------------------------------------------------------
+
+_client = HTTPClient()
+
+def get_client():
+    """
+    Return the HTTP client shared by all the functions of this module.
+    """
+
+    return _client
+
+def is_host_failure(e):
+    """
+    Tell if an error means the host has a problem (counted by its circuit
+    breaker): network errors, 5xx and 429 responses. Other HTTP errors (404...)
+    mean the host is up.
+    """
+
+    if isinstance(e, urllib2.HTTPError):
+        return e.code >= 500 or e.code == 429
+    return True
+
+def urlopen_wrapper(url, num_retry=5, delay=10, stream=None):
+    """
+    Function to open a page, try several times if the page gets stuck.
+
+    stream: function returning a new consumer of the page, which can stop the
+    download early (see HTTPClient.download and stream.py).
+
+    The retries follow the shared retry policy (retry.py): exponential backoff,
+    retry budget of the run, and no request at all while the circuit of the
+    host is open. Only transient errors are retried, not 404, 403... (see
+    failures.py).
+    """
+
+    # No circuit breaker when the pages do not come from the network
+    host = get_host(url) if _client.is_online() else None
+
+    try:
+        page = call_with_retry(_client.request, (url, None, stream), num_retry, delay,
+                               host=host, is_failure=is_host_failure, key=url)
+        return page # If no error, end function
+
+    except urllib2.URLError as e:
+        print_failure('ERROR opening url:', e)
+        record_failure(url, e)
+
+    # If try many times but failed
+    print_failure('FAILED to open this url.', url)
+    update_errorLog('FAILED_OPENING_URL' + ' | ' + url) # Add to log
+    return None
+
+#------------------------------------------------------------------------------
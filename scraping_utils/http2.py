@@ -0,0 +1,295 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, division
+
+"""
+Optional HTTP/2 transport of the shared HTTP client.
+
+The detail stages (extract_allAddonInfo, extract_allJobsInfo) send hundreds
+of small GET requests to the same host. With HTTP/1.1, every request in flight
+needs its own connection (TCP + TLS handshakes). With HTTP/2, all the requests
+to one host are multiplexed over one TLS connection, as concurrent streams.
+
+The HTTP/2 mode is enabled with fetch.get_client().set_http2(True) (option
+--http2 of the scripts). It needs the h2 package (pip install h2) and an SSL
+module with ALPN. A host which does not select "h2" during the TLS handshake
+(ALPN) is contacted with HTTP/1.1 for the rest of the run.
+
+Benchmark against a local HTTP/2 server: benchmarks/http2_benchmark.py
+
+Refs: RFC 7540, https://python-hyper.org/projects/h2/
+"""
+
+#------------------------------------------------------------------------------
+# Libraries
+#------------------------------------------------------------------------------
+
+import httplib
+import os
+import select
+import socket
+import ssl
+import threading
+import urllib2
+from StringIO import StringIO
+from time import time
+
+# Optional package
+try:
+    import h2.config
+    import h2.connection
+    import h2.events
+    import h2.settings
+except ImportError:
+    h2 = None
+
+#------------------------------------------------------------------------------
+# Global variables
+#------------------------------------------------------------------------------
+
+HAS_HTTP2 = h2 is not None and getattr(ssl, 'HAS_ALPN', False)
+
+MAX_STREAMS = 100 # Streams open at the same time on one connection
+WINDOW_SIZE = 16 * 1024 * 1024 # Flow control window of the client (bytes)
+READ_SIZE = 64 * 1024
+TIMEOUT_CHECK = 0.5 # Seconds between two checks of the stream timeouts
+
+# Connection-specific headers, forbidden in HTTP/2
+HOP_HEADERS = ('connection', 'keep-alive', 'proxy-connection', 'transfer-encoding',
+               'upgrade', 'host')
+
+#------------------------------------------------------------------------------
+# Self-defined functions
+#------------------------------------------------------------------------------
+
+class HTTP2NotSupported(Exception):
+    """
+    The server did not select h2 during the TLS handshake.
+    """
+
+class HTTP2Response(object):
+    """
+    A complete HTTP/2 response, with the attributes and methods of an httplib
+    response used by the fetch layer (status, reason, msg, getheader, read).
+    """
+
+    def __init__(self, status, headers, body):
+        self.status = status
+        self.reason = httplib.responses.get(status, '')
+        headerText = ''.join('%s: %s\r\n' % (name, value) for name, value in headers)
+        self.msg = httplib.HTTPMessage(StringIO(headerText + '\r\n'))
+        self._fp = StringIO(body)
+
+    def getheader(self, name, default=None):
+        return self.msg.getheader(name, default)
+
+    def read(self, amt=None):
+        if amt is None: return self._fp.read()
+        return self._fp.read(amt)
+
+class _Stream(object):
+    def __init__(self):
+        self.status = None
+        self.headers = []
+        self.chunks = []
+        self.error = None
+        self.deadline = None
+        self.done = threading.Event()
+
+class HTTP2Connection(object):
+    """
+    One HTTP/2 connection to a host. request() can be called from several
+    threads at the same time, every call is one stream.
+
+    All the reads and writes of the TLS socket are done by one I/O thread (an
+    SSL socket cannot be read and written by two threads at the same time).
+    The I/O thread also fails the streams which are past their timeout: in
+    Python 2, a wait with a timeout polls every 50ms, so the callers wait
+    without timeout.
+    """
+
+    def __init__(self, host, port, timeout, ssl_context, dns_cache=None,
+                 max_streams=MAX_STREAMS):
+        self.host = host
+        self.port = port
+        self.max_streams = max_streams
+        self.closed = False
+
+        address = dns_cache.resolve(host, port) if dns_cache is not None else (host, port)
+        try:
+            sock = socket.create_connection(address, timeout)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self.sock = ssl_context.wrap_socket(sock, server_hostname=host)
+        except (socket.error, ssl.SSLError) as e:
+            if dns_cache is not None: dns_cache.forget(host, port)
+            raise urllib2.URLError(e)
+
+        if self.sock.selected_alpn_protocol() != 'h2':
+            self.sock.close()
+            raise HTTP2NotSupported(host)
+        self.sock.settimeout(None) # select() tells when the socket can be read
+
+        config = h2.config.H2Configuration(client_side=True, header_encoding='utf-8')
+        self.conn = h2.connection.H2Connection(config=config)
+        self.conn.initiate_connection()
+        self.conn.update_settings({h2.settings.SettingCodes.INITIAL_WINDOW_SIZE:WINDOW_SIZE})
+        self.conn.increment_flow_control_window(WINDOW_SIZE)
+
+        self._streams = {} # stream id -> _Stream
+        self._closing = False
+        self._cond = threading.Condition() # Protects self.conn and self._streams
+        self._wakeupRead, self._wakeupWrite = os.pipe() # Wakes up the I/O thread
+        self._wakeupPending = False
+
+        thread = threading.Thread(target=self._run)
+        thread.daemon = True
+        thread.start()
+
+    def _wakeup(self):
+        """
+        Ask the I/O thread to send the pending frames. Called with self._cond
+        held.
+        """
+
+        if not self._wakeupPending:
+            self._wakeupPending = True
+            os.write(self._wakeupWrite, 'x')
+
+    def _stream_limit(self):
+        return min(self.max_streams, self.conn.remote_settings.max_concurrent_streams)
+
+    def request(self, path, headers, timeout=None):
+        """
+        Send a GET request on a new stream, wait for the complete response and
+        return an HTTP2Response object.
+        """
+
+        requestHeaders = [(':method', 'GET'),
+                          (':scheme', 'https'),
+                          (':authority', self.host if self.port == 443 else '%s:%d' % (self.host, self.port)),
+                          (':path', path)]
+        requestHeaders += [(name.lower(), value) for name, value in headers.items()
+                           if name.lower() not in HOP_HEADERS]
+
+        stream = _Stream()
+        if timeout is not None: stream.deadline = time() + timeout
+        with self._cond:
+            while not self.closed and len(self._streams) >= self._stream_limit():
+                self._cond.wait() # Stream-level concurrency limit
+            if self.closed: raise urllib2.URLError('HTTP/2 connection closed')
+            streamId = self.conn.get_next_available_stream_id()
+            self._streams[streamId] = stream
+            self.conn.send_headers(streamId, requestHeaders, end_stream=True)
+            self._wakeup()
+
+        stream.done.wait()
+        if stream.error is not None: raise stream.error
+        return HTTP2Response(stream.status, stream.headers, ''.join(stream.chunks))
+
+    def _run(self):
+        """
+        I/O thread: send the pending frames, receive and handle the frames of
+        the server, check the timeouts.
+        """
+
+        error = None
+        while error is None:
+            try:
+                readable, _, _ = select.select([self.sock, self._wakeupRead], [], [],
+                                               TIMEOUT_CHECK)
+                data = ''
+                if self.sock in readable:
+                    data = self.sock.recv(READ_SIZE)
+                    if not data:
+                        error = urllib2.URLError('HTTP/2 connection closed by the server')
+                        break
+                    while self.sock.pending(): # Data already decrypted by SSL
+                        data += self.sock.recv(self.sock.pending())
+            except (select.error, socket.error, ssl.SSLError) as e:
+                error = urllib2.URLError(e)
+                break
+
+            with self._cond:
+                if self._wakeupRead in readable:
+                    os.read(self._wakeupRead, 4096)
+                    self._wakeupPending = False
+                try:
+                    if data:
+                        for event in self.conn.receive_data(data):
+                            self._handle_event(event)
+                    self._expire_streams()
+                    if self._closing:
+                        self.conn.close_connection()
+                        error = urllib2.URLError('HTTP/2 connection closed')
+                    self.sock.sendall(self.conn.data_to_send())
+                except Exception as e: # Protocol or socket error
+                    error = urllib2.URLError(e)
+                self._cond.notify_all()
+
+        with self._cond:
+            self._close(error)
+        os.close(self._wakeupRead)
+        os.close(self._wakeupWrite)
+
+    def _handle_event(self, event):
+        stream = self._streams.get(getattr(event, 'stream_id', None))
+
+        if isinstance(event, h2.events.ResponseReceived) and stream is not None:
+            for name, value in event.headers:
+                if name == ':status': stream.status = int(value)
+                else: stream.headers.append((name, value))
+
+        elif isinstance(event, h2.events.DataReceived):
+            self.conn.acknowledge_received_data(event.flow_controlled_length, event.stream_id)
+            if stream is not None: stream.chunks.append(event.data)
+
+        elif isinstance(event, h2.events.StreamEnded) and stream is not None:
+            del self._streams[event.stream_id]
+            stream.done.set()
+
+        elif isinstance(event, h2.events.StreamReset) and stream is not None:
+            del self._streams[event.stream_id]
+            stream.error = urllib2.URLError('HTTP/2 stream reset by the server (error %s)'
+                                            % event.error_code)
+            stream.done.set()
+
+        elif isinstance(event, h2.events.ConnectionTerminated):
+            raise urllib2.URLError('HTTP/2 connection terminated by the server (GOAWAY)')
+
+    def _expire_streams(self):
+        """
+        Reset the streams which are past their timeout. Called with self._cond
+        held.
+        """
+
+        now = time()
+        for streamId, stream in self._streams.items():
+            if stream.deadline is not None and stream.deadline < now:
+                del self._streams[streamId]
+                self.conn.reset_stream(streamId)
+                stream.error = urllib2.URLError(socket.timeout('timed out'))
+                stream.done.set()
+
+    def _close(self, error):
+        """
+        Mark the connection as closed, fail all the streams in flight. Called
+        by the I/O thread with self._cond held.
+        """
+
+        self.closed = True
+        for stream in self._streams.values():
+            stream.error = error
+            stream.done.set()
+        self._streams = {}
+        try:
+            self.sock.close()
+        except socket.error:
+            pass
+        self._cond.notify_all()
+
+    def close(self):
+        with self._cond:
+            if not self.closed:
+                self._closing = True
+                self._wakeup()
+
+#------------------------------------------------------------------------------
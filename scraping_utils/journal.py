@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, division
+
+"""
+Journal of a run, to resume it after a crash (--resume).
+
+When a long run died in the detail step (e.g. at job 900 of 1000), the next
+run started again from the first listing page. The scripts now write every
+piece of work done in an append-only journal (JSON lines, one entry per line):
+    - PAGE entries: a listing page (url) and what was extracted from it (the
+    items and the url of the next page)
+    - DETAIL entries: a detail page (url) and its extracted record
+With --resume, the journal of the interrupted run is read first: the pages
+and records found in it are used as they are, only the remaining pages are
+downloaded, and the output files are written again from start to end (the
+records of the journal, then the new ones). Without --resume, a new journal
+is started.
+
+Only the successful work is written: a failed page is tried again by the
+resumed run. The journal is flushed after each entry and written to the disk
+(os.fsync) every FSYNC_EVERY entries. A line cut by a crash is ignored.
+
+    journal = get_journal()
+    record = journal.get(DETAIL, url)
+    if record is None:
+        record = ... # Download and extract
+        journal.add(DETAIL, url, record)
+"""
+
+#------------------------------------------------------------------------------
+# Libraries
+#------------------------------------------------------------------------------
+
+import json
+import threading
+from collections import OrderedDict
+
+# Other packages
+import os
+
+from scraping_utils.records import Record
+from scraping_utils.sinks import json_default
+
+#------------------------------------------------------------------------------
+# Global variables
+#------------------------------------------------------------------------------
+
+PAGE = 'page' # Listing page
+DETAIL = 'detail' # Detail page
+
+FSYNC_EVERY = 50 # Entries between two os.fsync
+
+#------------------------------------------------------------------------------
+# Self-defined functions
+#------------------------------------------------------------------------------
+
+def journal_key(key):
+    """
+    Keys are compared as read from the journal (unicode).
+    """
+
+    return key.decode('utf-8', 'replace') if isinstance(key, str) else key
+
+class Journal(object):
+    """
+    Append-only journal of a run (thread-safe). Without a path, nothing is
+    written and nothing is found (no journal).
+    """
+
+    def __init__(self, path=None, resume=False):
+        self.path = path
+        self.loaded = 0 # Entries of the interrupted run
+        self.reused = 0 # Entries found by get
+        self._entries = {} # (kind, key): record, of the interrupted run
+        self._unsynced = 0
+        self._lock = threading.Lock()
+        self._file = None
+        if path is None: return
+
+        folder = os.path.dirname(path)
+        if folder != '' and not os.path.exists(folder): os.makedirs(folder)
+
+        if resume and os.path.exists(path):
+            self._file = open(path, 'r+b')
+            self._load()
+        else:
+            self._file = open(path, 'wb')
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _load(self):
+        """
+        Read the entries of the interrupted run, cut the line not finished.
+        """
+
+        end = 0 # End of the last complete entry
+        for line in iter(self._file.readline, ''):
+            if not line.endswith('\n'): break # Line cut by the crash
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                break
+            self._entries[(entry['kind'], entry['key'])] = entry['record']
+            end += len(line)
+        self._file.seek(end)
+        self._file.truncate()
+        self.loaded = len(self._entries)
+
+    def get(self, kind, key):
+        """
+        Return the record of (kind, key) written by the interrupted run, None
+        if this work was not done.
+        """
+
+        with self._lock:
+            record = self._entries.get((kind, journal_key(key)))
+            if record is not None: self.reused += 1
+        return record
+
+    def done(self, kind, key):
+        """
+        Return True if (kind, key) was done by the interrupted run.
+        """
+
+        return (kind, journal_key(key)) in self._entries
+
+    def add(self, kind, key, record):
+        """
+        Write the record of a finished piece of work (a Record, a dict or any
+        JSON value).
+        """
+
+        if self._file is None: return
+        if isinstance(record, Record): record = OrderedDict(record.items())
+        line = json.dumps({'kind':kind, 'key':journal_key(key), 'record':record}, default=json_default) + '\n'
+
+        with self._lock:
+            if self._file is None: return
+            self._file.write(line)
+            self._file.flush()
+            self._unsynced += 1
+            if self._unsynced >= FSYNC_EVERY:
+                os.fsync(self._file.fileno())
+                self._unsynced = 0
+
+    def close(self):
+        with self._lock:
+            if self._file is None: return
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+            self._file = None
+
+    def print_metrics(self):
+        if self.loaded == 0: return
+        print('Journal: %d entries of the interrupted run, %d reused' % (self.loaded, self.reused))
+
+_journal = Journal()
+
+def get_journal():
+    return _journal
+
+def set_journal(path, resume=False):
+    """
+    Start the journal of the run in path. resume: keep the entries of the
+    interrupted run (else a new journal is started).
+    """
+
+    global _journal
+    _journal.close()
+    _journal = Journal(path, resume)
+    return _journal
+
+#------------------------------------------------------------------------------
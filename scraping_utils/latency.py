@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, division
+
+"""
+Latency distribution of each host, used to cut the tail latency of a run.
+
+With a fixed 30 seconds timeout, one slow page holds up its worker for half a
+minute before the retry even starts. The shared HTTP client now keeps the
+latencies of the last successful requests of each host (HostLatency) and uses
+them for:
+    - an adaptive timeout: TIMEOUT_FACTOR times the p99 latency of the host,
+    between MIN_TIMEOUT and the timeout of the client (30 seconds)
+    - hedged requests: when a request has no response after the p95 latency
+    of the host, the same request is sent again on another connection and the
+    first response wins. At most HEDGE_RATIO of the requests of a host are
+    hedged, so a slow host does not receive twice more requests.
+Both are only used once MIN_SAMPLES latencies are known for the host.
+"""
+
+#------------------------------------------------------------------------------
+# Libraries
+#------------------------------------------------------------------------------
+
+import threading
+from collections import deque
+
+#------------------------------------------------------------------------------
+# Global variables
+#------------------------------------------------------------------------------
+
+LATENCY_HISTORY = 200 # Latencies kept per host
+MIN_SAMPLES = 20 # Latencies needed before using the percentiles
+
+MIN_TIMEOUT = 5 # Seconds
+TIMEOUT_FACTOR = 4 # Timeout = TIMEOUT_FACTOR x p99 latency
+
+HEDGE_PERCENTILE = 95
+HEDGE_RATIO = 0.1 # Maximum part of the requests which are hedged
+
+#------------------------------------------------------------------------------
+# Self-defined functions
+#------------------------------------------------------------------------------
+
+class LatencyTracker(object):
+    """
+    Rolling window of the last latencies of a host, with percentiles.
+    Not thread-safe, used under the lock of its owner.
+    """
+
+    def __init__(self, size=LATENCY_HISTORY):
+        self.samples = deque(maxlen=size)
+
+    def __len__(self):
+        return len(self.samples)
+
+    def add(self, latency):
+        self.samples.append(latency)
+
+    def percentile(self, q):
+        """
+        Return the q-th percentile (0-100) of the latencies, None if there is
+        no sample.
+        """
+
+        if not self.samples: return None
+        sortedSamples = sorted(self.samples)
+        index = int(round(q / 100 * (len(sortedSamples) - 1)))
+        return sortedSamples[index]
+
+class HostLatency(object):
+    """
+    Latencies of the successful requests of one host, adaptive timeout and
+    hedging decision. Thread-safe.
+    """
+
+    def __init__(self, host, max_timeout):
+        self.host = host
+        self.max_timeout = max_timeout
+        self.latency = LatencyTracker()
+        self.requests = 0
+        self.hedges = 0
+        self._lock = threading.Lock()
+
+    def add(self, latency):
+        with self._lock:
+            self.latency.add(latency)
+
+    def get_timeout(self):
+        """
+        Return the timeout of the next request to the host.
+        """
+
+        with self._lock:
+            return self._get_timeout()
+
+    def _get_timeout(self):
+        if len(self.latency) < MIN_SAMPLES: return self.max_timeout
+        timeout = TIMEOUT_FACTOR * self.latency.percentile(99)
+        return max(MIN_TIMEOUT, min(self.max_timeout, timeout))
+
+    def get_hedgeDelay(self):
+        """
+        Return the delay after which the next request to the host is hedged,
+        None if it must not be hedged.
+        """
+
+        with self._lock:
+            self.requests += 1
+            if len(self.latency) < MIN_SAMPLES: return None
+            return self.latency.percentile(HEDGE_PERCENTILE)
+
+    def try_hedge(self):
+        """
+        Return True if one more request can be hedged (HEDGE_RATIO budget).
+        """
+
+        with self._lock:
+            if self.hedges >= HEDGE_RATIO * self.requests: return False
+            self.hedges += 1
+            return True
+
+    def get_metrics(self):
+        with self._lock:
+            return {'p50':self.latency.percentile(50),
+                    'p95':self.latency.percentile(95),
+                    'p99':self.latency.percentile(99),
+                    'timeout':self._get_timeout(),
+                    'hedges':self.hedges}
+
+#------------------------------------------------------------------------------
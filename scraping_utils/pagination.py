@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, division
+
+"""
+Listing pages read at the same time.
+
+The listing functions walked their pages one by one: read a page, find its
+next link, read the next page. N pages took N round trips. Most sites number
+their pages in the url (Indeed: &start=10, Firefox: &page=2, TripAdvisor:
+-oa30-), so the urls of the next pages are known in advance:
+    - pages 1 and 2 are read one by one, their next links are the urls of
+    pages 2 and 3
+    - the urls of pages 2 and 3 differ by one number, the page number or the
+    offset of the first item (PageTemplate.infer): the url of page k is known
+    - the next pages are read num_workers at the same time, batch after batch
+    (no batch goes past page_count, when the site shows its number of pages)
+    - the pages are stitched together: the next link of each page read must be
+    the url of the next page of the template, the walk ends at the page
+    without next link (the pages read past the end are dropped)
+    - the pages of a batch are read quietly (failures.set_quiet): when the
+    number of pages is not known, the pages past the end of the last batch
+    may not exist, their errors are not failures of the run (not printed,
+    not in the failure report or the error log)
+When no template is found (e.g. a session id in the next links), or at the
+first page that does not stitch (or cannot be read, its errors are then
+recorded when it is read again), the walk goes on one page at a time from the
+last page stitched, with the next links.
+
+So the pages are the same as the serial walk, in the same order, and the
+listing takes about one round trip per batch instead of one per page.
+
+    for pageRecord in walk_pages(firstPageURL, read_addonsPage, num_workers=8):
+        for addonName, addonURL in pageRecord['items']:
+            ...
+
+read_page(url) reads a page (or finds it in the journal) and returns its
+record, a dict with the url of the next page in 'next' (None on the last
+page), or raises PageNotRead if the page cannot be opened (e.g. a page past
+the end). It is called by several threads at the same time.
+
+The walk is lazy: a batch is read when the pages before it are used, so a
+listing stopped after its first items (--top-k) does not read the next pages,
+and count_pages keeps the batches within the pages needed for these items.
+"""
+
+#------------------------------------------------------------------------------
+# Libraries
+#------------------------------------------------------------------------------
+
+import re
+
+from scraping_utils.engine import map_ordered
+from scraping_utils.failures import set_quiet
+
+#------------------------------------------------------------------------------
+# Global variables
+#------------------------------------------------------------------------------
+
+DEFAULT_NUM_WORKERS = 8 # Listing pages read at the same time
+
+_NUMBER = re.compile(r'\d+')
+
+#------------------------------------------------------------------------------
+# Self-defined functions
+#------------------------------------------------------------------------------
+
+class PageNotRead(Exception):
+    """
+    Raised by a read_page function when the page cannot be opened.
+    """
+
+    def __init__(self, url):
+        Exception.__init__(self, 'listing page not read: %s' % url)
+        self.url = url
+
+class PageTemplate(object):
+    """
+    Urls of the listing pages: the url of page 2 with one number (the page
+    number or the offset) growing by step from a page to the next.
+    """
+
+    def __init__(self, prefix, suffix, start, step):
+        self.prefix = prefix
+        self.suffix = suffix
+        self.start = start # Number in the url of page 2
+        self.step = step
+
+    def url(self, page):
+        """
+        Return the url of the page (from 2, page 1 may have no number).
+        """
+
+        return '%s%d%s' % (self.prefix, self.start + (page - 2) * self.step, self.suffix)
+
+    @classmethod
+    def infer(cls, secondURL, thirdURL):
+        """
+        Return the template of the urls of pages 2 and 3, None if they do not
+        differ by exactly one growing number.
+        """
+
+        if secondURL is None or thirdURL is None: return None
+        secondNumbers = list(_NUMBER.finditer(secondURL))
+        thirdNumbers = list(_NUMBER.finditer(thirdURL))
+        if _NUMBER.split(secondURL) != _NUMBER.split(thirdURL): return None
+
+        changed = [(second, third) for second, third in zip(secondNumbers, thirdNumbers)
+                   if second.group() != third.group()]
+        if len(changed) != 1: return None
+        second, third = changed[0]
+        if second.group() != str(int(second.group())): return None # Zero padded number
+
+        start = int(second.group())
+        step = int(third.group()) - start
+        if step <= 0: return None
+
+        template = cls(secondURL[:second.start()], secondURL[second.end():], start, step)
+        if template.url(3) != thirdURL: return None
+        return template
+
+    def __repr__(self):
+        return '%s{%d + %d*(page-2)}%s' % (self.prefix, self.start, self.step, self.suffix)
+
+def count_pages(itemCount, top_k=None, page_count=None):
+    """
+    Return the number of pages to read: page_count (None: not known), or less
+    if only the first top_k items are needed, with itemCount items per page (as
+    the first page). The walk goes on after it if more pages are needed (e.g.
+    duplicated items).
+    """
+
+    if top_k is None or itemCount == 0: return page_count
+    pages = -(-top_k // itemCount) # Rounded up
+    return pages if page_count is None else min(pages, page_count)
+
+def walk_pages(firstPageURL, read_page, page_count=None, num_workers=DEFAULT_NUM_WORKERS):
+    """
+    Generator of the records of the listing pages, in order, from the first
+    page (see the module docstring). page_count: the number of pages if the
+    site shows it, or a function of the record of the first page returning it
+    (None: not known). num_workers 0 or 1: pages read one by one.
+    """
+
+    def try_read_page(url):
+        quiet = set_quiet(True) # May be past the last page
+        try:
+            return read_page(url)
+        except Exception: # Read again (the error raised and recorded) by the serial walk
+            return None
+        finally:
+            set_quiet(quiet)
+
+    pageCount = 0 # Pages given
+    url = firstPageURL
+    previousURL = None
+
+    while url is not None:
+
+        # Serial walk: read the page, follow its next link
+        pageRecord = read_page(url)
+        pageCount += 1
+        if pageCount == 1 and callable(page_count): page_count = page_count(pageRecord)
+        yield pageRecord
+        previousURL, url = url, pageRecord['next']
+
+        # From page 2: the urls of the next pages are known
+        if pageCount < 2 or url is None or num_workers <= 1: continue
+        template = PageTemplate.infer(previousURL, url)
+        if template is None: continue
+
+        page = pageCount + 1 # Next page to read
+        while url is not None:
+            batchSize = num_workers
+            if page_count is not None and page <= page_count: batchSize = min(batchSize, page_count - page + 1)
+            pageURLs = [template.url(k) for k in range(page, page + batchSize)]
+            pageRecords = map_ordered(try_read_page, pageURLs, num_workers)
+
+            # Stitch the pages of the batch
+            for pageURL, pageRecord in zip(pageURLs, pageRecords):
+                if pageRecord is None: break # Not read, read again one by one
+                pageCount += 1
+                page += 1
+                yield pageRecord
+                url = pageRecord['next']
+                if url is None: break # Last page, the pages after it are dropped
+                if url != template.url(page):
+                    print('Pagination: the next link of page', pageCount,
+                          'does not follow the url template, next pages read one by one')
+                    break
+            else:
+                continue # Next batch
+            break
+
+        # Serial walk from the last page stitched
+        num_workers = 0
+
+#------------------------------------------------------------------------------
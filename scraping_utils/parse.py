@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, division
+
+"""
+Shared functions to parse the downloaded pages with BeautifulSoup.
+
+BeautifulSoup_wrapper was copied in every script, it is now shared so all
+scripts use the same fetch layer (pooled connections, disk cache...).
+
+A page which is the same as a page already parsed in this run (e.g. a 304
+response or a page served by the disk cache) is not parsed again, the soup is
+reused from a small in-memory memo. The extract functions only read the soup,
+so sharing it is safe.
+
+The raw HTML of the last pages is also kept (get_rawHTML), so a page which
+fails extraction can be saved in the quarantine file (failures.py).
+
+The parser is chosen per site with parser_type (backends.py): BeautifulSoup
+with 'html.parser' or 'lxml', or the faster 'lxml.html' and 'selectolax'
+trees, which have the same find/text/get API as a soup.
+
+With stream=True, the page is parsed while it is downloaded and the download
+stops once the required regions are found (stream.py), the tree is built
+from the part of the page received.
+
+HTMLTree_wrapper returns the lxml.html tree itself, for the compiled
+extraction schemas of extract.py.
+
+extract_wrapper returns the record of an extract function instead of the tree,
+the parse + extract runs in the parse pool (in worker processes with
+--parse-workers, see parsepool.py).
+"""
+
+#------------------------------------------------------------------------------
+# Libraries
+#------------------------------------------------------------------------------
+
+import threading
+from collections import OrderedDict
+
+from scraping_utils.backends import parse_html, regions_key, uses_regions
+from scraping_utils.fetch import urlopen_wrapper, update_errorLog
+from scraping_utils.failures import quarantine_page, print_failure
+from scraping_utils.stream import StreamFactory, is_streamable
+from scraping_utils.parsepool import get_parsePool
+
+#------------------------------------------------------------------------------
+# Global variables
+#------------------------------------------------------------------------------
+
+PARSE_MEMO_SIZE = 32 # Number of soups kept in memory
+
+_parseMemo = OrderedDict() # (body digest, parser type, regions) -> soup or tree
+_parseMemoLock = threading.Lock()
+
+_rawHTMLMemo = OrderedDict() # url -> raw HTML of the page
+
+#------------------------------------------------------------------------------
+# Self-defined functions
+#------------------------------------------------------------------------------
+
+def build_tree(page, parser_type='lxml', regions=None):
+    """
+    Parse a page with a parser backend (see backends.py): a soup for the
+    BeautifulSoup parsers ('html.parser', 'lxml'), else a node with the same API.
+    Only the regions are kept if regions is given (BeautifulSoup). The bytes of a downloaded
+    page are parsed with the encoding of its host (see charset.py).
+    """
+
+    return parse_html(getattr(page, 'body', page), parser_type, regions,
+                      getattr(page, 'encoding', None))
+
+def parse_page(page, parser_type='lxml', regions=None):
+    """
+    Parse a page returned by urlopen_wrapper. Reuse the soup if the same page
+    content was already parsed with the same parser and regions.
+    """
+
+    digest = getattr(page, 'digest', None)
+    if digest is None: return build_tree(page, parser_type, regions)
+
+    key = (digest, parser_type, regions_key(regions) if uses_regions(parser_type) else None)
+    with _parseMemoLock:
+        soup = _parseMemo.pop(key, None)
+        if soup is not None:
+            _parseMemo[key] = soup # Move to the most recently used position
+            return soup
+
+    soup = build_tree(page, parser_type, regions)
+
+    with _parseMemoLock:
+        _parseMemo[key] = soup
+        while len(_parseMemo) > PARSE_MEMO_SIZE:
+            _parseMemo.popitem(last=False)
+
+    return soup
+
+def remember_rawHTML(url, html):
+    with _parseMemoLock:
+        _rawHTMLMemo.pop(url, None)
+        _rawHTMLMemo[url] = html
+        while len(_rawHTMLMemo) > PARSE_MEMO_SIZE:
+            _rawHTMLMemo.popitem(last=False)
+
+def get_rawHTML(url):
+    """
+    Return the raw HTML of a page recently opened by BeautifulSoup_wrapper, or
+    None if it is not in memory any more.
+    """
+
+    with _parseMemoLock:
+        return _rawHTMLMemo.get(url)
+
+def clear_memos():
+    """
+    Forget the parsed pages and the raw HTML kept in memory (e.g. to free
+    memory during a long crawl).
+    """
+
+    with _parseMemoLock:
+        _parseMemo.clear()
+        _rawHTMLMemo.clear()
+
+def open_page(url, num_retry=5, delay=10, regions=None, stream=False):
+    """
+    Download a page for BeautifulSoup_wrapper and extract_wrapper, keep its
+    raw HTML (get_rawHTML). Return None if the page cannot be opened.
+    """
+
+    consumer = None
+    if stream and is_streamable(regions):
+        consumer = StreamFactory(regions)
+
+    page = urlopen_wrapper(url, num_retry, delay, consumer) # Try to open the page
+    if page is not None: remember_rawHTML(url, page.body)
+    return page
+
+def BeautifulSoup_wrapper(url, parser_type='lxml', num_retry=5, delay=10, regions=None, stream=False):
+    """
+    This function will try several times to extract the HTML structure of the page
+
+    parser_type is the parser backend: 'html.parser', 'lxml', 'lxml.html' or
+    'selectolax' (see backends.py). regions is the list of page regions read
+    by the extract functions (Region), the rest of the page is not kept.
+    stream: stop the download once the required regions are parsed (needs
+    regions with required=..., see stream.py).
+
+    Note: the retries are done by urlopen_wrapper (shared retry policy), the
+    page is not downloaded again if it cannot be parsed.
+    """
+
+    page = open_page(url, num_retry, delay, regions, stream)
+
+    if page is not None:
+        try:
+            soup = parse_page(page, parser_type, regions) # Parse the page
+            return soup # If no error, end function
+
+        except Exception as e:
+            print_failure('ERROR extracting HTML structure:', e)
+            quarantine_page(url, page.body, e)
+
+    # If try many time but failed
+    print_failure('FAILED to extract HTML structure.', url)
+    update_errorLog('FAILED_EXTRACTING_HTML' + ' | ' + url) # Add to log
+    return None
+
+def HTMLTree_wrapper(url, num_retry=5, delay=10):
+    """
+    Same as BeautifulSoup_wrapper, return an lxml.html tree of the page (see
+    extract.py), or None if the page cannot be opened.
+    """
+
+    node = BeautifulSoup_wrapper(url, 'lxml.html', num_retry, delay)
+    return node.element if node is not None else None
+
+def extract_wrapper(url, extract, parser_type='lxml', num_retry=5, delay=10, regions=None, stream=False):
+    """
+    Same as BeautifulSoup_wrapper, return extract(tree of the page) instead of
+    the tree, or None if the page cannot be opened or extracted.
+
+    The page is parsed and extracted by the parse pool (parsepool.py), in a
+    worker process if the pool has workers: extract must be a module level
+    function, returning a compact record (e.g. a dict of field values).
+    """
+
+    page = open_page(url, num_retry, delay, regions, stream)
+    return extract_page(url, page, extract, parser_type, regions)
+
+def extract_page(url, page, extract, parser_type='lxml', regions=None):
+    """
+    Second half of extract_wrapper, for a page already downloaded by open_page
+    (e.g. by the fetch stage of a pipeline, see pipeline.py). Return None if
+    the page (None: cannot be opened) cannot be extracted.
+    """
+
+    if page is not None:
+        try:
+            return get_parsePool().extract(extract, page.body, parser_type, regions, page.encoding)
+
+        except Exception as e:
+            print_failure('ERROR extracting page:', e)
+            quarantine_page(url, page.body, e)
+
+    print_failure('FAILED to extract page.', url)
+    update_errorLog('FAILED_EXTRACTING_PAGE' + ' | ' + url) # Add to log
+    return None
+
+#------------------------------------------------------------------------------
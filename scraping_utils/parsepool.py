@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, division
+
+"""
+Process pool for the parse + extract stage of the detail pages.
+
+Once the detail pages are downloaded at the same time (engine.py), the parse
+and the extract functions are CPU-bound, and the GIL runs them on one core
+whatever the number of download threads. In pipeline mode (--parse-workers N),
+the download threads only fetch the raw bytes of the page and hand them to a
+pool of worker processes, which parse the page, run the extract function and
+send back a compact record (e.g. a dict of field values) instead of the tree.
+
+    record = extract_wrapper(url, extract_addonPage, 'lxml.html') # parse.py
+
+The worker processes are started once for the run and keep their state
+between pages (warm state): the parser backends are imported and initialized
+when the worker starts, the compiled XPath of the schemas (extract.py) are
+kept by each worker, and a site can set up more state with an initializer
+(get_workerState). With 0 workers (the default), the extract functions run in
+the download threads, as before.
+
+The extract functions are sent to the workers by name, they must be module
+level functions (no lambda or nested function).
+
+Benchmark: benchmarks/parsepool_benchmark.py
+"""
+
+#------------------------------------------------------------------------------
+# Libraries
+#------------------------------------------------------------------------------
+
+import multiprocessing
+import signal
+import threading
+from time import time
+
+from scraping_utils.backends import parse_html, PARSER_BACKENDS, HTMLParser
+
+#------------------------------------------------------------------------------
+# Global variables
+#------------------------------------------------------------------------------
+
+PARSE_TIMEOUT = 24 * 3600 # AsyncResult.get() without timeout cannot be stopped with Ctrl+C (Python 2)
+
+WARM_PAGE = '<html><head><title>Warm</title></head><body><div class="a"><p>Warm</p></div></body></html>'
+
+_workerState = {} # State of the current worker process, see get_workerState
+
+#------------------------------------------------------------------------------
+# Self-defined functions
+#------------------------------------------------------------------------------
+
+def get_workerState():
+    """
+    Return the dict of the state kept by the current worker process between
+    pages (set up by the initializer of the pool).
+    """
+
+    return _workerState
+
+def warm_parsers():
+    """
+    Import and initialize every installed parser backend (first parse).
+    """
+
+    for backend in PARSER_BACKENDS:
+        if backend == 'selectolax' and HTMLParser is None: continue
+        parse_html(WARM_PAGE, backend)
+
+def init_worker(initializer=None, initargs=()):
+    """
+    Start of a worker process.
+    """
+
+    signal.signal(signal.SIGINT, signal.SIG_IGN) # Ctrl+C is handled by the main process
+    warm_parsers()
+    if initializer is not None: initializer(*initargs)
+
+def parse_extract(extract, body, parser_type, regions, encoding=None):
+    """
+    Parse a page and run the extract function on the tree, in a worker
+    process. Return (record, parse + extract time).
+    """
+
+    startTime = time()
+    record = extract(parse_html(body, parser_type, regions, encoding))
+    return record, time() - startTime
+
+class ParsePool(object):
+    """
+    Pool of worker processes running parse_extract. The methods can be called
+    by several download threads at the same time.
+    """
+
+    def __init__(self, num_workers=0, initializer=None, initargs=()):
+        self.num_workers = num_workers
+        self.pages = 0
+        self.parseTime = 0.0
+        self._lock = threading.Lock()
+        self._pool = None
+        if num_workers > 0:
+            self._pool = multiprocessing.Pool(num_workers, init_worker, (initializer, initargs))
+        elif initializer is not None:
+            initializer(*initargs) # The download threads are the workers
+
+    def extract(self, extract, body, parser_type='lxml', regions=None, encoding=None):
+        """
+        Return the record of extract(tree of the page). The exceptions of the
+        extract function are raised again here. body is the page bytes,
+        encoding its encoding (None: detected by the worker).
+        """
+
+        if self._pool is None:
+            record, parseTime = parse_extract(extract, body, parser_type, regions, encoding)
+        else:
+            result = self._pool.apply_async(parse_extract, (extract, body, parser_type, regions, encoding))
+            record, parseTime = result.get(PARSE_TIMEOUT)
+
+        with self._lock:
+            self.pages += 1
+            self.parseTime += parseTime
+        return record
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+    def print_metrics(self):
+        if self.pages == 0: return
+        print('Parse pool: %d pages, %d worker processes, %.1f ms of parse + extract per page'
+              % (self.pages, self.num_workers, self.parseTime / self.pages * 1000))
+
+_parsePool = ParsePool()
+
+def get_parsePool():
+    return _parsePool
+
+def set_parsePool(num_workers, initializer=None, initargs=()):
+    """
+    Start a new parse pool with num_workers processes (0: extract in the
+    download threads). Call it before the downloads start, the workers are
+    forked from the main process.
+    """
+
+    global _parsePool
+    _parsePool.close()
+    _parsePool = ParsePool(num_workers, initializer, initargs)
+    return _parsePool
+
+#------------------------------------------------------------------------------
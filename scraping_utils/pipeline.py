@@ -0,0 +1,244 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, division
+
+"""
+Staged pipeline: listing, detail pages and output at the same time.
+
+The scripts ran in strict steps: walk all the listing pages, then visit every
+detail page (engine.map_ordered), then write the output. The first detail page
+waited for the last listing page, and the writer for the last detail page. A
+Pipeline runs the steps as stages connected by bounded queues:
+
+    source (listing) -> stage 1 (e.g. fetch) -> stage 2 (e.g. extract) -> sink
+
+    - the source is an iterator (e.g. a generator walking the listing pages),
+    consumed by its own thread: each item goes to the first stage as soon as
+    it is listed
+    - each stage runs its function on the items with its own number of worker
+    threads (concurrency)
+    - the sink (e.g. the write method of an output file, see sinks.py) gets
+    the results in the order of the source, as soon as the results before
+    are ready, in the thread calling run()
+    - the queues between the stages hold at most queue_size items: a fast
+    stage waits for the slower stage after it (backpressure), e.g. the
+    listing pauses when the detail pages are behind
+
+So the run time approaches the time of the slowest stage instead of the sum
+of the steps. Stage.print_metrics shows the busy time of each stage.
+
+A failed item (the function of a stage raised an exception) is not given to
+the sink as None: on_error(source item, exception) returns the row written in
+its place (e.g. a row marked is_error), or None to skip it. The other items go
+on, the failed items are counted (print_metrics) and not raised again, so one
+bad item does not abort the output files. An error of the source (the listing
+is not complete) or of the sink (the output file) is raised again at the end.
+As in map_ordered, a retry loop in a stage (RetryLater, see scheduler.py) does
+not block its worker.
+
+    pipeline = Pipeline(extract_addonsList(url, searchTerm),
+                        [Stage('detail', extract_addonItem, num_workers=8)],
+                        sink=addonInfoSink.write)
+    pipeline.run()
+
+tap() keeps the items of the source on the way (e.g. writes the listing to its
+own output file).
+
+Environment:
+    1. Python 2.7 (threads, as engine.py)
+"""
+
+#------------------------------------------------------------------------------
+# Libraries
+#------------------------------------------------------------------------------
+
+import threading
+from Queue import Queue, Empty
+from time import time
+
+from scraping_utils.scheduler import RetryScheduler, RetryLater, set_deferrable
+
+#------------------------------------------------------------------------------
+# Global variables
+#------------------------------------------------------------------------------
+
+DEFAULT_QUEUE_SIZE = 16 # Items waiting between two stages
+
+_STOP = object() # Stop signal of the workers
+
+#------------------------------------------------------------------------------
+# Self-defined functions
+#------------------------------------------------------------------------------
+
+def tap(items, *funcs):
+    """
+    Generator of the items, calling each func(item) before giving an item
+    (e.g. RecordBuffer.append, the write method of a sink).
+    """
+
+    for item in items:
+        for func in funcs:
+            func(item)
+        yield item
+
+class Stage(object):
+    """
+    A step of a pipeline: func(item) runs on every item with num_workers
+    threads, queue_size items at most wait for this stage.
+    """
+
+    def __init__(self, name, func, num_workers=1, queue_size=DEFAULT_QUEUE_SIZE):
+        self.name = name
+        self.func = func
+        self.num_workers = num_workers
+        self.queue_size = queue_size
+        self.items = 0
+        self.failed = 0 # Items whose func raised an exception
+        self.busyTime = 0.0 # Seconds spent in func, all workers
+        self._lock = threading.Lock()
+
+    def add_time(self, elapsed, failed=False):
+        with self._lock:
+            self.items += 1
+            self.busyTime += elapsed
+            if failed: self.failed += 1
+
+    def print_metrics(self, elapsed):
+        if self.items == 0: return
+        print('    %-10s %5d items, %2d workers, busy %.1fs (%.0f%% of the workers time)%s'
+              % (self.name, self.items, self.num_workers, self.busyTime,
+                 100 * self.busyTime / max(elapsed * self.num_workers, 1e-9),
+                 ', %d failed' % self.failed if self.failed else ''))
+
+class Pipeline(object):
+    """
+    source -> stages -> sink, see the module docstring.
+    """
+
+    def __init__(self, source, stages, sink=None, name='Pipeline', on_error=None):
+        self.source = source
+        self.stages = list(stages)
+        self.sink = sink
+        self.name = name
+        self.on_error = on_error
+        self.failed = 0 # Failed items
+        self.elapsed = 0.0
+
+    def run(self):
+        """
+        Run the pipeline until every item of the source is given to the sink.
+        Return the number of items (failed items included).
+        """
+
+        startTime = time()
+        stages = self.stages
+        queues = [Queue(stage.queue_size) for stage in stages] + [Queue()] # Last one: results for the sink
+        scheduler = RetryScheduler()
+        errors = [] # Errors of the source and the sink, raised again at the end
+        listed = [None] # Number of items of the source, known at its end
+        finished = threading.Event() # Set when the sink got every item
+        scheduled = threading.Event() # Set when a task is scheduled for a retry
+
+        def source():
+            count = 0
+            try:
+                for item in self.source:
+                    queues[0].put((count, item, item)) # (index, source item, item of the stage)
+                    count += 1
+            except Exception as e:
+                errors.append((count, e)) # The items listed before are still processed
+            listed[0] = count
+            queues[-1].put(None) # Wake up the sink
+
+        def worker(stageIndex):
+            stage = stages[stageIndex]
+            set_deferrable(True) # Retry loops raise RetryLater instead of sleeping
+            while True:
+                task = queues[stageIndex].get()
+                if task is _STOP: return
+                index, sourceItem, item = task[:3]
+                if len(task) == 4: # Failed in a stage before, goes on to the sink
+                    queues[stageIndex + 1].put(task)
+                    continue
+                taskStart = time()
+                try:
+                    result = (index, sourceItem, stage.func(item))
+                except RetryLater as r:
+                    scheduler.schedule((stageIndex, task), r.delay) # Run again later
+                    scheduled.set()
+                    continue
+                except Exception as e:
+                    print('ERROR in stage', stage.name + ':', e)
+                    result = (index, sourceItem, None, e)
+                stage.add_time(time() - taskStart, len(result) == 4)
+                queues[stageIndex + 1].put(result)
+
+        def dispatcher():
+            """
+            Send the tasks waiting for a retry back to their stage when they
+            are due.
+            """
+
+            while not finished.is_set():
+                for stageIndex, task in scheduler.pop_due():
+                    queues[stageIndex].put(task)
+                nextDelay = scheduler.next_delay()
+                scheduled.wait(1 if nextDelay is None else min(nextDelay, 1))
+                scheduled.clear()
+
+        threads = [threading.Thread(target=source), threading.Thread(target=dispatcher)]
+        for stageIndex, stage in enumerate(stages):
+            threads += [threading.Thread(target=worker, args=(stageIndex,)) for _ in range(stage.num_workers)]
+        for t in threads:
+            t.daemon = True # Ctrl+C stops the run
+            t.start()
+
+        # Sink: the results in the order of the source
+        waiting = {} # Results ready before the results before them
+        nextIndex = 0
+        while listed[0] is None or nextIndex < listed[0]:
+            try:
+                task = queues[-1].get(timeout=1) # Short waits, Ctrl+C still works
+            except Empty:
+                continue
+            if task is None: continue # End of the source
+            waiting[task[0]] = task
+            while nextIndex in waiting:
+                task = waiting.pop(nextIndex)
+                nextIndex += 1
+                result = task[2]
+                if len(task) == 4: # Failed item, its row is given by on_error
+                    self.failed += 1
+                    result = None
+                    if self.on_error is not None:
+                        try:
+                            result = self.on_error(task[1], task[3])
+                        except Exception as e:
+                            print('ERROR in on_error:', e)
+                    if result is None: continue # Skipped
+                if self.sink is not None:
+                    try:
+                        self.sink(result)
+                    except Exception as e:
+                        errors.append((task[0], e))
+
+        # Stop the workers
+        finished.set()
+        scheduled.set()
+        for stageIndex, stage in enumerate(stages):
+            for _ in range(stage.num_workers):
+                queues[stageIndex].put(_STOP)
+        for t in threads:
+            t.join()
+
+        self.elapsed = time() - startTime
+        if errors:
+            raise min(errors, key=lambda e: e[0])[1]
+        return nextIndex
+
+    def print_metrics(self):
+        print('%s: %.1fs%s' % (self.name, self.elapsed,
+                               ', %d items failed' % self.failed if self.failed else ''))
+        for stage in self.stages:
+            stage.print_metrics(self.elapsed)
+
+#------------------------------------------------------------------------------
@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, division
+
+"""
+Records and column-oriented tables of results.
+
+The result tables were built one row at a time with DataFrame.append (or a
+one-row DataFrame per page, DataFrame.from_dict(...).T), which copies the
+whole table at every row: quadratic, minutes for 10k rows. The rows are now
+records, small objects with fixed fields (__slots__), kept in a RecordBuffer,
+one list per column, which is turned into a DataFrame once at the end:
+
+    AddonInfo = record_type('AddonInfo', ['addon_name', 'addon_url', 'search_rank', ...])
+
+    addonInfoBuffer = RecordBuffer(AddonInfo, dtypes={'search_rank':'int64'})
+    for ...:
+        addonInfoBuffer.append(AddonInfo(addon_name=..., search_rank=...))
+    addonInfoTb = addonInfoBuffer.to_frame()
+
+The fields not given are None. The columns keep the values as they are
+(object dtype, as the tables built with append), except the columns given a
+dtype.
+
+Benchmark: benchmarks/records_benchmark.py
+"""
+
+#------------------------------------------------------------------------------
+# Libraries
+#------------------------------------------------------------------------------
+
+import sys
+from collections import OrderedDict
+
+import pandas as pd
+
+#------------------------------------------------------------------------------
+# Self-defined functions
+#------------------------------------------------------------------------------
+
+class Record(object):
+    """
+    Base class of the record types (see record_type): a row with fixed fields,
+    read as attributes or as a dict (record['field'], record.get('field')).
+    """
+
+    __slots__ = ()
+    fields = ()
+
+    def __init__(self, *values, **kwargs):
+        if len(values) > len(self.fields):
+            raise TypeError('%s has %d fields' % (type(self).__name__, len(self.fields)))
+        for field, value in zip(self.fields, values):
+            setattr(self, field, value)
+        for field in self.fields[len(values):]:
+            setattr(self, field, None)
+        self.update(kwargs)
+
+    def __getitem__(self, field):
+        try:
+            return getattr(self, field)
+        except AttributeError:
+            raise KeyError(field)
+
+    def __setitem__(self, field, value):
+        if field not in self.fields: raise KeyError(field)
+        setattr(self, field, value)
+
+    def get(self, field, default=None):
+        return getattr(self, field, default)
+
+    def update(self, values):
+        """
+        Set the fields of a dict (or record), unknown keys raise a KeyError.
+        """
+
+        for field, value in values.items():
+            self[field] = value
+
+    def items(self):
+        return [(field, getattr(self, field)) for field in self.fields]
+
+    def as_tuple(self):
+        return tuple(getattr(self, field) for field in self.fields)
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self.as_tuple() == other.as_tuple()
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return '%s(%s)' % (type(self).__name__,
+                           ', '.join('%s=%r' % item for item in self.items()))
+
+    def __getstate__(self): # Records without __dict__ can be pickled
+        return self.as_tuple()
+
+    def __setstate__(self, state):
+        for field, value in zip(self.fields, state):
+            setattr(self, field, value)
+
+def record_type(name, fields):
+    """
+    Return a new record type (class) with these fields.
+    """
+
+    fields = tuple(fields)
+    recordType = type(name, (Record,), {'__slots__':fields, 'fields':fields})
+    recordType.__module__ = sys._getframe(1).f_globals.get('__name__', '__main__') # Pickled by name, as namedtuple
+    return recordType
+
+def column_names(columns):
+    """
+    Return the list of column names of a record type or a list of names.
+    """
+
+    return list(columns.fields if isinstance(columns, type) else columns)
+
+def row_values(columns, row):
+    """
+    Return the list of the values of a row in the order of the columns. row is
+    a record, a dict (or pandas Series) or a sequence in the order of the
+    columns. Missing columns are None.
+    """
+
+    if isinstance(row, (Record, dict, pd.Series)):
+        return [row.get(column) for column in columns]
+    if len(row) != len(columns):
+        raise ValueError('row of %d values for %d columns' % (len(row), len(columns)))
+    return list(row)
+
+class RecordBuffer(object):
+    """
+    A table built row by row, one list per column, turned into a DataFrame
+    once (to_frame). columns is a record type or a list of column names,
+    dtypes the pandas dtype of some columns (the others are kept as objects).
+    """
+
+    def __init__(self, columns, dtypes=None):
+        self.columns = column_names(columns)
+        self.dtypes = dict(dtypes or {})
+        self._data = [[] for _ in self.columns]
+
+    def __len__(self):
+        return len(self._data[0]) if self._data else 0
+
+    def append(self, row=None, **values):
+        """
+        Add a row: a record, a dict (or pandas Series), a sequence in the order
+        of the columns, or the values as keyword arguments. Missing columns are
+        None.
+        """
+
+        if row is None: row = values
+        for value, data in zip(row_values(self.columns, row), self._data):
+            data.append(value)
+
+    def extend(self, rows):
+        for row in rows:
+            self.append(row)
+
+    def column(self, name):
+        """
+        Return the list of the values of a column (not a copy).
+        """
+
+        return self._data[self.columns.index(name)]
+
+    def to_frame(self):
+        """
+        Return the DataFrame of the rows, built once.
+        """
+
+        series = OrderedDict()
+        for column, data in zip(self.columns, self._data):
+            dtype = self.dtypes.get(column, object)
+            try:
+                series[column] = pd.Series(data, dtype=dtype)
+            except (TypeError, ValueError): # e.g. None in an integer column
+                series[column] = pd.Series(data, dtype=object)
+        return pd.DataFrame(series, columns=self.columns)
+
+#------------------------------------------------------------------------------
@@ -0,0 +1,280 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, division
+
+"""
+Retry policy shared by all the scrapers.
+
+Before, BeautifulSoup_wrapper retried urlopen_wrapper 5 times, urlopen_wrapper
+retried 5 times with sleep(10), and extract_addonInfo_wrapper retried the
+whole thing 5 more times: a single url could block a run for more than 20
+minutes when a host was down. Now there is only one retry loop per call, and
+all of them share:
+    - a circuit breaker per host: after CIRCUIT_FAILURE_THRESHOLD failures in
+    a row, the circuit opens and every call to that host fails immediately.
+    After CIRCUIT_RESET_TIMEOUT seconds, one probe request is allowed
+    (half-open), the circuit closes again if it succeeds.
+    - a retry budget for the whole run: every attempt adds RETRY_BUDGET_RATIO
+    token, every retry costs 1 token (RETRY_BUDGET_MIN tokens at the start).
+    When the budget is empty, failed calls are not retried any more.
+    - an exponential backoff delay between retries, capped at MAX_DELAY, with
+    a random jitter so the retries of many failed requests are spread out.
+    In a worker of the engine, the retry loop does not sleep during the delay,
+    the task is scheduled again (see scheduler.py).
+"""
+
+#------------------------------------------------------------------------------
+# Libraries
+#------------------------------------------------------------------------------
+
+import random
+import threading
+import urllib2
+import urlparse
+
+# Other packages
+from time import time, sleep
+
+from scraping_utils.failures import is_transient, print_failure
+from scraping_utils.scheduler import RetryLater, is_deferrable
+
+#------------------------------------------------------------------------------
+# Global variables
+#------------------------------------------------------------------------------
+
+CIRCUIT_FAILURE_THRESHOLD = 3 # Failures in a row before opening the circuit
+CIRCUIT_RESET_TIMEOUT = 60 # Seconds before a half-open probe is allowed
+
+RETRY_BUDGET_MIN = 20 # Retries always allowed in a run
+RETRY_BUDGET_RATIO = 0.2 # Retries allowed per attempt
+
+BACKOFF_FACTOR = 2
+MAX_DELAY = 60 # Seconds
+JITTER = 0.5 # The delay is randomly reduced by up to 50%
+
+#------------------------------------------------------------------------------
+# Self-defined functions
+#------------------------------------------------------------------------------
+
+class CircuitOpenError(urllib2.URLError):
+    """
+    Raised when a call is refused because the circuit of its host is open.
+    """
+
+    def __init__(self, host):
+        urllib2.URLError.__init__(self, 'circuit open for host %s' % host)
+        self.host = host
+
+class CircuitBreaker(object):
+    """
+    Circuit breaker of one host. States: closed (normal), open (fail fast),
+    half-open (one probe call allowed).
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, host, failure_threshold=CIRCUIT_FAILURE_THRESHOLD,
+                 reset_timeout=CIRCUIT_RESET_TIMEOUT):
+        self.host = host
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """
+        Return True if a call to the host can be made now.
+        """
+
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+
+            if self.state == self.OPEN and time() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._probing = False
+
+            if self.state == self.HALF_OPEN and not self._probing:
+                self._probing = True # Only one probe at a time
+                return True
+
+            return False
+
+    def is_open(self):
+        return self.state == self.OPEN
+
+    def record_success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                print('Circuit closed for host', self.host)
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == self.HALF_OPEN or (self.state == self.CLOSED and
+                                                self.failures >= self.failure_threshold):
+                if self.state == self.CLOSED:
+                    print('Circuit opened for host', self.host, '(%d failures)' % self.failures)
+                self.state = self.OPEN
+                self.opened_at = time()
+
+class RetryBudget(object):
+    """
+    Token bucket limiting the number of retries of a whole run.
+    """
+
+    def __init__(self, min_retries=RETRY_BUDGET_MIN, ratio=RETRY_BUDGET_RATIO):
+        self.ratio = ratio
+        self.tokens = float(min_retries)
+        self.retries = 0
+        self.refused = 0
+        self._lock = threading.Lock()
+
+    def record_attempt(self):
+        with self._lock:
+            self.tokens += self.ratio
+
+    def consume(self):
+        """
+        Take 1 token for a retry. Return False if the budget is empty.
+        """
+
+        with self._lock:
+            if self.tokens < 1:
+                self.refused += 1
+                return False
+            self.tokens -= 1
+            self.retries += 1
+            return True
+
+class RetryPolicy(object):
+    """
+    Circuit breakers (one per host), retry budget and backoff delays shared
+    by all the retry loops of a run.
+    """
+
+    def __init__(self, budget=None, backoff_factor=BACKOFF_FACTOR, max_delay=MAX_DELAY,
+                 jitter=JITTER):
+        self.budget = budget or RetryBudget()
+        self.backoff_factor = backoff_factor
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self._breakers = {}
+        self._retryCounts = {} # (func, key) -> retries done before RetryLater
+        self._lock = threading.Lock()
+
+    def get_breaker(self, host):
+        with self._lock:
+            breaker = self._breakers.get(host)
+            if breaker is None:
+                breaker = CircuitBreaker(host)
+                self._breakers[host] = breaker
+        return breaker
+
+    def get_delay(self, count_retry, delay):
+        """
+        Delay before the retry number count_retry (1, 2...), delay is the base
+        delay given by the caller.
+        """
+
+        retryDelay = min(delay * self.backoff_factor ** (count_retry - 1), self.max_delay)
+        return retryDelay * (1 - self.jitter * random.random())
+
+    def call(self, func, args=(), num_retry=5, delay=10, host=None, is_failure=None,
+             retry_on=is_transient, key=None):
+        """
+        Call func(*args), retry it at most num_retry - 1 times if it raises a
+        transient error (retry_on(exception) is True, see failures.py). Other
+        errors are raised at once. The last exception is raised again when the
+        retries are over, when the retry budget is empty or when the circuit
+        of the host opens. CircuitOpenError is raised if the circuit is
+        already open.
+
+        is_failure(exception) tells if an exception means the host has a
+        problem (counted by the circuit breaker), default: all exceptions.
+
+        In a worker of the engine, RetryLater is raised instead of sleeping
+        before a retry, the retries already done are counted when the task
+        calls func again with the same key (e.g. the url). Without key, the
+        retry loop sleeps: the args may not be the same objects in the next
+        call (e.g. a new function), the retries could not be counted.
+        """
+
+        breaker = self.get_breaker(host) if host is not None else None
+
+        if key is not None:
+            key = (func, key)
+            with self._lock:
+                count_retry = self._retryCounts.pop(key, 0)
+        else:
+            count_retry = 0
+
+        while True:
+            if breaker is not None and not breaker.allow():
+                raise CircuitOpenError(host)
+
+            self.budget.record_attempt()
+            try:
+                result = func(*args)
+            except Exception as e:
+                if breaker is not None:
+                    if is_failure is None or is_failure(e):
+                        breaker.record_failure()
+                    else:
+                        breaker.record_success() # The host answered
+                count_retry += 1
+                if not retry_on(e):
+                    raise # Retrying would give the same error
+                if count_retry >= num_retry:
+                    raise
+                if breaker is not None and breaker.is_open():
+                    raise # Do not wait for a host which is down
+                if not self.budget.consume():
+                    print('Retry budget of this run is empty, not retrying.')
+                    raise
+                retryDelay = self.get_delay(count_retry, delay)
+                print_failure('ERROR:', e)
+                print_failure('Retrying in %.1f seconds...' % retryDelay)
+                if key is not None and is_deferrable(): # Let the worker do other tasks meanwhile
+                    with self._lock:
+                        self._retryCounts[key] = count_retry
+                    raise RetryLater(retryDelay, e)
+                sleep(retryDelay)
+                continue
+
+            if breaker is not None: breaker.record_success()
+            return result
+
+def get_host(url):
+    return urlparse.urlsplit(url).hostname
+
+#------------------------------------------------------------------------------
+# Shared policy
+#------------------------------------------------------------------------------
+
+_policy = RetryPolicy()
+
+def get_policy():
+    """
+    Return the retry policy shared by all the functions of this package.
+    """
+
+    return _policy
+
+def call_with_retry(func, args=(), num_retry=5, delay=10, host=None, is_failure=None,
+                    retry_on=is_transient, key=None):
+    """
+    Call func(*args) with the shared retry policy, see RetryPolicy.call.
+    """
+
+    return _policy.call(func, args, num_retry, delay, host, is_failure, retry_on, key)
+
+#------------------------------------------------------------------------------
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, division
+
+"""
+Delayed-retry scheduler: the retry loops do not sleep in the worker any more.
+
+When a retry loop (retry.RetryPolicy.call, used by urlopen_wrapper and
+click_wrapper) runs in a worker of the engine (engine.map_ordered), it does not
+call sleep(delay): it raises RetryLater, the engine puts the task in a
+RetryScheduler (a heap of (due time, task)) and the worker goes on with the
+next items. When the delay is over, the task is sent again to the workers. The
+number of retries already done is kept by the retry policy, so the backoff
+delays keep growing.
+
+Outside of the engine (e.g. the main loop of a Selenium script), there is no
+other work to do meanwhile, the retry loops still sleep.
+"""
+
+#------------------------------------------------------------------------------
+# Libraries
+#------------------------------------------------------------------------------
+
+import heapq
+import itertools
+import threading
+
+# Other packages
+from time import time
+
+#------------------------------------------------------------------------------
+# Self-defined functions
+#------------------------------------------------------------------------------
+
+class RetryLater(BaseException):
+    """
+    Raised by a retry loop running in a worker of the engine, instead of
+    sleeping: the task must run again after delay seconds.
+
+    Note: BaseException, not Exception, so the "except Exception" of the
+    wrappers between the retry loop and the engine do not catch it.
+    """
+
+    def __init__(self, delay, error):
+        BaseException.__init__(self, 'retry in %.1f seconds: %s' % (delay, error))
+        self.delay = delay
+        self.error = error
+
+class RetryScheduler(object):
+    """
+    Heap of (due time, task). Thread-safe.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._counter = itertools.count() # Keeps the FIFO order of equal due times
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._heap)
+
+    def schedule(self, task, delay):
+        with self._lock:
+            heapq.heappush(self._heap, (time() + delay, next(self._counter), task))
+
+    def pop_due(self):
+        """
+        Remove and return the tasks whose due time is over.
+        """
+
+        dueTasks = []
+        now = time()
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                dueTasks.append(heapq.heappop(self._heap)[2])
+        return dueTasks
+
+    def next_delay(self):
+        """
+        Seconds before the next task is due, None if there is no task.
+        """
+
+        with self._lock:
+            if not self._heap: return None
+            return max(0, self._heap[0][0] - time())
+
+_context = threading.local()
+
+def set_deferrable(deferrable):
+    """
+    Tell the retry loops of the current thread to raise RetryLater instead of
+    sleeping (set by the workers of the engine).
+    """
+
+    _context.deferrable = deferrable
+
+def is_deferrable():
+    return getattr(_context, 'deferrable', False)
+
+#------------------------------------------------------------------------------
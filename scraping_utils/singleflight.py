@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, division
+
+"""
+Single-flight request coalescing and in-run memo of the downloaded pages.
+
+The same page is often requested several times in one run: the Indeed first
+page is opened in __main__ then again in extract_allJobs, paginated
+listings repeat some items, several addons have the same author page... The
+shared HTTP client now sends every request through a SingleFlight object:
+    - requests for the same canonical url sent at the same time (by several
+    workers) share one fetch
+    - a url already fetched in this run is answered from an in-memory memo of
+    the last MEMO_SIZE pages (at most MEMO_MAX_BYTES)
+The number of fetches saved is printed at the end of the run.
+"""
+
+#------------------------------------------------------------------------------
+# Libraries
+#------------------------------------------------------------------------------
+
+import threading
+import urllib
+import urlparse
+from collections import OrderedDict
+
+#------------------------------------------------------------------------------
+# Global variables
+#------------------------------------------------------------------------------
+
+MEMO_SIZE = 256 # Pages
+MEMO_MAX_BYTES = 64 * 1024 * 1024
+
+DEFAULT_PORTS = {'http':80, 'https':443}
+
+#------------------------------------------------------------------------------
+# Self-defined functions
+#------------------------------------------------------------------------------
+
+def canonical_url(url):
+    """
+    Return the canonical form of an url: lower case scheme and host, no default
+    port, no fragment, sorted query parameters.
+    """
+
+    parsed = urlparse.urlsplit(url)
+    scheme = parsed.scheme.lower()
+    host = (parsed.hostname or '').lower()
+    if parsed.port is not None and parsed.port != DEFAULT_PORTS.get(scheme):
+        host += ':%d' % parsed.port
+    query = urllib.urlencode(sorted(urlparse.parse_qsl(parsed.query, keep_blank_values=True)))
+    return urlparse.urlunsplit((scheme, host, parsed.path or '/', query, ''))
+
+class _Call(object):
+    """
+    A fetch in flight, the other requests for the same url wait for it.
+    """
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.page = None
+        self.error = None
+
+class SingleFlight(object):
+    """
+    Coalesce the requests for the same url, memoize the successful pages.
+    Thread-safe.
+    """
+
+    def __init__(self, memo_size=MEMO_SIZE, memo_max_bytes=MEMO_MAX_BYTES):
+        self.memo_size = memo_size
+        self.memo_max_bytes = memo_max_bytes
+        self._memo = OrderedDict() # canonical url -> page
+        self._memoBytes = 0
+        self._inflight = {} # canonical url -> _Call
+        self._lock = threading.Lock()
+
+        self.fetches = 0 # Fetches really done
+        self.coalesced = 0 # Requests which waited for a fetch in flight
+        self.memo_hits = 0 # Requests answered by the memo
+
+    def do(self, url, fetch):
+        """
+        Return fetch(url), or a copy of the page if the url is in flight or in
+        the memo. fetch must return a fetch.Response object.
+        """
+
+        key = canonical_url(url)
+
+        with self._lock:
+            page = self._memo.pop(key, None)
+            if page is not None:
+                self._memo[key] = page # Move to the most recently used position
+                self.memo_hits += 1
+                return page.copy()
+
+            call = self._inflight.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = _Call()
+                self._inflight[key] = call
+                self.fetches += 1
+            else:
+                self.coalesced += 1
+
+        if not is_leader: # Wait for the fetch in flight
+            call.done.wait()
+            if call.error is not None: raise call.error
+            return call.page.copy()
+
+        try:
+            call.page = fetch(url)
+            return call.page
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+                if call.page is not None and call.page.code == 200:
+                    self._add_memo(key, call.page)
+            call.done.set()
+
+    def get(self, url):
+        """
+        Return a copy of the page of url if it is in the memo, else None.
+        """
+
+        key = canonical_url(url)
+        with self._lock:
+            page = self._memo.pop(key, None)
+            if page is None: return None
+            self._memo[key] = page # Move to the most recently used position
+            self.memo_hits += 1
+            return page.copy()
+
+    def _add_memo(self, key, page):
+        oldPage = self._memo.pop(key, None)
+        if oldPage is not None: self._memoBytes -= len(oldPage.body)
+        self._memo[key] = page
+        self._memoBytes += len(page.body)
+        while self._memo and (len(self._memo) > self.memo_size or
+                              self._memoBytes > self.memo_max_bytes):
+            _, oldPage = self._memo.popitem(last=False)
+            self._memoBytes -= len(oldPage.body)
+
+    def clear_memo(self):
+        """
+        Forget the memoized pages (e.g. to free memory).
+        """
+
+        with self._lock:
+            self._memo.clear()
+            self._memoBytes = 0
+
+    def get_metrics(self):
+        with self._lock:
+            return {'fetches':self.fetches,
+                    'coalesced':self.coalesced,
+                    'memo_hits':self.memo_hits,
+                    'saved':self.coalesced + self.memo_hits}
+
+    def print_metrics(self):
+        metrics = self.get_metrics()
+        if metrics['saved'] == 0: return
+        print('Fetches saved: %d (%d requests in flight shared, %d from the memo of this run)'
+              % (metrics['saved'], metrics['coalesced'], metrics['memo_hits']))
+
+#------------------------------------------------------------------------------
@@ -0,0 +1,304 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, division
+
+"""
+Output files written while the run goes on.
+
+The scripts wrote their output (addonInfoTb.to_csv, allJobsInfoTb.to_pickle...)
+once, at the end of the run: the whole result table stayed in memory, and a
+crash at page 900 of 1000 lost everything. A sink takes the rows (records,
+dicts or sequences, see records.py) one by one as they are produced:
+    - the rows are written to <path>.part in batches (batch_size rows)
+    - every fsync_every rows (checkpoint), the file is flushed to the disk
+    (os.fsync), so the rows written survive a crash of the process or the VM
+    - close() writes the last rows, then renames <path>.part to <path> at once
+    (atomic), so <path> is always a complete file
+    - after an error (with statement), the rows written so far are kept in
+    <path>.part
+
+    with open_sink('output/youtube_Firefox_addonInfo.csv', AddonInfo) as sink:
+        for ...:
+            sink.write(addonInfo)
+
+Formats (from the file extension, see open_sink):
+    - .csv     : CsvSink, the same text as DataFrame.to_csv(index=False, encoding='utf-8')
+    - .jsonl   : JsonlSink, one JSON object per line, for long text fields
+    - .parquet : ParquetSink, one row group per batch (pyarrow, optional). The
+    footer of a parquet file is written by close(), so a .part file is only
+    readable after a clean close.
+"""
+
+#------------------------------------------------------------------------------
+# Libraries
+#------------------------------------------------------------------------------
+
+import csv
+import json
+import threading
+from collections import OrderedDict
+
+# Other packages
+import os
+
+# Optional, only needed by ParquetSink
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+from scraping_utils.records import column_names, row_values, RecordBuffer
+
+#------------------------------------------------------------------------------
+# Global variables
+#------------------------------------------------------------------------------
+
+BATCH_SIZE = 50 # Rows written to the file at once
+FSYNC_EVERY = 500 # Rows between two checkpoints (os.fsync)
+
+PARQUET_BATCH_SIZE = 10000 # Rows of a parquet row group
+
+PART_SUFFIX = '.part'
+
+#------------------------------------------------------------------------------
+# Self-defined functions
+#------------------------------------------------------------------------------
+
+def is_missing(value):
+    return value is None or (isinstance(value, float) and value != value) # None or NaN
+
+def csv_cell(value):
+    """
+    Return the text of a csv cell (utf-8), as DataFrame.to_csv writes it.
+    """
+
+    if is_missing(value): return ''
+    if isinstance(value, unicode): return value.encode('utf-8')
+    if isinstance(value, float): return repr(value)
+    return str(value)
+
+def json_default(value):
+    """
+    Return a JSON value for the types json cannot write (datetime, numpy...).
+    """
+
+    if hasattr(value, 'item'): return value.item() # numpy scalar
+    return unicode(value) if isinstance(value, unicode) else str(value)
+
+def fsync_folder(path):
+    """
+    Flush the folder entry of a renamed file to the disk (not on Windows).
+    """
+
+    if os.name == 'nt': return
+    try:
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+class RecordSink(object):
+    """
+    Base class of the sinks: rows written to <path>.part in batches, fsync at
+    the checkpoints, renamed to path by close(). The methods can be called by
+    several threads at the same time.
+    """
+
+    batch_size = BATCH_SIZE
+
+    def __init__(self, path, columns, batch_size=None, fsync_every=FSYNC_EVERY):
+        self.path = path
+        self.part_path = path + PART_SUFFIX
+        self.columns = column_names(columns)
+        if batch_size is not None: self.batch_size = batch_size
+        self.fsync_every = fsync_every
+        self.count = 0 # Rows written
+        self.closed = False
+        self._batch = []
+        self._lock = threading.Lock()
+
+        folder = os.path.dirname(path)
+        if folder != '' and not os.path.exists(folder): os.makedirs(folder)
+        self._file = open(self.part_path, 'wb')
+        self._open()
+
+    def __len__(self):
+        return self.count
+
+    def write(self, row):
+        """
+        Add a row: a record, a dict (or pandas Series) or a sequence in the
+        order of the columns.
+        """
+
+        values = row_values(self.columns, row)
+        with self._lock:
+            self._batch.append(values)
+            self.count += 1
+            if len(self._batch) >= self.batch_size: self._flush()
+            if self.fsync_every and self.count % self.fsync_every == 0: self._checkpoint()
+
+    def write_all(self, rows):
+        for row in rows:
+            self.write(row)
+
+    def flush(self):
+        """
+        Write the rows of the current batch to the file.
+        """
+
+        with self._lock:
+            self._flush()
+
+    def checkpoint(self):
+        """
+        Write the rows of the current batch and flush the file to the disk.
+        """
+
+        with self._lock:
+            self._checkpoint()
+
+    def close(self):
+        """
+        Write the last rows, then rename <path>.part to path.
+        """
+
+        with self._lock:
+            if self.closed: return
+            self._checkpoint()
+            self._close()
+            self._file.close()
+            if os.name == 'nt' and os.path.exists(self.path): os.remove(self.path) # No atomic replace on Windows
+            os.rename(self.part_path, self.path)
+            fsync_folder(self.path)
+            self.closed = True
+
+    def abort(self):
+        """
+        Write the rows received and keep them in <path>.part (path is not
+        changed).
+        """
+
+        with self._lock:
+            if self.closed: return
+            self._checkpoint()
+            self._file.close()
+            self.closed = True
+        print('Output interrupted, %d rows kept in %s' % (self.count, self.part_path))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        if excType is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+    def _flush(self):
+        if self._batch:
+            self._write_batch(self._batch)
+            self._batch = []
+        self._file.flush()
+
+    def _checkpoint(self):
+        self._flush()
+        os.fsync(self._file.fileno())
+
+    # Format of the file, defined by the subclasses
+    def _open(self):
+        pass
+
+    def _write_batch(self, batch):
+        raise NotImplementedError
+
+    def _close(self):
+        pass
+
+class CsvSink(RecordSink):
+    """
+    Csv file (utf-8) with a header row.
+    """
+
+    def _open(self):
+        self._writer = csv.writer(self._file, lineterminator=os.linesep) # As DataFrame.to_csv
+        self._writer.writerow([csv_cell(column) for column in self.columns])
+
+    def _write_batch(self, batch):
+        self._writer.writerows([[csv_cell(value) for value in values] for values in batch])
+
+class JsonlSink(RecordSink):
+    """
+    JSON lines file, one object per row (the keys in the order of the columns).
+    """
+
+    def _write_batch(self, batch):
+        self._file.write(''.join(json.dumps(OrderedDict(zip(self.columns, values)), default=json_default) + '\n'
+                                 for values in batch))
+
+class ParquetSink(RecordSink):
+    """
+    Parquet file, one row group per batch. The types of the columns are found
+    in the first batch (string for a column without value).
+    """
+
+    batch_size = PARQUET_BATCH_SIZE
+
+    def __init__(self, *args, **kwargs):
+        if pq is None: raise ImportError('ParquetSink requires the pyarrow package')
+        RecordSink.__init__(self, *args, **kwargs)
+
+    def _open(self):
+        self._writer = None
+        self._schema = None
+
+    def _write_batch(self, batch):
+        columns = [[value.decode('utf-8') if isinstance(value, str) else value for value in column]
+                   for column in zip(*batch)]
+        if self._schema is None:
+            arrays = [pa.array(column) for column in columns]
+            arrays = [pa.array(column, type=pa.string()) if array.type == pa.null() else array
+                      for column, array in zip(columns, arrays)]
+            self._schema = pa.schema([pa.field(name, array.type) for name, array in zip(self.columns, arrays)])
+            self._writer = pq.ParquetWriter(self._file, self._schema)
+        else:
+            arrays = [pa.array(column, type=field.type) for column, field in zip(columns, self._schema)]
+        self._writer.write_table(pa.Table.from_arrays(arrays, names=self.columns))
+
+    def _close(self):
+        if self._writer is not None: self._writer.close()
+
+SINK_FORMATS = OrderedDict([('.csv', CsvSink),
+                            ('.jsonl', JsonlSink),
+                            ('.parquet', ParquetSink)])
+
+def open_sink(path, columns, batch_size=None, fsync_every=FSYNC_EVERY):
+    """
+    Return the sink of the format of the file extension (see SINK_FORMATS).
+    """
+
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in SINK_FORMATS:
+        raise ValueError('no sink for %s files (%s)' % (extension, ', '.join(SINK_FORMATS)))
+    return SINK_FORMATS[extension](path, columns, batch_size, fsync_every)
+
+def read_jsonl(path, columns):
+    """
+    Return the DataFrame of a JSON lines file written by JsonlSink (object
+    columns, as the tables built with records.RecordBuffer).
+    """
+
+    buffer = RecordBuffer(columns)
+    with open(path, 'rb') as f:
+        for line in f:
+            if line.strip(): buffer.append(json.loads(line))
+    return buffer.to_frame()
+
+#------------------------------------------------------------------------------
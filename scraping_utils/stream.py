@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, division
+
+"""
+Streaming parse of the pages while they are downloaded.
+
+The extract functions of a site only read a few regions of a page (Region,
+see backends.py), often near the top: the Indeed job pages have the job
+header, summary and date before the similar jobs, the comments and the
+footer; the TripAdvisor listing pages have the locations and the 'next'
+button before the footer. The rest of the page was still downloaded and
+decompressed before the parse started.
+
+A StreamParser is fed the decoded chunks of the body while they arrive
+(compression.read_body), with the incremental parser of lxml. When every
+required region of the page has been parsed (Region(required=...)), it stops
+the download: the connection is closed and the page is parsed with the
+regions found so far.
+
+The StreamParser only tells when to stop: the page is then parsed once by the
+backend of the site (backends.py). So that the lxml tree built while
+streaming does not hold a second copy of the page, each element is cleared
+once its end tag is parsed and the elements before it are removed, and the
+parser (with its tree) is dropped when the download stops.
+
+    page = urlopen_wrapper(url, stream=StreamFactory(jobPageRegions))
+    page.partial # True if the download was stopped early
+
+A page without all the required regions is downloaded to the end, as before.
+"""
+
+#------------------------------------------------------------------------------
+# Libraries
+#------------------------------------------------------------------------------
+
+from lxml import etree
+
+from scraping_utils.backends import regions_key
+
+#------------------------------------------------------------------------------
+# Self-defined functions
+#------------------------------------------------------------------------------
+
+def required_groups(regions):
+    """
+    Return the dict group -> regions of the required regions: a region with
+    required=True is its own group, the regions with the same group name
+    share one group.
+    """
+
+    groups = {}
+    for index, region in enumerate(regions):
+        if region.required is True:
+            groups[index] = [region]
+        elif region.required:
+            groups.setdefault(region.required, []).append(region)
+    return groups
+
+def is_streamable(regions):
+    """
+    Tell if a page with these regions can stop downloading early.
+    """
+
+    return bool(regions) and bool(required_groups(regions))
+
+class StreamParser(object):
+    """
+    Consumer of a page body (see compression.read_body): parse the chunks
+    with the lxml incremental parser and stop when all the required regions
+    are complete (end tag parsed).
+    """
+
+    def __init__(self, regions):
+        self.regions = list(regions)
+        self.groups = required_groups(self.regions)
+        self.stoppable = bool(self.groups) # Without required region, the page is read to the end
+        self.done = False
+        self._rest = '' # End of the last chunk, after its last '>'
+
+        # Only the events of the region tags when the region names are known
+        names = [region.name for region in self.regions]
+        if all(isinstance(name, basestring) for name in names):
+            self._parser = etree.HTMLPullParser(events=('end',), tag=sorted(set(names)))
+        else:
+            self._parser = etree.HTMLPullParser(events=('end',))
+
+    def feed(self, data):
+        """
+        Parse one chunk, return True if the rest of the page is not needed.
+        """
+
+        if self.done: return True
+
+        # Fed up to the end of a tag: the HTML push parser of libxml2 (2.10)
+        # stops giving events after a chunk ending inside an attribute value
+        data = self._rest + data
+        end = data.rfind('>') + 1
+        data, self._rest = data[:end], data[end:]
+        if not data: return False
+
+        self._parser.feed(data)
+        for _, element in self._parser.read_events():
+            if isinstance(element.tag, basestring): # Not a comment or processing instruction
+                for region in self.regions:
+                    if region.matches(element.tag, element.attrib): self._complete(region)
+            self._free(element)
+        self.done = self.stoppable and not self.groups
+        if self.done: self._parser = None # The tree is not used, the page is parsed by its backend
+        return self.done
+
+    def _free(self, element):
+        """
+        Free the parsed part of the tree: the element (its end tag is parsed),
+        and the elements before it and before its ancestors.
+        """
+
+        element.clear()
+        for node in [element] + list(element.iterancestors()):
+            while node.getprevious() is not None:
+                del node.getparent()[0]
+
+    def _complete(self, region):
+        for group, members in self.groups.items():
+            if region in members: del self.groups[group]
+
+class StreamFactory(object):
+    """
+    Return a new StreamParser of the regions for each response (the stream
+    argument of urlopen_wrapper). Two factories of the same regions are
+    equal: the same fetch gets the same arguments when it is retried.
+    """
+
+    def __init__(self, regions):
+        self.regions = list(regions)
+        self.key = regions_key(self.regions)
+
+    def __call__(self):
+        return StreamParser(self.regions)
+
+    def __eq__(self, other):
+        return isinstance(other, StreamFactory) and self.key == other.key
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self.key)
+
+#------------------------------------------------------------------------------
@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, division
+
+"""
+Record / replay the HTTP responses of a run in a WARC file.
+
+With --record, every HTTP response received by the shared HTTP client (status
+line, headers and body, redirects included) is appended to a compressed WARC
+file (.warc.gz, one gzip member per record, so the file stays readable even if
+the script crashes).
+
+With --replay, the shared HTTP client answers every request from that archive
+and never opens a connection. This is useful to:
+    - benchmark the parsing and extraction functions (extract_jobs,
+    extract_addonsList, extract_tourismLocations...) without network
+    - run the extraction again after a selector fix without downloading the
+    pages again
+A response whose download was stopped early (WARC-Truncated, see stream.py)
+is replayed as a partial page, as it was in the recorded run: it is not cached
+or memoized as a complete page.
+
+Note: the body is stored as received by httplib, i.e. after removing the
+chunked transfer encoding, so the Transfer-Encoding header is not recorded.
+
+Refs: WARC format 1.0 (ISO 28500), http://iipc.github.io/warc-specifications/
+"""
+
+#------------------------------------------------------------------------------
+# Libraries
+#------------------------------------------------------------------------------
+
+import base64
+import gzip
+import hashlib
+import httplib
+import threading
+import uuid
+from StringIO import StringIO
+
+# Other packages
+from datetime import datetime
+
+#------------------------------------------------------------------------------
+# Global variables
+#------------------------------------------------------------------------------
+
+WARC_VERSION = 'WARC/1.0'
+
+#------------------------------------------------------------------------------
+# Self-defined functions
+#------------------------------------------------------------------------------
+
+def to_bytes(text):
+    if isinstance(text, unicode): return text.encode('utf-8')
+    return text
+
+def warc_date():
+    return datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ')
+
+def payload_digest(body):
+    return 'sha1:' + base64.b32encode(hashlib.sha1(body).digest())
+
+def parse_headers(headerText):
+    """
+    Return an httplib.HTTPMessage object (same as httplib response.msg) from
+    the raw text of the HTTP headers.
+    """
+
+    return httplib.HTTPMessage(StringIO(headerText))
+
+class WARCWriter(object):
+    """
+    Append HTTP responses to a .warc.gz file. Thread-safe.
+    """
+
+    def __init__(self, path, software='scraping_utils'):
+        self.path = path
+        self._file = open(path, 'ab')
+        self._lock = threading.Lock()
+        self.count = 0
+        self._write_record('warcinfo', None, 'application/warc-fields',
+                           'software: %s\r\nformat: WARC File Format 1.0\r\n' % software)
+
+    def _write_record(self, warcType, targetURI, contentType, block, extraHeaders=None):
+        block = to_bytes(block)
+
+        headers = [('WARC-Type', warcType),
+                   ('WARC-Record-ID', '<urn:uuid:%s>' % uuid.uuid4()),
+                   ('WARC-Date', warc_date())]
+        if targetURI is not None: headers.append(('WARC-Target-URI', targetURI))
+        if extraHeaders is not None: headers.extend(extraHeaders)
+        headers.append(('Content-Type', contentType))
+        headers.append(('Content-Length', str(len(block))))
+
+        record = WARC_VERSION + '\r\n'
+        record += ''.join('%s: %s\r\n' % (name, value) for name, value in headers)
+        record += '\r\n' + block + '\r\n\r\n'
+
+        # One gzip member per record
+        with self._lock:
+            gz = gzip.GzipFile(fileobj=self._file, mode='wb')
+            gz.write(record)
+            gz.close()
+            self._file.flush()
+            self.count += 1
+
+    def write_response(self, url, status, reason, headers, body, truncated=False):
+        """
+        Append one HTTP response. headers is an httplib.HTTPMessage object.
+        truncated: the body is not complete (download stopped early by a
+        stream consumer), the record has a WARC-Truncated header.
+        """
+
+        headerLines = [to_bytes(line) for line in headers.headers
+                       if not line.lower().startswith('transfer-encoding:')]
+        block = 'HTTP/1.1 %d %s\r\n' % (status, to_bytes(reason))
+        block += ''.join(line.rstrip('\r\n') + '\r\n' for line in headerLines)
+        block += '\r\n' + body
+
+        extraHeaders = [('WARC-Payload-Digest', payload_digest(body))]
+        if truncated: extraHeaders.append(('WARC-Truncated', 'unspecified'))
+        self._write_record('response', to_bytes(url), 'application/http; msgtype=response',
+                           block, extraHeaders)
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+class WARCArchive(object):
+    """
+    Read the response records of a .warc.gz (or .warc) file and answer
+    requests from them. If an url was recorded several times, the last
+    response is used.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._responses = {} # url -> (status, reason, header text, body, truncated)
+        self._load()
+
+    def _load(self):
+        opener = gzip.open if self.path.endswith('.gz') else open
+        with opener(self.path, 'rb') as f:
+            while True:
+                line = f.readline()
+                if line == '': break # End of file
+                if line.strip() == '': continue # Blank lines between records
+                if not line.startswith('WARC/'):
+                    raise ValueError('Invalid WARC record in %s' % self.path)
+
+                # WARC headers
+                warcHeaders = {}
+                while True:
+                    line = f.readline().rstrip('\r\n')
+                    if line == '': break
+                    name, _, value = line.partition(':')
+                    warcHeaders[name.strip().lower()] = value.strip()
+
+                block = f.read(int(warcHeaders['content-length']))
+                if warcHeaders.get('warc-type') == 'response':
+                    self._add_response(warcHeaders['warc-target-uri'], block,
+                                       'warc-truncated' in warcHeaders)
+
+    def _add_response(self, url, block, truncated=False):
+        head, _, body = block.partition('\r\n\r\n')
+        statusLine, _, headerText = head.partition('\r\n')
+        _, status, reason = (statusLine.split(' ', 2) + [''])[:3]
+        self._responses[url] = (int(status), reason, headerText + '\r\n\r\n', body, truncated)
+
+    def __len__(self):
+        return len(self._responses)
+
+    def __contains__(self, url):
+        return url in self._responses
+
+    def get(self, url):
+        """
+        Return (status, reason, headers, body, truncated) of the recorded
+        response, or None if the url was not recorded. truncated: the record
+        has a WARC-Truncated header (the body is not complete).
+        """
+
+        response = self._responses.get(to_bytes(url))
+        if response is None: return None
+        status, reason, headerText, body, truncated = response
+        return status, reason, parse_headers(headerText), body, truncated
+
+#------------------------------------------------------------------------------